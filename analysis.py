@@ -0,0 +1,220 @@
+# -----------------------------------------------------------------------------
+# Module: Analysis
+# Description: Whole-maze metrics computed from the wall array: dead ends,
+# junctions and branching factor, corridor lengths, the distance of every
+# cell from the entrance and the tortuosity of the solution.
+#
+# The per-cell work is done on whole arrays at once, starting from the
+# grid's passages() mask. With NumPy installed, the distance field advances
+# large frontiers of the search a whole level at a time and small ones cell
+# by cell, and corridors are labelled by joining neighbouring corridor cells
+# on whole arrays; without it both walk the cells one by one. Arrays come
+# back as NumPy arrays when NumPy is available and as array.array otherwise.
+# -----------------------------------------------------------------------------
+
+from array import array
+
+from grid import LEFT, RIGHT, TOP, BOTTOM, PASSAGE_COUNT
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class Analysis():
+    """
+    The metrics of one maze.
+
+    Attributes:
+        degree: The number of open passages of each cell, by cell id.
+        distance: The number of steps from the start to each cell, by cell id,
+            or -1 for cells that cannot be reached.
+        corridor_lengths: The length in cells of every corridor, a maximal
+            chain of cells with exactly two passages.
+        summary (dict): Scalar metrics, see analyze().
+    """
+
+    def __init__(self, degree, distance, corridor_lengths, summary):
+        self.degree = degree
+        self.distance = distance
+        self.corridor_lengths = corridor_lengths
+        self.summary = summary
+
+
+# Frontiers with fewer cells than this are advanced cell by cell: below it
+# the fixed cost of the NumPy calls outweighs the per-cell loop, as on the
+# long corridors of a backtracker maze, where the frontier stays small for
+# hundreds of thousands of levels.
+_VECTOR_FRONTIER = 64
+
+
+def _distances(grid, sides, start):
+    """
+    Breadth-first distances from start over the open sides of each cell.
+    """
+    cols = grid.num_cols
+    steps = ((LEFT, -1), (RIGHT, 1), (TOP, -cols), (BOTTOM, cols))
+    distance = array("i", [-1]) * grid.size
+    distance[start] = 0
+    if np is not None:
+        # Views sharing memory with sides and distance.
+        side_view = np.frombuffer(sides, dtype=np.uint8)
+        distance_view = np.frombuffer(distance, dtype=np.int32)
+    frontier = [start]
+    level = 0
+    # Advance one level at a time, the whole frontier at once when it is
+    # large enough to pay for the NumPy calls.
+    while len(frontier):
+        level += 1
+        if np is not None and len(frontier) >= _VECTOR_FRONTIER:
+            frontier = np.asarray(frontier, dtype=np.intp)
+            open_sides = side_view[frontier]
+            reached = []
+            for side, delta in steps:
+                cells = frontier[(open_sides & side) != 0] + delta
+                cells = cells[distance_view[cells] < 0]
+                distance_view[cells] = level
+                reached.append(cells)
+            frontier = np.concatenate(reached)
+            if len(frontier) < _VECTOR_FRONTIER:
+                frontier = frontier.tolist()
+            continue
+        reached = []
+        for index in frontier:
+            mask = sides[index]
+            for side, delta in steps:
+                if mask & side:
+                    other = index + delta
+                    if distance[other] < 0:
+                        distance[other] = level
+                        reached.append(other)
+        frontier = reached
+    if np is not None:
+        return distance_view
+    return distance
+
+
+def _corridors(grid, sides, degree):
+    """
+    Return the lengths of the corridors: connected runs of cells that have
+    exactly two open sides, ordered by the lowest cell id of each.
+    """
+    cols = grid.num_cols
+    if np is not None:
+        side_view = np.frombuffer(sides, dtype=np.uint8)
+        corridor = np.frombuffer(degree, dtype=np.uint8) == 2
+        # Number the corridor cells 0, 1, ... in id order.
+        rank = np.cumsum(corridor, dtype=np.intp) - 1
+        first = []
+        second = []
+        for side, back, delta in ((RIGHT, LEFT, 1), (BOTTOM, TOP, cols)):
+            # Corridor cells joined to the corridor cell past this side.
+            joined = np.flatnonzero(
+                corridor[:-delta] & corridor[delta:]
+                & ((side_view[:-delta] & side) | (side_view[delta:] & back) != 0))
+            first.append(rank[joined])
+            second.append(rank[joined + delta])
+        first = np.concatenate(first)
+        second = np.concatenate(second)
+        # Label every corridor with its lowest cell: hook the root of the
+        # higher cell of each joint onto the root of the lower one, then
+        # point every cell at its root, until no joint spans two labels.
+        label = np.arange(rank[-1] + 1)
+        while first.size:
+            low = label[first]
+            high = label[second]
+            spans = low != high
+            if not spans.any():
+                break
+            first, second = first[spans], second[spans]
+            low, high = low[spans], high[spans]
+            label[np.maximum(low, high)] = np.minimum(low, high)
+            while True:
+                root = label[label]
+                if np.array_equal(root, label):
+                    break
+                label = root
+        lengths = np.bincount(label)
+        return lengths[lengths > 0].astype(np.int32)
+
+    seen = bytearray(grid.size)
+    lengths = array("i")
+    index = degree.find(2)
+    while index != -1:
+        if not seen[index]:
+            seen[index] = 1
+            stack = [index]
+            length = 0
+            while stack:
+                cell = stack.pop()
+                length += 1
+                mask = sides[cell]
+                for side, other in ((LEFT, cell - 1), (RIGHT, cell + 1),
+                                    (TOP, cell - cols), (BOTTOM, cell + cols)):
+                    if mask & side and degree[other] == 2 and not seen[other]:
+                        seen[other] = 1
+                        stack.append(other)
+            lengths.append(length)
+        index = degree.find(2, index + 1)
+    return lengths
+
+
+def analyze(grid, start=0, goal=None):
+    """
+    Compute the metrics of a maze.
+
+    Parameters:
+        grid (Grid): The maze to analyse.
+        start (int): The id of the entrance cell (default is the top-left cell).
+        goal (int, optional): The id of the exit cell (default is the bottom-right cell).
+
+    Returns:
+        Analysis: The per-cell arrays and a summary dict with the keys
+            cells, dead_ends, junctions, degree_histogram (cells with 0 to 4
+            passages), branching_factor (the mean number of onward choices at
+            a junction), corridors, mean_corridor_length, max_corridor_length,
+            reachable, max_distance, solution_length (cells on the shortest
+            path, 0 if the exit is unreachable) and tortuosity (shortest path
+            steps over the Manhattan distance between entrance and exit).
+    """
+    if goal is None:
+        goal = grid.size - 1
+    sides = grid.passages()
+    degree = sides.translate(PASSAGE_COUNT)
+    histogram = [degree.count(k) for k in range(5)]
+    distance = _distances(grid, sides, start)
+    corridors = _corridors(grid, sides, degree)
+
+    junctions = histogram[3] + histogram[4]
+    if np is not None:
+        reachable = int(np.count_nonzero(distance >= 0))
+        max_distance = int(distance.max())
+        degree = np.frombuffer(degree, dtype=np.uint8)
+        total_corridor = int(corridors.sum(dtype=np.int64))
+        longest_corridor = int(corridors.max()) if len(corridors) else 0
+    else:
+        reachable = grid.size - distance.count(-1)
+        max_distance = max(distance)
+        total_corridor = sum(corridors)
+        longest_corridor = max(corridors) if corridors else 0
+    steps = int(distance[goal])
+    start_i, start_j = grid.coords(start)
+    goal_i, goal_j = grid.coords(goal)
+    manhattan = abs(goal_i - start_i) + abs(goal_j - start_j)
+
+    summary = {
+        "cells": grid.size,
+        "dead_ends": histogram[1],
+        "junctions": junctions,
+        "degree_histogram": histogram,
+        "branching_factor": (2 * histogram[3] + 3 * histogram[4]) / junctions if junctions else 0.0,
+        "corridors": len(corridors),
+        "mean_corridor_length": total_corridor / len(corridors) if len(corridors) else 0.0,
+        "max_corridor_length": longest_corridor,
+        "reachable": reachable,
+        "max_distance": max_distance,
+        "solution_length": steps + 1 if steps >= 0 else 0,
+        "tortuosity": steps / manhattan if steps > 0 and manhattan else None,
+    }
+    return Analysis(degree, distance, corridors, summary)
@@ -0,0 +1,319 @@
+# -----------------------------------------------------------------------------
+# Module: Background
+# Description: Runs maze generation and solving on a worker thread or process
+# and feeds the results back to the display as compact batches of events.
+#
+# The worker builds and solves its own Grid and never shares it. Its events
+# are packed into flat integer arrays, three entries per event, and sent
+# through a queue. The display side polls the queue, for example from the Tk
+# event loop, applies the batches it receives within a time budget, so the
+# window stays responsive however large the maze is, and counts them to
+# report progress. A job can be cancelled at any time; the worker checks
+# for it between batches.
+# -----------------------------------------------------------------------------
+
+import itertools
+import multiprocessing
+import queue
+import random
+import threading
+import time
+from array import array
+from collections import namedtuple
+
+from events import WALL_REMOVED, CELL_VISITED, MOVE
+from generators import get_algorithm, remove_dead_ends
+from grid import Grid, TOP, BOTTOM
+import solvers
+
+# Messages sent by the worker.
+_EVENTS = "events"
+_DONE = "done"
+_CANCELLED = "cancelled"
+_ERROR = "error"
+
+JobSpec = namedtuple("JobSpec", "num_rows num_cols seed algorithm strategy walls braid",
+                     defaults=("backtracker", "dfs", None, 0.0))
+JobSpec.__doc__ = """
+The work of a background job: generate a num_rows x num_cols maze with the
+seed and algorithm, braided by removing the braid fraction of its dead ends,
+unless walls (the bytes of an already generated wall array) are given, then
+solve it with strategy unless that is None.
+"""
+
+Progress = namedtuple("Progress", "phase cells_carved passages nodes_expanded cells elapsed eta error",
+                      defaults=(None,))
+Progress.__doc__ = """
+How far a background job has got, as seen by the display. phase is
+"generating", "solving", "done" or "failed"; cells_carved counts the passages
+carved out of the passages a perfect maze of this size has; nodes_expanded
+counts the cells the search has reached out of cells. eta is the estimated
+number of seconds left, or None until it can be estimated. While solving it
+is an upper bound, assuming the search has to reach every cell. error is the
+worker's error message when the job failed.
+"""
+
+
+def _worker(spec, messages, cancel, batch_size, interval):
+    """
+    Run a job and send its events to the messages queue in batches.
+    """
+    try:
+        if spec.walls is None:
+            grid = Grid(spec.num_rows, spec.num_cols)
+            grid.set_wall(0, TOP, False)
+            grid.set_wall(grid.size - 1, BOTTOM, False)
+            rng = random.Random(spec.seed)
+            steps = get_algorithm(spec.algorithm)(grid, rng)
+            if spec.braid:
+                steps = itertools.chain(steps, remove_dead_ends(grid, rng, spec.braid))
+            phases = [("generating", steps)]
+        else:
+            grid = Grid(spec.num_rows, spec.num_cols, bytearray(spec.walls))
+            phases = []
+        if spec.strategy is not None:
+            phases.append(("solving", None))
+
+        result = None
+        for phase, steps in phases:
+            if steps is None:
+                grid.reset_visited()
+                steps = solvers.solve_steps(grid, 0, grid.size - 1, spec.strategy)
+            batch = array("i")
+            flush_at = time.perf_counter() + interval
+            while True:
+                try:
+                    batch.extend(next(steps))
+                except StopIteration as stop:
+                    result = stop.value
+                    break
+                if len(batch) >= 3 * batch_size or time.perf_counter() >= flush_at:
+                    if cancel.is_set():
+                        messages.put((_CANCELLED,))
+                        return
+                    messages.put((_EVENTS, phase, batch.tobytes()))
+                    batch = array("i")
+                    flush_at = time.perf_counter() + interval
+            messages.put((_EVENTS, phase, batch.tobytes()))
+        messages.put((_DONE, result))
+    except Exception as error:
+        messages.put((_ERROR, f"{type(error).__name__}: {error}"))
+
+
+class BackgroundJob():
+    """
+    A maze job running on a worker thread or process, with its events applied
+    on the calling thread by poll().
+    """
+
+    def __init__(self, spec, mode="thread", on_events=None, on_progress=None, on_done=None,
+                 batch_size=4096, interval=0.05):
+        """
+        Initialize the job; start() runs it.
+
+        Parameters:
+            spec (JobSpec): The work to do.
+            mode (str): "thread" or "process" (default is "thread").
+            on_events (callable, optional): Called from poll() with each
+                received batch, an array of kind, a, b triples.
+            on_progress (callable, optional): Called from poll() with the
+                latest Progress after each call that received something.
+            on_done (callable, optional): Called from poll() with the job's
+                SolveResult (None when nothing was solved) once it finishes.
+                It is not called when the worker fails: poll() and wait()
+                raise RuntimeError instead.
+            batch_size (int): The most events sent per batch (default is 4096).
+            interval (float): The longest time in seconds the worker holds on
+                to events before sending them (default is 0.05).
+        """
+        if mode not in ("thread", "process"):
+            raise ValueError(f"unknown mode {mode!r}, expected 'thread' or 'process'")
+        if spec.walls is None:
+            get_algorithm(spec.algorithm)
+        if spec.strategy is not None:
+            solvers.get_solver(spec.strategy)
+        self.spec = spec
+        self.mode = mode
+        self._on_events = on_events
+        self._on_progress = on_progress
+        self._on_done = on_done
+        self._batch_size = batch_size
+        self._interval = interval
+        if mode == "thread":
+            self._messages = queue.Queue()
+            self._cancel = threading.Event()
+        else:
+            context = multiprocessing.get_context()
+            self._messages = context.Queue()
+            self._cancel = context.Event()
+        self._worker = None
+        self._started = None
+        self._phase_started = None
+        self._phase = "generating" if spec.walls is None else "solving"
+        self._carved = 0
+        self._expanded = 0
+        self.done = False
+        self.cancelled = False
+        self.result = None
+        self.error = None
+
+    @property
+    def running(self):
+        """
+        True while the job has been started and has not finished, failed or
+        been cancelled.
+        """
+        return self._started is not None and not (self.done or self.cancelled or self.error)
+
+    def start(self):
+        """
+        Start the worker.
+
+        Returns:
+            BackgroundJob: The job itself.
+        """
+        args = (self.spec, self._messages, self._cancel, self._batch_size, self._interval)
+        if self.mode == "thread":
+            self._worker = threading.Thread(target=_worker, args=args, daemon=True)
+        else:
+            context = multiprocessing.get_context()
+            self._worker = context.Process(target=_worker, args=args, daemon=True)
+        self._started = self._phase_started = time.perf_counter()
+        self._worker.start()
+        return self
+
+    def cancel(self):
+        """
+        Stop the job. No further events are applied, and the worker stops at
+        its next batch.
+        """
+        if not self.running:
+            return
+        self.cancelled = True
+        self._cancel.set()
+
+    def progress(self):
+        """
+        Return the job's Progress as far as the applied events show.
+        """
+        size = self.spec.num_rows * self.spec.num_cols
+        passages = size - 1
+        if self._started is None:
+            return Progress(self._phase, 0, passages, 0, size, 0.0, None)
+        now = time.perf_counter()
+        # Extrapolate from the rate the current phase has progressed at.
+        in_phase = now - self._phase_started
+        eta = None
+        phase = self._phase
+        if self.done:
+            phase, eta = "done", 0.0
+        elif self.error:
+            phase = "failed"
+        elif phase == "generating" and self._carved:
+            eta = in_phase / self._carved * max(passages - self._carved, 0)
+        elif phase == "solving" and self._expanded:
+            eta = in_phase / self._expanded * max(size - self._expanded, 0)
+        return Progress(phase, self._carved, passages, self._expanded, size, now - self._started, eta,
+                        self.error)
+
+    def poll(self, time_budget=None):
+        """
+        Apply the batches the worker has sent so far.
+
+        Parameters:
+            time_budget (float, optional): Stop after this many seconds and
+                leave the remaining batches for the next call.
+
+        Returns:
+            bool: True while the job is still running.
+
+        Raises:
+            RuntimeError: If the worker failed, after the failure has been
+                reported to on_progress.
+        """
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        received = False
+        while self.running and (deadline is None or time.perf_counter() < deadline):
+            try:
+                message = self._messages.get_nowait()
+            except queue.Empty:
+                break
+            received = True
+            self._handle(message)
+        if received and self._on_progress is not None:
+            self._on_progress(self.progress())
+        if self.error:
+            raise RuntimeError(f"background job failed: {self.error}")
+        return self.running
+
+    def wait(self, timeout=None):
+        """
+        Block until the job finishes, applying its batches as they arrive.
+
+        Parameters:
+            timeout (float, optional): The longest time to wait, in seconds.
+
+        Returns:
+            object: The job's result, once done.
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while self.running:
+            remaining = None if deadline is None else deadline - time.perf_counter()
+            if remaining is not None and remaining <= 0:
+                break
+            try:
+                message = self._messages.get(timeout=remaining)
+            except queue.Empty:
+                break
+            self._handle(message)
+            if self._on_progress is not None:
+                self._on_progress(self.progress())
+        if self.error:
+            raise RuntimeError(f"background job failed: {self.error}")
+        return self.result
+
+    def _handle(self, message):
+        """
+        Apply one message from the worker.
+        """
+        kind = message[0]
+        if kind == _EVENTS:
+            _, phase, data = message
+            if phase != self._phase:
+                self._phase = phase
+                self._phase_started = time.perf_counter()
+            batch = array("i")
+            batch.frombytes(data)
+            kinds = batch[0::3]
+            if self._phase == "generating":
+                self._carved += kinds.count(WALL_REMOVED)
+            else:
+                self._expanded += kinds.count(CELL_VISITED) + kinds.count(MOVE)
+            if self._on_events is not None:
+                self._on_events(batch)
+        elif kind == _DONE:
+            self.done = True
+            self.result = message[1]
+            if self._on_done is not None:
+                self._on_done(self.result)
+        elif kind == _ERROR:
+            self.error = message[1]
+        elif kind == _CANCELLED:
+            self.cancelled = True
+
+
+def format_progress(progress):
+    """
+    Return a one-line description of a Progress, for a status display.
+    """
+    if progress.phase == "generating":
+        text = f"Generating: {progress.cells_carved:,}/{progress.passages:,} passages carved"
+    elif progress.phase == "solving":
+        text = f"Solving: {progress.nodes_expanded:,} cells reached"
+    elif progress.phase == "failed":
+        return f"Failed after {progress.elapsed:.1f}s: {progress.error}"
+    else:
+        return f"Done in {progress.elapsed:.1f}s"
+    if progress.eta is not None:
+        text += f", about {progress.eta:.0f}s left"
+    return text
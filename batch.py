@@ -0,0 +1,145 @@
+# -----------------------------------------------------------------------------
+# Module: Batch
+# Description: Generates and solves many seeded mazes across a pool of
+# worker processes.
+#
+# Every task builds its maze with its own random.Random(seed), so results
+# depend only on the specs and never on the number of workers or the order
+# tasks run in. Workers write their results into shared memory arrays set up
+# before the pool starts instead of sending pickled objects back: wall arrays
+# for generate_batch() and three integers per maze for solve_batch().
+# -----------------------------------------------------------------------------
+
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from generators import build
+from grid import Grid
+import solvers
+
+MazeSpec = namedtuple("MazeSpec", "num_rows num_cols seed algorithm", defaults=("backtracker",))
+MazeSpec.__doc__ = """
+The size, seed and generation algorithm of one maze in a batch.
+"""
+
+SolveStats = namedtuple("SolveStats", "path_length nodes_expanded peak_frontier")
+SolveStats.__doc__ = """
+The outcome of solving one maze in a batch. path_length counts the cells on
+the path from entrance to exit and is 0 if the exit cannot be reached.
+"""
+
+# The shared result arrays of the current batch, set in each worker process.
+_shared = {}
+
+
+def _init_worker(walls, stats):
+    """
+    Remember the shared result arrays in a worker process.
+    """
+    _shared["walls"] = walls
+    _shared["stats"] = stats
+
+
+def _generate_task(task):
+    """
+    Generate one maze and copy its walls into the shared wall array.
+    """
+    offset, spec = task
+    grid = build(*spec)
+    memoryview(_shared["walls"]).cast("B")[offset:offset + grid.size] = grid.walls
+
+
+def _solve_task(task):
+    """
+    Generate and solve one maze and store its statistics in the shared array.
+    """
+    position, spec, strategy = task
+    grid = build(*spec)
+    result = solvers.solve(grid, 0, grid.size - 1, strategy)
+    stats = _shared["stats"]
+    stats[3 * position] = len(result.path)
+    stats[3 * position + 1] = result.nodes_expanded
+    stats[3 * position + 2] = result.peak_frontier
+
+
+def _run(function, tasks, workers, walls=None, stats=None):
+    """
+    Run the tasks, in a process pool unless a single worker is asked for.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+    if workers <= 1:
+        _init_worker(walls, stats)
+        try:
+            for task in tasks:
+                function(task)
+        finally:
+            _shared.clear()
+        return
+    chunksize = max(1, len(tasks) // (4 * workers))
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(walls, stats)) as pool:
+        # Consume the results so that errors in the workers are raised here.
+        for _ in pool.map(function, tasks, chunksize=chunksize):
+            pass
+
+
+def _specs(specs):
+    """
+    Normalise specs given as MazeSpec or plain tuples.
+    """
+    return [MazeSpec(*spec) for spec in specs]
+
+
+def generate_batch(specs, workers=None):
+    """
+    Generate a batch of mazes in parallel.
+
+    Parameters:
+        specs (iterable): MazeSpec or (num_rows, num_cols, seed[, algorithm]) tuples.
+        workers (int, optional): The number of worker processes. Defaults to
+            the number of CPUs; 1 runs everything in this process.
+
+    Returns:
+        list: One Grid per spec, in order. The grids' walls are views onto a
+            single shared buffer rather than separate copies.
+    """
+    specs = _specs(specs)
+    offsets = []
+    total = 0
+    for spec in specs:
+        offsets.append(total)
+        total += spec.num_rows * spec.num_cols
+    walls = multiprocessing.RawArray("B", total)
+    _run(_generate_task, list(zip(offsets, specs)), workers, walls=walls)
+
+    view = memoryview(walls).cast("B")
+    grids = []
+    for offset, spec in zip(offsets, specs):
+        size = spec.num_rows * spec.num_cols
+        grids.append(Grid(spec.num_rows, spec.num_cols, view[offset:offset + size]))
+    return grids
+
+
+def solve_batch(specs, strategy="bfs", workers=None):
+    """
+    Generate and solve a batch of mazes in parallel, keeping only the statistics.
+
+    Parameters:
+        specs (iterable): MazeSpec or (num_rows, num_cols, seed[, algorithm]) tuples.
+        strategy (str): The solver to use, one of the keys of solvers.SOLVERS
+            (default is "bfs").
+        workers (int, optional): The number of worker processes. Defaults to
+            the number of CPUs; 1 runs everything in this process.
+
+    Returns:
+        list: One SolveStats per spec, in order.
+    """
+    solvers.get_solver(strategy)
+    specs = _specs(specs)
+    stats = multiprocessing.RawArray("q", 3 * len(specs))
+    tasks = [(position, spec, strategy) for position, spec in enumerate(specs)]
+    _run(_solve_task, tasks, workers, stats=stats)
+    return [SolveStats(*stats[3 * k:3 * k + 3]) for k in range(len(specs))]
@@ -0,0 +1,383 @@
+# -----------------------------------------------------------------------------
+# Module: Bench
+# Description: Benchmarks maze generation, solving and headless rendering over
+# a matrix of grid sizes and seeds.
+#
+# Each case is timed several times and its best time is kept, from which the
+# throughput in cells per second is derived. A second, untimed run under
+# tracemalloc records the peak and net Python allocations, and the process's
+# peak resident set size is read after every case. Results are written as
+# JSON so a run can be compared against a stored baseline:
+#
+#   python bench.py --sizes 16x12,256x256 --output base.json
+#   python bench.py --sizes 16x12,256x256 --baseline base.json --threshold 0.1
+#
+# Solvers are also timed on a braided copy of each maze, with a fraction of
+# its dead ends removed (--braid, BRAID by default, 0 to skip), as
+# "solve-braided/<strategy>" cases next to the "solve/<strategy>" ones on the
+# perfect maze, since loops change how much of the maze each strategy
+# explores. The fraction is part of each braided case, so only runs on the
+# same mazes are compared.
+#
+# The comparison exits with status 1 when any case's throughput drops by more
+# than the threshold fraction.
+# -----------------------------------------------------------------------------
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from events import drain
+from generators import ALGORITHMS, build, get_algorithm
+from grid import Grid, TOP, BOTTOM
+from maze import format_record, parse_size
+from render import TkRenderer
+import export
+import solvers
+
+SIZES = ((16, 12), (64, 48), (256, 192), (1024, 768), (4096, 4096))
+SEEDS = (0, 1, 2)
+RENDERERS = ("png", "canvas")
+# The fraction of dead ends removed for the braided solver cases.
+BRAID = 0.5
+FORMAT_VERSION = 1
+
+
+class _NullCanvas():
+    """
+    A canvas that hands out item ids and draws nothing, so the renderer's own
+    bookkeeping can be timed without a display.
+    """
+
+    def __init__(self):
+        self._next_item = 0
+
+    def create_line(self, *coords, **options):
+        self._next_item += 1
+        return self._next_item
+
+    def coords(self, item, *coords):
+        pass
+
+    def itemconfig(self, item, **options):
+        pass
+
+    def delete(self, item):
+        pass
+
+
+class _NullWindow():
+    """
+    A window with a _NullCanvas that never refreshes.
+    """
+
+    def __init__(self):
+        self.canvas = _NullCanvas()
+
+    def redraw(self):
+        pass
+
+
+def peak_rss():
+    """
+    Return the peak resident set size of this process in kilobytes, or None
+    where the platform does not report it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, other platforms kilobytes.
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _fresh_grid(num_rows, num_cols):
+    """
+    Return an uncarved grid with the entrance and exit open, as build() starts from.
+    """
+    grid = Grid(num_rows, num_cols)
+    grid.set_wall(0, TOP, False)
+    grid.set_wall(grid.size - 1, BOTTOM, False)
+    return grid
+
+
+def _generate_case(num_rows, num_cols, seed, algorithm):
+    """
+    Return (setup, run) callables that time one maze generation.
+    """
+    generate = get_algorithm(algorithm)
+    state = {}
+
+    def setup():
+        state["grid"] = _fresh_grid(num_rows, num_cols)
+
+    def run():
+        drain(generate(state["grid"], random.Random(seed)))
+
+    return setup, run
+
+
+def _solve_case(grid, strategy):
+    """
+    Return (setup, run) callables that time one solve of a generated maze,
+    without events as solvers.solve() runs it when nothing is drawn.
+    """
+    solver = solvers.get_solver(strategy)
+
+    def run():
+        drain(solver(grid, 0, grid.size - 1, events=False))
+
+    return grid.reset_visited, run
+
+
+def _render_case(grid, renderer):
+    """
+    Return (setup, run) callables that time one headless rendering of a maze:
+    "png" rasterises it to a PNG written to the null device, "canvas" feeds
+    its walls through a TkRenderer drawing onto a _NullCanvas.
+    """
+    def png():
+        rows = (grid.walls[j * grid.num_cols:(j + 1) * grid.num_cols]
+                for j in range(grid.num_rows))
+        width = grid.num_cols * 4 + 1
+        height = grid.num_rows * 4 + 1
+        with open(os.devnull, "wb") as file:
+            export.write_png_rows(file, width, height,
+                                  export.pixel_rows(grid.num_rows, grid.num_cols, rows, 4, 4, 1),
+                                  level=1)
+
+    def canvas():
+        TkRenderer(_NullWindow(), fps=None).begin(grid, 0, 0, 4, 4)
+
+    if renderer == "png":
+        return None, png
+    if renderer == "canvas":
+        return None, canvas
+    raise ValueError(f"unknown renderer {renderer!r}, expected one of {', '.join(RENDERERS)}")
+
+
+def measure(setup, run, repeat=3, trace=True):
+    """
+    Time a benchmark case.
+
+    Parameters:
+        setup (callable, optional): Called untimed before every run.
+        run (callable): The code to time.
+        repeat (int): The number of timed runs; the best is kept.
+        trace (bool): Make one more run under tracemalloc to record allocations.
+
+    Returns:
+        dict: seconds (the best time), alloc_peak_bytes and alloc_net_bytes
+            (None when trace is False) and peak_rss_kb.
+    """
+    best = None
+    for _ in range(max(1, repeat)):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best:
+            best = elapsed
+
+    alloc_peak = alloc_net = None
+    if trace:
+        if setup is not None:
+            setup()
+        tracemalloc.start()
+        try:
+            run()
+            current, alloc_peak = tracemalloc.get_traced_memory()
+            alloc_net = current
+        finally:
+            tracemalloc.stop()
+    return {
+        "seconds": best,
+        "alloc_peak_bytes": alloc_peak,
+        "alloc_net_bytes": alloc_net,
+        "peak_rss_kb": peak_rss(),
+    }
+
+
+def run_benchmarks(sizes=SIZES, seeds=SEEDS, algorithms=None, strategies=None,
+                   renderers=RENDERERS, repeat=3, trace=True, log=None, braid=BRAID):
+    """
+    Run every benchmark case of the matrix.
+
+    Parameters:
+        sizes (iterable): (num_cols, num_rows) pairs.
+        seeds (iterable): The seeds to generate each maze with.
+        algorithms (iterable, optional): Generation algorithms to time
+            (default is all of ALGORITHMS). Solvers and renderers run on
+            mazes made with the first one.
+        strategies (iterable, optional): Solving strategies to time (default
+            is all of solvers.SOLVERS).
+        renderers (iterable): Headless renderers to time, from RENDERERS.
+        repeat (int): The number of timed runs per case.
+        trace (bool): Record allocations with tracemalloc.
+        log (callable, optional): Called with each result as it completes.
+        braid (float): Also time the solvers on the same mazes braided by
+            removing this fraction of their dead ends (default is BRAID, 0.5;
+            0 times perfect mazes only).
+
+    Returns:
+        list: One dict per case with its name ("generate/kruskal",
+            "solve/bfs", "solve-braided/bfs", "render/png", ...), num_cols, num_rows, seed,
+            cells, cells_per_sec and the measurements of measure(). Braided
+            cases also hold the braid fraction.
+    """
+    algorithms = list(algorithms or ALGORITHMS)
+    strategies = list(strategies or solvers.SOLVERS)
+    results = []
+
+    def record(name, num_cols, num_rows, seed, setup, run, **extra):
+        result = {"name": name, "num_cols": num_cols, "num_rows": num_rows, "seed": seed,
+                  "cells": num_cols * num_rows}
+        result.update(extra)
+        result.update(measure(setup, run, repeat, trace))
+        result["cells_per_sec"] = result["cells"] / result["seconds"] if result["seconds"] else None
+        results.append(result)
+        if log is not None:
+            log(result)
+
+    for num_cols, num_rows in sizes:
+        for seed in seeds:
+            for algorithm in algorithms:
+                record(f"generate/{algorithm}", num_cols, num_rows, seed,
+                       *_generate_case(num_rows, num_cols, seed, algorithm))
+            grid = build(num_rows, num_cols, seed, algorithms[0])
+            for strategy in strategies:
+                record(f"solve/{strategy}", num_cols, num_rows, seed, *_solve_case(grid, strategy))
+            if braid:
+                braided = build(num_rows, num_cols, seed, algorithms[0], braid)
+                for strategy in strategies:
+                    record(f"solve-braided/{strategy}", num_cols, num_rows, seed,
+                           *_solve_case(braided, strategy), braid=braid)
+            for renderer in renderers:
+                record(f"render/{renderer}", num_cols, num_rows, seed, *_render_case(grid, renderer))
+    return results
+
+
+def case_key(result):
+    """
+    Return the key that matches a result with its baseline counterpart.
+    """
+    return result["name"], result["num_cols"], result["num_rows"], result["seed"], result.get("braid")
+
+
+def compare(results, baseline, threshold=0.1):
+    """
+    Compare results against a baseline run.
+
+    Parameters:
+        results (list): Results of run_benchmarks().
+        baseline (list): Results of an earlier run. Cases missing from either
+            run are ignored.
+        threshold (float): The largest tolerated drop in throughput, as a
+            fraction of the baseline (default is 0.1, 10%).
+
+    Returns:
+        list: (result, baseline_result, change) for every case whose
+            throughput dropped by more than the threshold, where change is
+            the relative change in cells per second (negative when slower).
+    """
+    previous = {case_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(case_key(result))
+        if before is None or not before["cells_per_sec"] or result["cells_per_sec"] is None:
+            continue
+        change = result["cells_per_sec"] / before["cells_per_sec"] - 1
+        if change < -threshold:
+            regressions.append((result, before, change))
+    return regressions
+
+
+def _format(result):
+    """
+    Return a one-line summary of a result.
+    """
+    allocated = result["alloc_peak_bytes"]
+    return "{:<26} {:>5}x{:<5} seed {:<3} {:>10.4f}s {:>14,.0f} cells/s {:>12} peak alloc {:>10} KiB RSS".format(
+        result["name"], result["num_cols"], result["num_rows"], result["seed"], result["seconds"],
+        result["cells_per_sec"] or 0, "-" if allocated is None else f"{allocated // 1024:,} KiB",
+        "-" if result["peak_rss_kb"] is None else f"{result['peak_rss_kb']:,}")
+
+
+def main(argv=None):
+    """
+    Run the benchmarks from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark maze generation, solving and rendering.")
+    parser.add_argument("--sizes", type=lambda text: [parse_size(part) for part in text.split(",")],
+                        default=list(SIZES), help="comma-separated COLSxROWS sizes (default: 16x12 up to 4096x4096)")
+    parser.add_argument("--seeds", type=lambda text: [int(part) for part in text.split(",")],
+                        default=list(SEEDS), help="comma-separated seeds")
+    parser.add_argument("--algorithms", type=lambda text: text.split(","), default=None,
+                        help="comma-separated generation algorithms (default: all)")
+    parser.add_argument("--strategies", type=lambda text: text.split(","), default=None,
+                        help="comma-separated solving strategies (default: all)")
+    parser.add_argument("--braid", type=float, default=BRAID,
+                        help="also time the solvers on mazes with this fraction of dead ends "
+                             f"removed, 0 to skip (default: {BRAID})")
+    parser.add_argument("--renderers", type=lambda text: [part for part in text.split(",") if part],
+                        default=list(RENDERERS), help="comma-separated headless renderers")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case, the best is kept")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="skip the allocation tracing run")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against the results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="tolerated throughput drop against the baseline, as a fraction")
+    parser.add_argument("--format", choices=("table", "jsonl"), default="table",
+                        help="print each result as a table row or as a JSON line")
+    args = parser.parse_args(argv)
+
+    try:
+        for algorithm in args.algorithms or ():
+            get_algorithm(algorithm)
+        for strategy in args.strategies or ():
+            solvers.get_solver(strategy)
+        for renderer in args.renderers:
+            _render_case(None, renderer)
+    except ValueError as error:
+        parser.error(str(error))
+
+    show = _format if args.format == "table" else format_record
+    results = run_benchmarks(args.sizes, args.seeds, args.algorithms, args.strategies,
+                             args.renderers, args.repeat, not args.no_tracemalloc,
+                             log=lambda result: print(show(result), flush=True), braid=args.braid)
+    if args.output:
+        report = {
+            "version": FORMAT_VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results,
+        }
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for result, before, change in regressions:
+            print(f"REGRESSION {result['name']} {result['num_cols']}x{result['num_rows']} "
+                  f"seed {result['seed']}: {before['cells_per_sec']:,.0f} -> "
+                  f"{result['cells_per_sec']:,.0f} cells/s ({change:+.1%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
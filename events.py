@@ -0,0 +1,43 @@
+# -----------------------------------------------------------------------------
+# Module: Events
+# Description: The stream of events that maze generation and solving emit.
+#
+# Generation algorithms and solvers are generator functions that yield
+# events as (kind, a, b) tuples and leave all drawing to whoever consumes
+# them. The meaning of a and b depends on the kind:
+#
+#   (WALL_REMOVED, index, side)    the wall on one side of a cell was removed
+#   (CELL_VISITED, index, parent)  a search reached a cell, coming from parent
+#                                  (-1 when it has none)
+#   (MOVE, from_index, to_index)   a solver moved forward between two cells
+#   (UNDO, from_index, to_index)   a solver backed out of to_index
+#   (WALL_ADDED, index, side)      a wall was put back on one side of a cell
+# -----------------------------------------------------------------------------
+
+from collections import deque
+
+WALL_REMOVED = 0
+CELL_VISITED = 1
+MOVE = 2
+UNDO = 3
+WALL_ADDED = 4
+
+
+def drain(steps):
+    """
+    Run an event generator to completion as fast as possible, discarding its
+    events.
+
+    Parameters:
+        steps (iterator): The event generator.
+
+    Returns:
+        object: The value the generator returned.
+    """
+    result = []
+
+    def capture():
+        result.append((yield from steps))
+
+    deque(capture(), maxlen=0)
+    return result[0]
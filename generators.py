@@ -0,0 +1,436 @@
+# -----------------------------------------------------------------------------
+# Module: Generators
+# Description: Iterative maze generation algorithms that carve passages into
+# a Grid. None of them recurse, so they work on grids of any size.
+#
+# Every algorithm is a Python generator function taking (grid, rng) that
+# carves walls in place and yields a (WALL_REMOVED, index, side) event for
+# each passage it opens, so a renderer can draw the maze as it takes shape,
+# or events.drain() can run it at full speed. rng is a random.Random instance.
+# Those that write to the wall array directly, rather than through
+# grid.carve(), call grid.walls_changed() once they are done.
+#
+# They all carve perfect mazes, spanning trees with exactly one route between
+# any two cells. remove_dead_ends() is a separate stage that can follow any
+# of them: it braids the maze, opening loops by removing dead ends, so there
+# are several routes to choose from.
+# -----------------------------------------------------------------------------
+
+import random
+from array import array
+
+from events import WALL_REMOVED, drain
+from grid import Grid, LEFT, RIGHT, TOP, BOTTOM, ALL_WALLS, PASSAGE_COUNT
+
+
+def backtracker(grid, rng, start=0):
+    """
+    Generate a maze with depth-first backtracking driven by an explicit stack.
+    The random choices are made in the same order as the original recursive
+    version, so a given seed produces the same maze.
+
+    Parameters:
+        grid (Grid): The grid to carve.
+        rng (random.Random): The source of randomness.
+        start (int): The id of the cell to start from.
+    """
+    cols = grid.num_cols
+    size = grid.size
+    walls = grid.walls
+    choice = rng.choice
+    seen = bytearray(size)
+    seen[start] = 1
+    stack = array("i", [start])
+    while stack:
+        index = stack[-1]
+        i = index % cols
+        new_list = []
+        # Check left, right, upper and lower neighbours in that order.
+        if i > 0 and not seen[index - 1]:
+            new_list.append(LEFT)
+        if i < cols - 1 and not seen[index + 1]:
+            new_list.append(RIGHT)
+        if index >= cols and not seen[index - cols]:
+            new_list.append(TOP)
+        if index < size - cols and not seen[index + cols]:
+            new_list.append(BOTTOM)
+
+        # No unvisited neighbours left: back out of this cell.
+        if not new_list:
+            stack.pop()
+            continue
+
+        side = choice(new_list)
+        if side == LEFT:
+            next_index = index - 1
+            walls[index] &= ALL_WALLS & ~LEFT
+            walls[next_index] &= ALL_WALLS & ~RIGHT
+        elif side == RIGHT:
+            next_index = index + 1
+            walls[index] &= ALL_WALLS & ~RIGHT
+            walls[next_index] &= ALL_WALLS & ~LEFT
+        elif side == TOP:
+            next_index = index - cols
+            walls[index] &= ALL_WALLS & ~TOP
+            walls[next_index] &= ALL_WALLS & ~BOTTOM
+        else:
+            next_index = index + cols
+            walls[index] &= ALL_WALLS & ~BOTTOM
+            walls[next_index] &= ALL_WALLS & ~TOP
+        seen[next_index] = 1
+        stack.append(next_index)
+        yield WALL_REMOVED, index, side
+    grid.walls_changed()
+
+
+def kruskal(grid, rng):
+    """
+    Generate a maze with randomized Kruskal: visit every interior wall in a
+    random order and remove it when the cells on either side are not yet
+    connected, tracked with a union-find over cell ids.
+
+    Parameters:
+        grid (Grid): The grid to carve.
+        rng (random.Random): The source of randomness.
+    """
+    cols = grid.num_cols
+    size = grid.size
+    walls = grid.walls
+    # Edge e joins cell e >> 1 with its right (even e) or lower (odd e) neighbour.
+    edges = array("i")
+    for index in range(size):
+        if index % cols < cols - 1:
+            edges.append(index << 1)
+        if index < size - cols:
+            edges.append((index << 1) | 1)
+    rng.shuffle(edges)
+
+    parent = array("i", range(size))
+    rank = bytearray(size)
+    remaining = size - 1
+    for edge in edges:
+        a = edge >> 1
+        b = a + cols if edge & 1 else a + 1
+        # Find both roots, halving the paths on the way.
+        root_a = a
+        while parent[root_a] != root_a:
+            parent[root_a] = parent[parent[root_a]]
+            root_a = parent[root_a]
+        root_b = b
+        while parent[root_b] != root_b:
+            parent[root_b] = parent[parent[root_b]]
+            root_b = parent[root_b]
+        if root_a == root_b:
+            continue
+
+        # Union by rank.
+        if rank[root_a] < rank[root_b]:
+            root_a, root_b = root_b, root_a
+        parent[root_b] = root_a
+        if rank[root_a] == rank[root_b]:
+            rank[root_a] += 1
+
+        if edge & 1:
+            walls[a] &= ALL_WALLS & ~BOTTOM
+            walls[b] &= ALL_WALLS & ~TOP
+            yield WALL_REMOVED, a, BOTTOM
+        else:
+            walls[a] &= ALL_WALLS & ~RIGHT
+            walls[b] &= ALL_WALLS & ~LEFT
+            yield WALL_REMOVED, a, RIGHT
+        remaining -= 1
+        if not remaining:
+            break
+    grid.walls_changed()
+
+
+def prim(grid, rng, start=0):
+    """
+    Generate a maze with randomized Prim: grow the maze from one cell by
+    repeatedly picking a random frontier cell and joining it to a random
+    neighbour that is already part of the maze.
+
+    Parameters:
+        grid (Grid): The grid to carve.
+        rng (random.Random): The source of randomness.
+        start (int): The id of the cell to start from.
+    """
+    cols = grid.num_cols
+    size = grid.size
+    randbelow = rng.randrange
+    choice = rng.choice
+    # 0 = untouched, 1 = on the frontier, 2 = part of the maze.
+    state = bytearray(size)
+    frontier = array("i")
+
+    def add(index):
+        state[index] = 2
+        i = index % cols
+        for neighbour, inside in ((index - 1, i > 0), (index + 1, i < cols - 1),
+                                  (index - cols, index >= cols), (index + cols, index < size - cols)):
+            if inside and not state[neighbour]:
+                state[neighbour] = 1
+                frontier.append(neighbour)
+
+    add(start)
+    while frontier:
+        # Remove a random frontier cell by swapping in the last one.
+        k = randbelow(len(frontier))
+        index = frontier[k]
+        frontier[k] = frontier[-1]
+        frontier.pop()
+
+        i = index % cols
+        options = []
+        if i > 0 and state[index - 1] == 2:
+            options.append(LEFT)
+        if i < cols - 1 and state[index + 1] == 2:
+            options.append(RIGHT)
+        if index >= cols and state[index - cols] == 2:
+            options.append(TOP)
+        if index < size - cols and state[index + cols] == 2:
+            options.append(BOTTOM)
+        side = choice(options)
+        grid.carve(index, side)
+        add(index)
+        yield WALL_REMOVED, index, side
+
+
+class EllerRows():
+    """
+    Eller's algorithm as a stream of rows. Only the set labels of the current
+    row are kept, so memory grows with the number of columns and not with the
+    number of rows, and the height of the maze need not be known in advance.
+    """
+
+    def __init__(self, num_cols, rng):
+        """
+        Initialize the stream.
+
+        Parameters:
+            num_cols (int): The number of columns in the maze.
+            rng (random.Random): The source of randomness.
+        """
+        self.num_cols = num_cols
+        self._rng = rng
+        # Set labels stay below 2 * cols: carried sets are named after their
+        # leftmost column, fresh cells after cols + their column.
+        self._labels = list(range(num_cols))
+
+    def carve_row(self, last=False):
+        """
+        Decide the passages of the next row. Neighbours in different sets are
+        joined at random, then every set extends at least one passage
+        downwards; the last row instead joins all remaining sets.
+
+        Parameters:
+            last (bool): Whether this is the last row of the maze.
+
+        Returns:
+            list: (column, side) pairs in the order they were carved, where
+                side is RIGHT (a passage to the next column) or BOTTOM (a
+                passage to the row below).
+        """
+        cols = self.num_cols
+        labels = self._labels
+        random = self._rng.random
+        parent = list(range(2 * cols))
+        carved = []
+
+        def find(label):
+            while parent[label] != label:
+                parent[label] = parent[parent[label]]
+                label = parent[label]
+            return label
+
+        # Join neighbouring cells that belong to different sets.
+        for k in range(cols - 1):
+            a = find(labels[k])
+            b = find(labels[k + 1])
+            if a != b and (last or random() < 0.5):
+                parent[b] = a
+                carved.append((k, RIGHT))
+        if last:
+            return carved
+
+        # Group the columns of the row by set, keeping column order.
+        groups = {}
+        for k in range(cols):
+            groups.setdefault(find(labels[k]), []).append(k)
+
+        # Every set extends downwards at least once.
+        labels = [cols + k for k in range(cols)]
+        for members in groups.values():
+            down = [k for k in members if random() < 0.5]
+            if not down:
+                down = [self._rng.choice(members)]
+            for k in down:
+                labels[k] = members[0]
+                carved.append((k, BOTTOM))
+        self._labels = labels
+        return carved
+
+
+def eller(grid, rng):
+    """
+    Generate a maze with Eller's algorithm, one row at a time (see EllerRows).
+
+    Parameters:
+        grid (Grid): The grid to carve.
+        rng (random.Random): The source of randomness.
+    """
+    cols = grid.num_cols
+    rows = grid.num_rows
+    walls = grid.walls
+    stream = EllerRows(cols, rng)
+    for j in range(rows):
+        base = j * cols
+        for k, side in stream.carve_row(j == rows - 1):
+            if side == RIGHT:
+                walls[base + k] &= ALL_WALLS & ~RIGHT
+                walls[base + k + 1] &= ALL_WALLS & ~LEFT
+            else:
+                walls[base + k] &= ALL_WALLS & ~BOTTOM
+                walls[base + cols + k] &= ALL_WALLS & ~TOP
+            yield WALL_REMOVED, base + k, side
+    grid.walls_changed()
+
+
+def wilson(grid, rng):
+    """
+    Generate a uniform spanning tree maze with Wilson's algorithm: from each
+    cell outside the maze, take a random walk until it hits the maze, erase
+    the loops and carve the remaining path.
+
+    Parameters:
+        grid (Grid): The grid to carve.
+        rng (random.Random): The source of randomness.
+    """
+    cols = grid.num_cols
+    size = grid.size
+    choice = rng.choice
+    in_maze = bytearray(size)
+    # The side each walk last left a cell through. Overwriting it when the
+    # walk returns to a cell erases the loop it made.
+    exit_side = bytearray(size)
+
+    root = rng.randrange(size)
+    in_maze[root] = 1
+    for start in range(size):
+        if in_maze[start]:
+            continue
+        # Random walk until the maze is reached.
+        index = start
+        while not in_maze[index]:
+            i = index % cols
+            options = []
+            if i > 0:
+                options.append(LEFT)
+            if i < cols - 1:
+                options.append(RIGHT)
+            if index >= cols:
+                options.append(TOP)
+            if index < size - cols:
+                options.append(BOTTOM)
+            side = choice(options)
+            exit_side[index] = side
+            index = grid.neighbour(index, side)
+
+        # Carve the loop-erased path into the maze.
+        index = start
+        while not in_maze[index]:
+            in_maze[index] = 1
+            other = grid.carve(index, exit_side[index])
+            yield WALL_REMOVED, index, exit_side[index]
+            index = other
+
+
+def remove_dead_ends(grid, rng, fraction=1.0):
+    """
+    Open loops in a generated maze by removing dead ends. The dead ends are
+    taken in a random order and each one that is still a dead end is removed
+    with the given probability, by knocking down one of its walls. Walls
+    leading to another dead end are preferred, so one removal clears both.
+
+    Parameters:
+        grid (Grid): The generated grid to braid.
+        rng (random.Random): The source of randomness.
+        fraction (float): The fraction of dead ends to remove, from 0 (a
+            perfect maze) to 1 (no dead ends left) (default is 1.0).
+    """
+    degree = bytearray(grid.passages().translate(PASSAGE_COUNT))
+    dead_ends = array("i")
+    index = degree.find(1)
+    while index != -1:
+        dead_ends.append(index)
+        index = degree.find(1, index + 1)
+    rng.shuffle(dead_ends)
+    walls = grid.walls
+    neighbour = grid.neighbour
+    for index in dead_ends:
+        if degree[index] != 1 or rng.random() >= fraction:
+            continue
+        closed = [side for side in (LEFT, RIGHT, TOP, BOTTOM)
+                  if walls[index] & side and neighbour(index, side) != -1]
+        if not closed:
+            continue
+        paired = [side for side in closed if degree[neighbour(index, side)] == 1]
+        side = rng.choice(paired or closed)
+        other = grid.carve(index, side)
+        degree[index] += 1
+        degree[other] += 1
+        yield WALL_REMOVED, index, side
+
+
+# Registry of the available algorithms, selectable by name.
+ALGORITHMS = {
+    "backtracker": backtracker,
+    "kruskal": kruskal,
+    "prim": prim,
+    "eller": eller,
+    "wilson": wilson,
+}
+
+
+def get_algorithm(name):
+    """
+    Look up a generation algorithm by name.
+
+    Parameters:
+        name (str): One of the keys of ALGORITHMS.
+
+    Returns:
+        function: The generator function implementing the algorithm.
+    """
+    try:
+        return ALGORITHMS[name]
+    except KeyError:
+        raise ValueError(
+            f"unknown maze algorithm {name!r}, expected one of {', '.join(ALGORITHMS)}") from None
+
+
+def build(num_rows, num_cols, seed=None, algorithm="backtracker", braid=0.0):
+    """
+    Generate a maze without drawing it: the same walls Maze() produces for the
+    same seed, algorithm and braiding, with the entrance and exit open.
+
+    Parameters:
+        num_rows (int): The number of rows in the maze.
+        num_cols (int): The number of columns in the maze.
+        seed (int, optional): Seed for reproducible generation.
+        algorithm (str): One of the keys of ALGORITHMS (default is "backtracker").
+        braid (float): The fraction of dead ends remove_dead_ends() removes
+            afterwards (default is 0.0, a perfect maze).
+
+    Returns:
+        Grid: The generated grid.
+    """
+    generate = get_algorithm(algorithm)
+    grid = Grid(num_rows, num_cols)
+    grid.set_wall(0, TOP, False)
+    grid.set_wall(grid.size - 1, BOTTOM, False)
+    rng = random.Random(seed)
+    drain(generate(grid, rng))
+    if braid:
+        drain(remove_dead_ends(grid, rng, braid))
+    return grid
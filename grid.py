@@ -0,0 +1,401 @@
+# -----------------------------------------------------------------------------
+# Module: Grid
+# Description: A compact, headless storage backend for the maze. Walls are
+# kept as a 4-bit mask per cell in a flat bytearray and the visited state as
+# a separate bitset, so that large mazes do not need one Python object per
+# cell. Cells are addressed by an integer id laid out row by row:
+# index = j * num_cols + i, where i is the column and j is the row.
+#
+# A grid can also carry a traversal cost per cell, the cost of stepping into
+# it, as a bytearray of values from 1 to MAX_COST. Without costs every step
+# costs 1, and only the weighted solvers read them.
+# -----------------------------------------------------------------------------
+
+import hashlib
+
+# Wall bits stored in each cell's mask.
+LEFT = 1
+RIGHT = 2
+TOP = 4
+BOTTOM = 8
+ALL_WALLS = LEFT | RIGHT | TOP | BOTTOM
+
+# The wall on the other side of a shared edge.
+OPPOSITE = {LEFT: RIGHT, RIGHT: LEFT, TOP: BOTTOM, BOTTOM: TOP}
+
+# The largest traversal cost a cell can have.
+MAX_COST = 255
+
+# The number of sides set in a mask, for translating passages() into the
+# number of open passages of each cell.
+PASSAGE_COUNT = bytes(bin(mask & ALL_WALLS).count("1") for mask in range(256))
+
+# Translation tables from a wall mask to 1 where the wall on a side is
+# present and 0 where it is open, for scanning rows of masks with bytes
+# operations.
+HAS_LEFT = bytes(1 if mask & LEFT else 0 for mask in range(256))
+HAS_RIGHT = bytes(1 if mask & RIGHT else 0 for mask in range(256))
+HAS_TOP = bytes(1 if mask & TOP else 0 for mask in range(256))
+HAS_BOTTOM = bytes(1 if mask & BOTTOM else 0 for mask in range(256))
+
+# Translation tables: the sides without a wall, and a mask with a side cleared.
+_OPEN_SIDES = bytes(~mask & ALL_WALLS for mask in range(256))
+_CLEAR_TOP = bytes(mask & ~TOP for mask in range(256))
+_CLEAR_BOTTOM = bytes(mask & ~BOTTOM for mask in range(256))
+# The number of cells passages() computes at once.
+_PASSAGE_BLOCK = 1 << 20
+# A non-zero flag turned into bit b of a byte, for packing flags into a Bitset.
+_SHIFTS = [bytes((1 << bit) if value else 0 for value in range(256)) for bit in range(8)]
+
+
+def wall_runs(flags):
+    """
+    Yield the (start, end) index ranges of consecutive 1 bytes in flags, such
+    as a row of masks translated with HAS_TOP, so a line of adjacent walls can
+    be drawn as one.
+    """
+    end = 0
+    while True:
+        start = flags.find(1, end)
+        if start == -1:
+            return
+        end = flags.find(0, start)
+        if end == -1:
+            end = len(flags)
+        yield start, end
+
+
+class Bitset():
+    """
+    A fixed-size set of non-negative integers stored as packed bits.
+    """
+
+    def __init__(self, size):
+        """
+        Initialize an empty bitset.
+
+        Parameters:
+            size (int): The number of bits the set can hold.
+        """
+        self.size = size
+        self._bits = bytearray((size + 7) >> 3)
+
+    def __contains__(self, index):
+        return (self._bits[index >> 3] >> (index & 7)) & 1 == 1
+
+    def add(self, index):
+        """
+        Set the bit for the given index.
+        """
+        self._bits[index >> 3] |= 1 << (index & 7)
+
+    def discard(self, index):
+        """
+        Clear the bit for the given index.
+        """
+        self._bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    def clear(self):
+        """
+        Clear every bit in the set.
+        """
+        self._bits = bytearray(len(self._bits))
+
+    def update(self, flags):
+        """
+        Set the bit of every index whose byte in flags is non-zero.
+
+        Parameters:
+            flags (bytes-like): One byte per index, such as the seen array
+                of a search.
+        """
+        flags = bytes(flags[:self.size]).ljust(len(self._bits) << 3, b"\0")
+        # Gather every eighth flag into one bit position of the packed bytes.
+        packed = 0
+        for bit in range(8):
+            packed |= int.from_bytes(flags[bit::8].translate(_SHIFTS[bit]), "little")
+        packed |= int.from_bytes(self._bits, "little")
+        self._bits = bytearray(packed.to_bytes(len(self._bits), "little"))
+
+    def count(self):
+        """
+        Return the number of bits that are set.
+        """
+        return int.from_bytes(self._bits, "little").bit_count()
+
+
+class Grid():
+    """
+    Stores the walls and visited flags of a num_rows x num_cols maze.
+    Every cell starts with all four walls intact and unvisited.
+    """
+
+    def __init__(self, num_rows, num_cols, walls=None, costs=None):
+        """
+        Initialize the grid.
+
+        Parameters:
+            num_rows (int): The number of rows in the grid.
+            num_cols (int): The number of columns in the grid.
+            walls (bytearray, optional): An existing wall array of
+                num_rows * num_cols masks to use instead of a fresh one. Any
+                writable buffer of bytes works, such as a memoryview of an mmap.
+            costs (bytearray, optional): The traversal cost of every cell,
+                from 1 to MAX_COST. Without it every cell costs 1.
+        """
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.size = num_rows * num_cols
+        if walls is None:
+            walls = bytearray([ALL_WALLS]) * self.size
+        elif len(walls) != self.size:
+            raise ValueError(
+                f"wall array holds {len(walls)} cells, expected {self.size}")
+        self.walls = walls
+        if costs is not None:
+            if len(costs) != self.size:
+                raise ValueError(f"cost array holds {len(costs)} cells, expected {self.size}")
+            if costs and min(costs) < 1:
+                raise ValueError(f"cell costs must be from 1 to {MAX_COST}")
+        self.costs = costs
+        self.visited = Bitset(self.size)
+        # The passages() mask and the digest(), computed on first use and
+        # dropped whenever the walls change.
+        self._passages = None
+        self._digest = None
+
+    def index(self, i, j):
+        """
+        Return the cell id for column i and row j.
+        """
+        return j * self.num_cols + i
+
+    def coords(self, index):
+        """
+        Return the (column, row) position of a cell id.
+        """
+        j, i = divmod(index, self.num_cols)
+        return i, j
+
+    def neighbour(self, index, side):
+        """
+        Return the id of the cell across the given side, or -1 if that side
+        lies on the border of the grid.
+
+        Parameters:
+            index (int): The cell id.
+            side (int): One of LEFT, RIGHT, TOP or BOTTOM.
+
+        Raises:
+            ValueError: If side is not one of the four sides.
+        """
+        i = index % self.num_cols
+        if side == LEFT:
+            return index - 1 if i > 0 else -1
+        if side == RIGHT:
+            return index + 1 if i < self.num_cols - 1 else -1
+        if side == TOP:
+            return index - self.num_cols if index >= self.num_cols else -1
+        if side == BOTTOM:
+            return index + self.num_cols if index < self.size - self.num_cols else -1
+        raise ValueError(f"side must be one of LEFT, RIGHT, TOP or BOTTOM, not {side!r}")
+
+    def open_neighbours(self, index):
+        """
+        Return the ids of the neighbouring cells reachable from a cell without
+        crossing a wall, in left, right, up, down order.
+        """
+        mask = self.walls[index]
+        cols = self.num_cols
+        neighbours = []
+        if not mask & LEFT and index % cols > 0:
+            neighbours.append(index - 1)
+        if not mask & RIGHT and index % cols < cols - 1:
+            neighbours.append(index + 1)
+        if not mask & TOP and index >= cols:
+            neighbours.append(index - cols)
+        if not mask & BOTTOM and index < self.size - cols:
+            neighbours.append(index + cols)
+        return neighbours
+
+    def passages(self):
+        """
+        Return the open sides of every cell as bytes, one mask per cell id: the
+        sides without a wall that lead to another cell of the grid. Openings in
+        the outer border, such as the entrance and exit, are left out, so a
+        search can follow every set side without checking the bounds.
+
+        The mask is built once and kept until the walls change through
+        set_wall() or carve(), or walls_changed() is called. It is built a
+        block of rows at a time, so a memory-mapped wall array is read in
+        pieces rather than copied whole.
+        """
+        if self._passages is None:
+            self._passages = self._build_passages()
+        return self._passages
+
+    def _build_passages(self):
+        """
+        Compute the passages() mask from the wall array.
+        """
+        cols, rows = self.num_cols, self.num_rows
+        walls = self.walls
+        # The sides of each cell that stay inside the grid.
+        row = bytearray([ALL_WALLS]) * cols
+        row[0] &= ~LEFT
+        row[-1] &= ~RIGHT
+        block = max(1, _PASSAGE_BLOCK // cols)
+        parts = []
+        for first in range(0, rows, block):
+            last = min(first + block, rows)
+            inside = row * (last - first)
+            if first == 0:
+                inside[:cols] = inside[:cols].translate(_CLEAR_TOP)
+            if last == rows:
+                inside[-cols:] = inside[-cols:].translate(_CLEAR_BOTTOM)
+            open_sides = bytes(walls[first * cols:last * cols]).translate(_OPEN_SIDES)
+            sides = int.from_bytes(open_sides, "little") & int.from_bytes(inside, "little")
+            parts.append(sides.to_bytes(len(inside), "little"))
+        return b"".join(parts)
+
+    def walls_changed(self):
+        """
+        Forget what was derived from the wall array, the passages() mask and
+        the digest(). set_wall() and carve() do this themselves; call it
+        after writing to the walls array directly.
+        """
+        self._passages = None
+        self._digest = None
+
+    def digest(self):
+        """
+        Return a digest identifying the dimensions and walls of the grid,
+        computed once and kept until the walls change, like passages().
+        """
+        if self._digest is None:
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(b"%d,%d:" % (self.num_rows, self.num_cols))
+            digest.update(self.walls)
+            self._digest = digest.digest()
+        return self._digest
+
+    def steps(self):
+        """
+        Return a table, indexed by a passages() mask, of the id offsets of the
+        neighbours that mask leads to, in left, right, up, down order.
+        """
+        offsets = ((LEFT, -1), (RIGHT, 1), (TOP, -self.num_cols), (BOTTOM, self.num_cols))
+        return tuple(tuple(offset for side, offset in offsets if mask & side)
+                     for mask in range(ALL_WALLS + 1))
+
+    def has_wall(self, index, side):
+        """
+        Return True if the cell has a wall on the given side.
+        """
+        return self.walls[index] & side != 0
+
+    def set_wall(self, index, side, present):
+        """
+        Add or remove a wall on one side of a single cell. The neighbouring
+        cell is left untouched; use carve() to open a passage between two cells.
+        """
+        if present:
+            self.walls[index] |= side
+        else:
+            self.walls[index] &= ~side & ALL_WALLS
+        self._passages = None
+        self._digest = None
+
+    def carve(self, index, side):
+        """
+        Remove the wall on the given side of a cell together with the matching
+        wall of the neighbouring cell.
+
+        Returns:
+            int: The id of the neighbouring cell.
+        """
+        other = self.neighbour(index, side)
+        self.walls[index] &= ~side & ALL_WALLS
+        self.walls[other] &= ~OPPOSITE[side] & ALL_WALLS
+        self._passages = None
+        self._digest = None
+        return other
+
+    def set_cost(self, index, cost):
+        """
+        Set the traversal cost of a cell, the cost of stepping into it. The
+        cost array is created, with every other cell at 1, the first time.
+
+        Parameters:
+            index (int): The id of the cell.
+            cost (int): The cost, from 1 to MAX_COST.
+        """
+        if not 1 <= cost <= MAX_COST:
+            raise ValueError(f"invalid cost {cost}, expected 1 to {MAX_COST}")
+        if self.costs is None:
+            self.costs = bytearray([1]) * self.size
+        self.costs[index] = cost
+
+    def cost(self, index):
+        """
+        Return the traversal cost of a cell.
+        """
+        return 1 if self.costs is None else self.costs[index]
+
+    def reset_visited(self):
+        """
+        Mark every cell as unvisited.
+        """
+        self.visited.clear()
+
+    def columns(self, factory):
+        """
+        Return a lazy column-major view of the grid, indexable as
+        view[i][j], that builds each item with factory(i, j) on access.
+        """
+        return _GridView(self, factory)
+
+
+class _GridView():
+    """
+    A column-major, read-only sequence over the cells of a grid.
+    """
+
+    def __init__(self, grid, factory):
+        self._grid = grid
+        self._factory = factory
+
+    def __len__(self):
+        return self._grid.num_cols
+
+    def __getitem__(self, i):
+        if not -self._grid.num_cols <= i < self._grid.num_cols:
+            raise IndexError("column index out of range")
+        return _GridColumn(self._grid, self._factory, i % self._grid.num_cols)
+
+    def __iter__(self):
+        for i in range(self._grid.num_cols):
+            yield _GridColumn(self._grid, self._factory, i)
+
+
+class _GridColumn():
+    """
+    A single column of a _GridView.
+    """
+
+    def __init__(self, grid, factory, i):
+        self._grid = grid
+        self._factory = factory
+        self._i = i
+
+    def __len__(self):
+        return self._grid.num_rows
+
+    def __getitem__(self, j):
+        if not -self._grid.num_rows <= j < self._grid.num_rows:
+            raise IndexError("row index out of range")
+        return self._factory(self._i, j % self._grid.num_rows)
+
+    def __iter__(self):
+        for j in range(self._grid.num_rows):
+            yield self._factory(self._i, j)
@@ -1,19 +1,32 @@
 from tk_classes import *
 
-def main():
+def main(num_rows=12, num_cols=16, seed=None, algorithm="backtracker", strategy="dfs",
+         background=False, braid=0.0):
     """
     Main function to initialize and run the maze game.
     
     This function sets up the maze configuration, calculates cell sizes,
-    initializes the game window, creates and solves the maze, and finally
-    starts the main loop to display the maze.
+    initializes the game window, creates the maze and schedules its generation
+    and solving, and finally starts the main loop that animates them.
+    
+    Parameters:
+        num_rows (int): Number of rows in the maze grid (default is 12).
+        num_cols (int): Number of columns in the maze grid (default is 16).
+        seed (int, optional): Seed for reproducible generation.
+        algorithm (str): The generation algorithm (default is "backtracker").
+        strategy (str, optional): The solving strategy (default is "dfs").
+            None only animates the generation.
+        background (bool): Compute on a worker thread, showing progress in
+            the title (default is False). Mazes too large to animate are then
+            generated on the worker while the zoomable view fills in.
+        braid (float): The fraction of dead ends to remove, opening loops
+            (default is 0.0, a perfect maze).
     """
-    # Maze configuration parameters
-    num_rows = 12      # Number of rows in the maze grid
-    num_cols = 16      # Number of columns in the maze grid
+    # Window configuration parameters
     margin = 50        # Margin from the window's edges where the maze will be drawn
     screen_x = 800     # Width of the game window in pixels
     screen_y = 600     # Height of the game window in pixels
+    min_cell_size = 4  # Smaller cells are shown in a zoomable view instead of animated
     
     # Calculate the size of each cell in the maze
     cell_size_x = (screen_x - 2 * margin) / num_cols
@@ -22,13 +35,30 @@ def main():
     # Initialize the game window with the specified screen dimensions
     win = Window(screen_x, screen_y)
     
-    # Create the maze with the given parameters and attach it to the window
-    maze = Maze(margin, margin, num_rows, num_cols, cell_size_x, cell_size_y, win)
+    # Mazes too large to animate cell by cell are generated without drawing
+    # and shown in a view that only draws what is on screen; scroll to zoom
+    # and drag to pan
+    if min(cell_size_x, cell_size_y) < min_cell_size:
+        maze = Maze(0, 0, num_rows, num_cols, 1, 1, seed=seed, algorithm=algorithm, defer=True,
+                    braid=braid)
+        maze.view(win, screen_x, screen_y, background=background)
+        win.wait_for_close()
+        return
+    
+    # Create the maze with the given parameters and attach it to the window,
+    # leaving the generation to be animated by the window's event loop
+    maze = Maze(margin, margin, num_rows, num_cols, cell_size_x, cell_size_y, win, seed, algorithm,
+                defer=True, braid=braid)
     
-    # Solve the maze by finding a path from the entrance to the exit
-    maze.solve()
+    # Schedule the generation and then the search for a path from the entrance to the exit,
+    # either drawn step by step or computed on a worker and drawn as it arrives
+    if background:
+        maze.run_in_background(strategy)
+    else:
+        maze.animate(strategy)
     
-    # Start the window's main loop to keep the game running until the window is closed
+    # Start the window's main loop, which draws the animation and keeps the
+    # game running until the window is closed
     win.wait_for_close()
     
 if __name__ == "__main__":
@@ -0,0 +1,273 @@
+# -----------------------------------------------------------------------------
+# Module: Maze CLI
+# Description: The command-line interface, run as python -m maze.
+#
+#   python -m maze gen --size 64x48 --seed 1 --algorithm kruskal
+#   python -m maze solve --size 256x256 --seed 0-99 --strategy bfs --no-gui
+#   python -m maze render --size 64x48 --seed 1 --solution bfs --output maze-{seed}.png
+#   python -m maze bench --sizes 16x12,256x256
+#
+# gen and solve show the maze in a window, as main.py does, unless --no-gui is
+# given; render and bench never open one. Headless runs print one result per
+# maze as a JSON line as soon as it is done, so batches over many seeds can be
+# followed and parsed while they run. Modules are imported by the subcommand
+# that needs them, and tkinter only by the GUI, so the CLI starts quickly on
+# servers without a display.
+# -----------------------------------------------------------------------------
+
+import argparse
+import json
+import sys
+import time
+
+FORMATS = ("jsonl", "text")
+
+
+def parse_size(text):
+    """
+    Parse a "COLSxROWS" size, as in 16x12, into (num_cols, num_rows).
+    """
+    try:
+        cols, rows = (int(part) for part in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size {text!r}, expected COLSxROWS") from None
+    if cols < 1 or rows < 1:
+        raise argparse.ArgumentTypeError(f"invalid size {text!r}, both sides must be positive")
+    return cols, rows
+
+
+def parse_seeds(text):
+    """
+    Parse a comma-separated list of seeds and inclusive FIRST-LAST ranges, as
+    in 1,5,10-19, into a list of seeds.
+    """
+    seeds = []
+    try:
+        for part in text.split(","):
+            first, _, last = part.partition("-")
+            if last:
+                seeds.extend(range(int(first), int(last) + 1))
+            else:
+                seeds.append(int(first))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid seeds {text!r}, expected a list like 1,5,10-19") from None
+    return seeds
+
+
+def format_record(record, output_format="jsonl"):
+    """
+    Return a result as one line: a JSON object, or key=value pairs for "text".
+    """
+    if output_format == "text":
+        return " ".join(f"{key}={value}" for key, value in record.items())
+    return json.dumps(record)
+
+
+def _mazes(args):
+    """
+    Yield (maze, record) for the maze loaded from --input, or for each seed,
+    with the record holding the maze's description and generation time.
+    """
+    from tk_classes import Maze
+    cell, margin = args.cell_size, args.margin
+
+    def metrics():
+        if args.metrics or args.profile or args.trace_memory:
+            from metrics import Metrics
+            return Metrics(profile=bool(args.profile), trace_memory=args.trace_memory)
+        return None
+
+    if args.input:
+        started = time.perf_counter()
+        maze = Maze.load(args.input, x1=margin, y1=margin, cell_size_x=cell, cell_size_y=cell,
+                         metrics=metrics())
+        seeds = [(maze.seed, maze)]
+        elapsed = time.perf_counter() - started
+    else:
+        seeds = [(seed, None) for seed in args.seed]
+    num_cols, num_rows = args.size
+    for seed, maze in seeds:
+        if maze is None:
+            started = time.perf_counter()
+            maze = Maze(margin, margin, num_rows, num_cols, cell, cell, seed=seed,
+                        algorithm=args.algorithm, metrics=metrics(), braid=args.braid)
+            elapsed = time.perf_counter() - started
+        grid = maze._grid
+        yield maze, {
+            "command": args.command,
+            "seed": maze.seed,
+            "algorithm": maze.algorithm,
+            "braid": maze.braid,
+            "num_cols": grid.num_cols,
+            "num_rows": grid.num_rows,
+            "generate_seconds": elapsed,
+        }
+
+
+def _write(maze, template, seed, solution=None):
+    """
+    Save a maze to the file named by a template, which may hold {seed}: a
+    maze file for .maze, otherwise an image in the format of its extension.
+
+    Returns:
+        str: The path written.
+    """
+    import export
+    path = template.format(seed=seed)
+    if path.lower().endswith(".maze"):
+        maze.save(path)
+    else:
+        export.export(maze, path, solution)
+    return path
+
+
+def _gen(args, emit):
+    for maze, record in _mazes(args):
+        if args.output:
+            record["output"] = _write(maze, args.output, maze.seed)
+        emit(maze, record)
+
+
+def _solve(args, emit):
+    for maze, record in _mazes(args):
+        result = maze.solve(args.strategy)
+        record.update({
+            "strategy": args.strategy,
+            "found": result.found,
+            "path_length": len(result.path),
+            "path_cost": result.cost,
+            "nodes_expanded": result.nodes_expanded,
+            "peak_frontier": result.peak_frontier,
+            "solve_seconds": result.elapsed,
+        })
+        if args.output:
+            record["output"] = _write(maze, args.output, maze.seed, result)
+        emit(maze, record)
+
+
+def _render(args, emit):
+    for maze, record in _mazes(args):
+        solution = maze.solve(args.solution) if args.solution else None
+        started = time.perf_counter()
+        record["output"] = _write(maze, args.output, maze.seed, solution)
+        record["render_seconds"] = time.perf_counter() - started
+        emit(maze, record)
+
+
+def _gui(args):
+    """
+    Show one maze in a window, animated as main.py does.
+    """
+    import main as game
+    num_cols, num_rows = args.size
+    seed = args.seed[0] if args.seed else None
+    strategy = args.strategy if args.command == "solve" else None
+    game.main(num_rows, num_cols, seed, args.algorithm, strategy, args.background, args.braid)
+
+
+def build_parser():
+    """
+    Return the argument parser of the CLI.
+    """
+    parser = argparse.ArgumentParser(prog="python -m maze",
+                                     description="Generate, solve, render and benchmark mazes.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--size", type=parse_size, default=(16, 12),
+                        help="maze size as COLSxROWS (default: 16x12)")
+    common.add_argument("--seed", type=parse_seeds, default=None,
+                        help="seeds to generate, e.g. 1,5,10-19 (default: one random maze)")
+    common.add_argument("--algorithm", default="backtracker", help="generation algorithm")
+    common.add_argument("--braid", type=float, default=0.0,
+                        help="fraction of dead ends to remove, opening loops (default: 0, a perfect maze)")
+    common.add_argument("--input", help="load the maze from this .maze file instead of generating it")
+    common.add_argument("--output", help="save each maze to this .maze, .png, .ppm or .svg file; "
+                                         "{seed} is replaced by the seed")
+    common.add_argument("--cell-size", type=int, default=10, help="cell size of images in pixels")
+    common.add_argument("--margin", type=int, default=5, help="white border of images in pixels")
+    common.add_argument("--format", choices=FORMATS, default="jsonl", help="result line format")
+    common.add_argument("--metrics", action="store_true",
+                        help="add each maze's phase timers and counters to its result")
+    common.add_argument("--profile", metavar="FILE",
+                        help="profile the runs with cProfile and save the statistics to FILE")
+    common.add_argument("--trace-memory", action="store_true",
+                        help="record the peak allocations of each phase with tracemalloc")
+
+    gui = argparse.ArgumentParser(add_help=False)
+    gui.add_argument("--no-gui", action="store_true", help="run headless and print the results")
+    gui.add_argument("--background", action="store_true",
+                     help="compute on a worker thread while the window shows progress")
+
+    commands.add_parser("gen", parents=[common, gui], help="generate mazes")
+    solve = commands.add_parser("solve", parents=[common, gui], help="generate and solve mazes")
+    solve.add_argument("--strategy", default="dfs", help="solving strategy")
+    render = commands.add_parser("render", parents=[common], help="draw mazes to image files")
+    render.add_argument("--solution", metavar="STRATEGY", help="draw the path found by this strategy")
+    commands.add_parser("bench", add_help=False, help="run the benchmarks (see bench.py --help)")
+    return parser
+
+
+def main(argv=None):
+    """
+    Run the CLI.
+
+    Returns:
+        int: The exit status.
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ["bench"]:
+        import bench
+        rest = argv[1:]
+        if not any(arg.startswith("--format") for arg in rest):
+            rest = ["--format", "jsonl"] + rest
+        return bench.main(rest)
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.seed is None and not args.input:
+        args.seed = [None]
+
+    from generators import get_algorithm
+    import solvers
+    try:
+        get_algorithm(args.algorithm)
+        for strategy in (getattr(args, "strategy", None), getattr(args, "solution", None)):
+            if strategy is not None:
+                solvers.get_solver(strategy)
+    except ValueError as error:
+        parser.error(str(error))
+    if not 0 <= args.braid <= 1:
+        parser.error("--braid must be between 0 and 1")
+    if args.command == "render" and not args.output:
+        parser.error("render needs --output")
+    if args.output and len(args.seed or ()) > 1 and "{seed}" not in args.output:
+        parser.error("--output needs a {seed} placeholder when there are several seeds")
+
+    if args.command in ("gen", "solve") and not args.no_gui:
+        if args.input or len(args.seed) > 1:
+            parser.error("the window shows one generated maze; use --no-gui for --input or several seeds")
+        _gui(args)
+        return 0
+
+    profile = []
+
+    def emit(maze, record):
+        if maze.metrics is not None:
+            record["metrics"] = maze.metrics.report()
+            stats = maze.metrics.profile_stats()
+            if stats is not None:
+                if profile:
+                    profile[0].add(stats)
+                else:
+                    profile.append(stats)
+        print(format_record(record, args.format), flush=True)
+
+    {"gen": _gen, "solve": _solve, "render": _render}[args.command](args, emit)
+    if profile:
+        profile[0].dump_stats(args.profile)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+# -----------------------------------------------------------------------------
+# Module: Maze File
+# Description: A compact binary file format for generated mazes.
+#
+# A file is a 64-byte header followed by the wall array:
+#
+#   magic      4s   b"MAZE"
+#   version    H    file format version (1)
+#   encoding   B    BYTE_ENCODING or NIBBLE_ENCODING
+#   flags      B    HAS_SEED when the seed field holds the maze's seed
+#   num_rows   I
+#   num_cols   I
+#   seed       q
+#   algorithm  16s  generation algorithm name, NUL padded
+#   length     Q    payload length in bytes
+#   checksum   I    CRC-32 of the payload
+#
+# All fields are little-endian. With BYTE_ENCODING the payload is the Grid's
+# own wall array, one mask per cell, so it can be memory-mapped and used in
+# place without reading it into memory. NIBBLE_ENCODING packs two cells per
+# byte (the first in the low nibble) for half the size, at the cost of
+# decoding it on load.
+# -----------------------------------------------------------------------------
+
+import mmap as _mmap
+import struct
+import zlib
+
+from grid import Grid
+
+MAGIC = b"MAZE"
+VERSION = 1
+BYTE_ENCODING = 0
+NIBBLE_ENCODING = 1
+HAS_SEED = 1
+
+_HEADER = struct.Struct("<4sHBBIIq16sQI")
+HEADER_SIZE = 64
+
+_LOW_NIBBLE = bytes(value & 0x0F for value in range(256))
+_HIGH_NIBBLE = bytes(value >> 4 for value in range(256))
+_TO_HIGH_NIBBLE = bytes((value << 4) & 0xF0 for value in range(256))
+
+
+class MazeFileError(ValueError):
+    """
+    Raised when a maze file is malformed or fails its checksum.
+    """
+
+
+class MazeHeader():
+    """
+    The metadata stored in a maze file header.
+    """
+
+    def __init__(self, num_rows, num_cols, seed=None, algorithm="", encoding=BYTE_ENCODING,
+                 length=0, checksum=0):
+        """
+        Initialize the header.
+
+        Parameters:
+            num_rows (int): The number of rows in the maze.
+            num_cols (int): The number of columns in the maze.
+            seed (int, optional): The seed the maze was generated with.
+            algorithm (str): The name of the generation algorithm.
+            encoding (int): BYTE_ENCODING or NIBBLE_ENCODING.
+            length (int): The payload length in bytes.
+            checksum (int): The CRC-32 of the payload.
+        """
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.seed = seed
+        self.algorithm = algorithm
+        self.encoding = encoding
+        self.length = length
+        self.checksum = checksum
+
+    def pack(self):
+        """
+        Return the header as HEADER_SIZE bytes.
+        """
+        if self.seed is not None and not isinstance(self.seed, int):
+            raise MazeFileError("only integer seeds can be saved")
+        if self.seed is not None and not -2 ** 63 <= self.seed < 2 ** 63:
+            raise MazeFileError(f"seed {self.seed} does not fit the header's signed 64-bit field")
+        if len(self.algorithm) > 16:
+            raise MazeFileError("algorithm names are limited to 16 characters")
+        flags = HAS_SEED if self.seed is not None else 0
+        data = _HEADER.pack(MAGIC, VERSION, self.encoding, flags, self.num_rows, self.num_cols,
+                            self.seed or 0, self.algorithm.encode("ascii"), self.length,
+                            self.checksum)
+        return data.ljust(HEADER_SIZE, b"\0")
+
+    @classmethod
+    def unpack(cls, data):
+        """
+        Parse a header from the first HEADER_SIZE bytes of a file.
+        """
+        if len(data) < HEADER_SIZE:
+            raise MazeFileError("file is too short to hold a maze header")
+        (magic, version, encoding, flags, num_rows, num_cols, seed, algorithm, length,
+         checksum) = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise MazeFileError("not a maze file")
+        if version != VERSION:
+            raise MazeFileError(f"unsupported maze file version {version}")
+        if encoding not in (BYTE_ENCODING, NIBBLE_ENCODING):
+            raise MazeFileError(f"unknown wall encoding {encoding}")
+        return cls(num_rows, num_cols, seed if flags & HAS_SEED else None,
+                   algorithm.rstrip(b"\0").decode("ascii"), encoding, length, checksum)
+
+
+def pack_nibbles(walls):
+    """
+    Pack one wall mask per byte into two masks per byte.
+    """
+    walls = bytes(walls)
+    if len(walls) % 2:
+        walls += b"\0"
+    low = walls[0::2]
+    high = walls[1::2].translate(_TO_HIGH_NIBBLE)
+    packed = int.from_bytes(low, "little") | int.from_bytes(high, "little")
+    return packed.to_bytes(len(low), "little")
+
+
+def unpack_nibbles(data, size):
+    """
+    Unpack size wall masks stored two per byte.
+    """
+    walls = bytearray(2 * len(data))
+    walls[0::2] = data.translate(_LOW_NIBBLE)
+    walls[1::2] = data.translate(_HIGH_NIBBLE)
+    del walls[size:]
+    return walls
+
+
+def save(grid, path, seed=None, algorithm="", compact=False):
+    """
+    Write a grid to a maze file.
+
+    Parameters:
+        grid (Grid): The grid to save.
+        path (str): The file to write.
+        seed (int, optional): The seed the maze was generated with.
+        algorithm (str): The name of the generation algorithm.
+        compact (bool): Pack two cells per byte. Compact files are half the
+            size but cannot be memory-mapped in place.
+    """
+    if compact:
+        payload = pack_nibbles(grid.walls)
+        encoding = NIBBLE_ENCODING
+    else:
+        payload = grid.walls
+        encoding = BYTE_ENCODING
+    header = MazeHeader(grid.num_rows, grid.num_cols, seed, algorithm, encoding,
+                        len(payload), zlib.crc32(payload))
+    # Check the header fields before creating the file.
+    data = header.pack()
+    with open(path, "wb") as file:
+        file.write(data)
+        file.write(payload)
+
+
+def save_rows(path, num_cols, rows, seed=None, algorithm=""):
+    """
+    Write a maze file from a stream of rows, such as streaming.eller_rows(),
+    without holding the whole maze in memory. The header is written last,
+    once the number of rows and the checksum are known.
+
+    Parameters:
+        path (str): The file to write.
+        num_cols (int): The number of columns in the maze.
+        rows (iterable): The wall masks of each row, num_cols bytes each.
+        seed (int, optional): The seed the maze was generated with.
+        algorithm (str): The name of the generation algorithm.
+
+    Returns:
+        int: The number of rows written.
+    """
+    # Check the header fields before writing anything.
+    MazeHeader(0, num_cols, seed, algorithm).pack()
+    num_rows = 0
+    checksum = 0
+    with open(path, "wb") as file:
+        file.write(bytes(HEADER_SIZE))
+        for row in rows:
+            if len(row) != num_cols:
+                raise MazeFileError(f"row {num_rows} holds {len(row)} cells, expected {num_cols}")
+            file.write(row)
+            checksum = zlib.crc32(row, checksum)
+            num_rows += 1
+        header = MazeHeader(num_rows, num_cols, seed, algorithm, BYTE_ENCODING,
+                            num_rows * num_cols, checksum)
+        file.seek(0)
+        file.write(header.pack())
+    return num_rows
+
+
+def load(path, mmap=True, verify=True):
+    """
+    Read a maze file.
+
+    Parameters:
+        path (str): The file to read.
+        mmap (bool): Memory-map the file instead of reading it. The walls of a
+            file saved without compact are then used in place: pages are only
+            read as they are touched and changes stay private to this process.
+        verify (bool): Check the payload against the header's checksum.
+
+    Returns:
+        tuple: (grid, header) with the loaded Grid and its MazeHeader.
+    """
+    with open(path, "rb") as file:
+        if mmap:
+            data = _mmap.mmap(file.fileno(), 0, access=_mmap.ACCESS_COPY)
+        else:
+            data = file.read()
+    header = MazeHeader.unpack(data[:HEADER_SIZE])
+    size = header.num_rows * header.num_cols
+    expected = size if header.encoding == BYTE_ENCODING else (size + 1) // 2
+    if header.length != expected or len(data) < HEADER_SIZE + expected:
+        raise MazeFileError("maze file is truncated or has an inconsistent header")
+
+    payload = memoryview(data)[HEADER_SIZE:HEADER_SIZE + expected]
+    if verify and zlib.crc32(payload) != header.checksum:
+        raise MazeFileError("maze file checksum does not match its contents")
+    if header.encoding == NIBBLE_ENCODING:
+        walls = unpack_nibbles(payload.tobytes(), size)
+    elif mmap:
+        walls = payload
+    else:
+        walls = bytearray(payload)
+    return Grid(header.num_rows, header.num_cols, walls), header
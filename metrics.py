@@ -0,0 +1,168 @@
+# -----------------------------------------------------------------------------
+# Module: Metrics
+# Description: Optional instrumentation of maze runs: per-phase timers,
+# counters, and cProfile and tracemalloc captures, reported to a sink.
+#
+# Nothing is collected unless a Metrics object is handed to a Maze (or a
+# TkRenderer). The code being measured only checks for one once per phase or
+# per frame, never per event or per cell, so a run without metrics does the
+# same work as before. Counts that the algorithms already know, such as the
+# nodes a search expanded, are read from their results, and the passages
+# carved are counted from the wall array once generation is over.
+#
+#   metrics = Metrics(sink=JsonSink("run.jsonl"), profile=True)
+#   maze = Maze(0, 0, 100, 100, 10, 10, metrics=metrics)
+#   maze.solve("bfs")
+#   print(maze.metrics.report())
+#   metrics.profile_stats().print_stats(10)
+# -----------------------------------------------------------------------------
+
+import cProfile
+import json
+import logging
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class MemorySink():
+    """
+    Keeps every record in a list, for tests and interactive use.
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class LogSink():
+    """
+    Writes every record as one line to a logger.
+    """
+
+    def __init__(self, logger=None, level=logging.INFO):
+        """
+        Parameters:
+            logger (Logger, optional): The logger (default is the "maze.metrics" logger).
+            level (int): The level to log at (default is INFO).
+        """
+        self.logger = logger or logging.getLogger("maze.metrics")
+        self.level = level
+
+    def emit(self, record):
+        self.logger.log(self.level, "%s", json.dumps(record, sort_keys=True))
+
+
+class JsonSink():
+    """
+    Appends every record to a file as a JSON line.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def emit(self, record):
+        with open(self.path, "a") as file:
+            file.write(json.dumps(record) + "\n")
+
+
+class Metrics():
+    """
+    Accumulates timers and counters over the phases of one or more runs.
+
+    Attributes:
+        timers (dict): Total seconds by phase name.
+        counters (dict): Counts by name, such as "passages_carved",
+            "nodes_expanded", "canvas_items" and "frames".
+    """
+
+    def __init__(self, sink=None, profile=False, trace_memory=False):
+        """
+        Initialize empty metrics.
+
+        Parameters:
+            sink (object, optional): Receives a record, a dict, at the end of
+                every phase through its emit() method: a MemorySink, LogSink,
+                JsonSink or anything with the same method.
+            profile (bool): Run cProfile during the phases (default is False).
+            trace_memory (bool): Record the peak Python allocations of each
+                phase with tracemalloc, as counters named "<phase>_alloc_peak_bytes".
+        """
+        self.sink = sink
+        self.timers = {}
+        self.counters = {}
+        self._profiler = cProfile.Profile() if profile else None
+        self._profiled = False
+        self._trace_memory = trace_memory
+        # The phases currently open; only the outermost one drives the
+        # profiler and tracemalloc.
+        self._depth = 0
+
+    def add_time(self, name, seconds):
+        """
+        Add seconds to a timer.
+        """
+        self.timers[name] = self.timers.get(name, 0.0) + seconds
+
+    def count(self, name, amount=1):
+        """
+        Add to a counter.
+        """
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Time a phase of a run, capturing a profile and its allocations if
+        enabled, and emit a record to the sink when it ends.
+
+        Parameters:
+            name (str): The name of the phase, such as "generate" or "solve".
+        """
+        outermost = self._depth == 0
+        self._depth += 1
+        started_tracing = False
+        if outermost and self._trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+        if outermost and self._profiler is not None:
+            self._profiled = True
+            self._profiler.enable()
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = time.perf_counter() - started
+            if outermost and self._profiler is not None:
+                self._profiler.disable()
+            if outermost and self._trace_memory:
+                self.counters[f"{name}_alloc_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+                if started_tracing:
+                    tracemalloc.stop()
+            self._depth -= 1
+            self.add_time(name, elapsed)
+            if self.sink is not None:
+                self.sink.emit({"phase": name, "seconds": elapsed, "counters": dict(self.counters)})
+
+    def report(self):
+        """
+        Return the timers and counters collected so far as a dict.
+        """
+        return {"timers": dict(self.timers), "counters": dict(self.counters)}
+
+    def profile_stats(self, sort="cumulative"):
+        """
+        Return the cProfile statistics of the phases so far, sorted by the
+        given key, or None when profiling is off or no phase has run yet.
+
+        Returns:
+            pstats.Stats: The statistics, ready for print_stats().
+        """
+        if not self._profiled:
+            return None
+        return pstats.Stats(self._profiler).sort_stats(sort)
@@ -0,0 +1,741 @@
+# -----------------------------------------------------------------------------
+# Module: Paths
+# Description: Shortest-path queries between any two cells of a maze.
+#
+# PathCache answers repeated queries by keeping the breadth-first distance
+# and parent fields of recent source cells, least recently used first out,
+# within a memory budget. Fields are keyed by a hash of the wall array, so
+# they are shared between mazes with the same walls and never served for a
+# maze whose walls have changed.
+#
+# TreeIndex is for perfect mazes, which are trees: after one pass over the
+# maze it answers the distance between any two cells in constant time, from
+# the lowest common ancestor of the two cells found with a range minimum
+# query over an Euler tour of the tree.
+#
+# DynamicDistanceField keeps the distance and parent fields of one source
+# cell up to date as walls are knocked down or put back, repairing only the
+# cells whose distance changes instead of searching the whole maze again.
+#
+# CostField is a weighted search run backwards from one or more exits, giving
+# every cell its cheapest cost to the nearest exit and the next step towards
+# it. route_agents answers a batch of agents with one such search per exit,
+# or a single one when every agent heads for whichever exit is closest,
+# instead of one solve per agent.
+#
+# k_shortest_paths finds the k cheapest loopless routes between two cells of
+# a maze with loops, with Yen's algorithm.
+# -----------------------------------------------------------------------------
+
+import heapq
+from array import array
+from collections import OrderedDict, namedtuple
+
+from grid import OPPOSITE
+
+# The Euler tour is split into blocks of this many entries: the sparse table
+# covers whole blocks and the ends of a query are scanned directly.
+_BLOCK = 16
+
+# One agent's answer from route_agents: the exit reached, the total cost of
+# the cells entered on the way and the cell ids from start to goal. goal and
+# cost are None and path is empty when no exit can be reached.
+Route = namedtuple("Route", "start goal cost path")
+
+
+def wall_hash(grid):
+    """
+    Return a digest identifying the dimensions and walls of a grid. The grid
+    keeps it until its walls change, so repeated queries do not hash the
+    whole wall array again.
+    """
+    return grid.digest()
+
+
+class DistanceField():
+    """
+    The breadth-first distance and parent of every cell from one source cell.
+    """
+
+    def __init__(self, grid, source):
+        """
+        Search the whole grid from a source cell.
+
+        Parameters:
+            grid (Grid): The maze to search.
+            source (int): The id of the source cell.
+        """
+        passages = grid.passages()
+        steps = grid.steps()
+        distance = array("i", [-1]) * grid.size
+        parent = array("i", [-1]) * grid.size
+        distance[source] = 0
+        queue = array("i", [source])
+        head = 0
+        while head < len(queue):
+            index = queue[head]
+            head += 1
+            level = distance[index] + 1
+            for offset in steps[passages[index]]:
+                other = index + offset
+                if distance[other] == -1:
+                    distance[other] = level
+                    parent[other] = index
+                    queue.append(other)
+        self.source = source
+        self.distance = distance
+        self.parent = parent
+
+    @property
+    def nbytes(self):
+        """
+        The memory held by the field's arrays, in bytes.
+        """
+        return (len(self.distance) + len(self.parent)) * self.distance.itemsize
+
+    def path_to(self, target):
+        """
+        Return the cell ids of a shortest path from the source to target, or
+        an empty list if target cannot be reached.
+        """
+        if self.distance[target] == -1:
+            return []
+        path = [target]
+        while target != self.source:
+            target = self.parent[target]
+            path.append(target)
+        path.reverse()
+        return path
+
+
+class DynamicDistanceField(DistanceField):
+    """
+    A DistanceField that follows changes to the walls of its grid.
+
+    After a wall is removed, the cells that are now closer to the source are
+    updated by a breadth-first search from the wall, pruned wherever the
+    distance does not improve. After a wall is added, only the cells whose
+    shortest path crossed it are affected: those that cannot switch to
+    another neighbour at the same distance are searched again, starting from
+    the unaffected cells around them. Either way the work is proportional to
+    the number of cells whose distance changes.
+    """
+
+    def __init__(self, grid, source):
+        """
+        Search the whole grid from a source cell.
+
+        Parameters:
+            grid (Grid): The maze to search. Report every change to its walls
+                with wall_changed().
+            source (int): The id of the source cell.
+        """
+        super().__init__(grid, source)
+        self._grid = grid
+        self._passages = bytearray(grid.passages())
+        self._steps = grid.steps()
+        self.updated = 0
+
+    def wall_changed(self, index, side):
+        """
+        Bring the field up to date after the wall on one side of a cell has
+        been added or removed in the grid. Walls on the outer border do not
+        connect cells and are ignored.
+
+        Parameters:
+            index (int): The id of the cell.
+            side (int): One of LEFT, RIGHT, TOP or BOTTOM.
+
+        Returns:
+            int: The number of cells whose distance or parent changed.
+        """
+        grid = self._grid
+        other = grid.neighbour(index, side)
+        if other == -1:
+            return 0
+        is_open = not grid.has_wall(index, side) and not grid.has_wall(other, OPPOSITE[side])
+        if bool(self._passages[index] & side) == is_open:
+            return 0
+        if is_open:
+            self._passages[index] |= side
+            self._passages[other] |= OPPOSITE[side]
+            self.updated = self._passage_opened(index, other)
+        else:
+            self._passages[index] &= ~side
+            self._passages[other] &= ~OPPOSITE[side]
+            self.updated = self._passage_closed(index, other)
+        return self.updated
+
+    def _passage_opened(self, a, b):
+        """
+        Lower the distances that a new passage between two cells shortens.
+        """
+        distance, parent = self.distance, self.parent
+        if distance[a] == -1 or (distance[b] != -1 and distance[b] < distance[a]):
+            a, b = b, a
+        if distance[a] == -1 or (distance[b] != -1 and distance[b] <= distance[a] + 1):
+            return 0
+        distance[b] = distance[a] + 1
+        parent[b] = a
+        passages, steps = self._passages, self._steps
+        queue = array("i", [b])
+        head = 0
+        while head < len(queue):
+            index = queue[head]
+            head += 1
+            level = distance[index] + 1
+            for offset in steps[passages[index]]:
+                other = index + offset
+                if distance[other] == -1 or distance[other] > level:
+                    distance[other] = level
+                    parent[other] = index
+                    queue.append(other)
+        return len(queue)
+
+    def _passage_closed(self, a, b):
+        """
+        Repair the distances of the cells whose shortest path used the
+        passage that was closed between two cells.
+        """
+        distance, parent = self.distance, self.parent
+        if parent[b] == a:
+            child = b
+        elif parent[a] == b:
+            child = a
+        else:
+            # The passage was not on any recorded shortest path.
+            return 0
+        passages, steps = self._passages, self._steps
+        for offset in steps[passages[child]]:
+            if distance[child + offset] == distance[child] - 1:
+                parent[child] = child + offset
+                return 1
+
+        # Collect the cells that hung from the passage, in order of distance.
+        # A cell with another neighbour one step closer to the source, that
+        # is not itself affected, switches to it and keeps its subtree.
+        affected = bytearray(len(distance))
+        affected[child] = 1
+        queue = array("i", [child])
+        head = 0
+        while head < len(queue):
+            index = queue[head]
+            head += 1
+            level = distance[index]
+            for offset in steps[passages[index]]:
+                other = index + offset
+                if parent[other] != index:
+                    continue
+                for step in steps[passages[other]]:
+                    around = other + step
+                    if around != index and distance[around] == level and not affected[around]:
+                        parent[other] = around
+                        break
+                else:
+                    affected[other] = 1
+                    queue.append(other)
+
+        # Search the affected cells again, starting from the distances their
+        # unaffected neighbours offer. Heap entries pack (distance, cell).
+        shift = len(distance).bit_length()
+        mask = (1 << shift) - 1
+        heap = []
+        for index in queue:
+            best = -1
+            for offset in steps[passages[index]]:
+                other = index + offset
+                if not affected[other] and distance[other] != -1 and (
+                        best == -1 or distance[other] < distance[best]):
+                    best = other
+            distance[index] = -1
+            parent[index] = -1
+            if best != -1:
+                distance[index] = distance[best] + 1
+                parent[index] = best
+                heap.append((distance[index] << shift) | index)
+        heapq.heapify(heap)
+        while heap:
+            entry = heapq.heappop(heap)
+            index = entry & mask
+            if not affected[index] or entry >> shift != distance[index]:
+                continue
+            affected[index] = 0
+            level = distance[index] + 1
+            for offset in steps[passages[index]]:
+                other = index + offset
+                if affected[other] and (distance[other] == -1 or distance[other] > level):
+                    distance[other] = level
+                    parent[other] = index
+                    heapq.heappush(heap, (level << shift) | other)
+        return len(queue)
+
+
+class PathCache():
+    """
+    A least recently used cache of DistanceFields, bounded by memory.
+    """
+
+    def __init__(self, budget=64 << 20):
+        """
+        Initialize an empty cache.
+
+        Parameters:
+            budget (int): The most memory, in bytes, the cached fields may
+                hold (default is 64 MiB). A field larger than the whole budget
+                is used for its query and not kept.
+        """
+        self.budget = budget
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._fields = OrderedDict()
+
+    def __len__(self):
+        return len(self._fields)
+
+    def clear(self):
+        """
+        Drop every cached field.
+        """
+        self._fields.clear()
+        self.nbytes = 0
+
+    def field(self, grid, source, key=None):
+        """
+        Return the DistanceField of a source cell, searching the grid only if
+        it is not cached.
+
+        Parameters:
+            grid (Grid): The maze.
+            source (int): The id of the source cell.
+            key (bytes, optional): The grid's wall_hash(), if already known.
+        """
+        key = (key or wall_hash(grid), source)
+        field = self._fields.get(key)
+        if field is not None:
+            self._fields.move_to_end(key)
+            self.hits += 1
+            return field
+        self.misses += 1
+        field = DistanceField(grid, source)
+        self._store(key, field)
+        return field
+
+    def _store(self, key, field):
+        """
+        Add a field, evicting the least recently used ones to stay in budget.
+        """
+        if field.nbytes > self.budget:
+            return
+        self._fields[key] = field
+        self.nbytes += field.nbytes
+        while self.nbytes > self.budget:
+            _, evicted = self._fields.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+    def path(self, grid, source, target):
+        """
+        Return the cell ids of a shortest path between two cells, or an empty
+        list if there is none. Passages work both ways, so a cached field of
+        the target serves too.
+        """
+        key = wall_hash(grid)
+        reverse = self._fields.get((key, target))
+        if reverse is not None and (key, source) not in self._fields:
+            self._fields.move_to_end((key, target))
+            self.hits += 1
+            path = reverse.path_to(source)
+            path.reverse()
+            return path
+        return self.field(grid, source, key).path_to(target)
+
+    def distance(self, grid, source, target):
+        """
+        Return the number of steps between two cells, or -1 if there is no
+        path between them.
+        """
+        key = wall_hash(grid)
+        reverse = self._fields.get((key, target))
+        if reverse is not None and (key, source) not in self._fields:
+            self._fields.move_to_end((key, target))
+            self.hits += 1
+            return reverse.distance[source]
+        return self.field(grid, source, key).distance[target]
+
+
+# The cache used by Maze.path() unless another one is given.
+default_cache = PathCache()
+
+
+class TreeIndex():
+    """
+    Constant-time distance queries on a perfect maze, by way of the lowest
+    common ancestor of the two cells in the maze's spanning tree.
+    """
+
+    def __init__(self, grid, root=0):
+        """
+        Index a perfect maze.
+
+        Parameters:
+            grid (Grid): The maze. Every cell must be reachable and there must
+                be no loops.
+            root (int): The id of the cell to root the tree at.
+
+        Raises:
+            ValueError: If the maze has a loop or unreachable cells.
+        """
+        size = grid.size
+        passages = grid.passages()
+        steps = grid.steps()
+        depth = array("i", [-1]) * size
+        parent = array("i", [-1]) * size
+        first = array("i", [0]) * size
+        # Tour entries pack (depth, cell) into one integer, so the smallest
+        # entry in a range is the shallowest cell visited in it.
+        shift = size.bit_length()
+        tour = array("q")
+
+        # Walk the tree depth first, recording each cell on the way down and
+        # again after each of its children.
+        depth[root] = 0
+        tour.append(root)
+        stack = array("i", [root])
+        tried = bytearray(1)
+        while stack:
+            index = stack[-1]
+            options = steps[passages[index]]
+            k = tried[-1]
+            if k < len(options) and index + options[k] == parent[index]:
+                k += 1
+            if k == len(options):
+                stack.pop()
+                tried.pop()
+                if stack:
+                    tour.append((depth[stack[-1]] << shift) | stack[-1])
+                continue
+            tried[-1] = k + 1
+            other = index + options[k]
+            if depth[other] != -1:
+                raise ValueError("the maze has a loop, so it is not a tree")
+            depth[other] = depth[index] + 1
+            parent[other] = index
+            first[other] = len(tour)
+            tour.append((depth[other] << shift) | other)
+            stack.append(other)
+            tried.append(0)
+        if depth.count(-1):
+            raise ValueError("the maze has cells that cannot be reached, so it is not a tree")
+
+        # Sparse table over the block minima: level k holds the minimum of
+        # 2**k consecutive blocks.
+        blocks = [min(tour[start:start + _BLOCK]) for start in range(0, len(tour), _BLOCK)]
+        table = [blocks]
+        width = 1
+        while 2 * width <= len(blocks):
+            previous = table[-1]
+            table.append(list(map(min, previous, previous[width:])))
+            width *= 2
+
+        self.root = root
+        self.depth = depth
+        self.parent = parent
+        self._first = first
+        self._tour = tour
+        self._table = table
+        self._shift = shift
+        self._mask = (1 << shift) - 1
+
+    def lca(self, a, b):
+        """
+        Return the id of the lowest common ancestor of two cells: the cell
+        where the paths from both of them to the root meet.
+        """
+        start, end = self._first[a], self._first[b]
+        if start > end:
+            start, end = end, start
+        tour = self._tour
+        first_block, last_block = start // _BLOCK, end // _BLOCK
+        if first_block == last_block:
+            return min(tour[start:end + 1]) & self._mask
+        best = min(min(tour[start:(first_block + 1) * _BLOCK]),
+                   min(tour[last_block * _BLOCK:end + 1]))
+        if first_block + 1 < last_block:
+            low, high = first_block + 1, last_block - 1
+            level = (high - low + 1).bit_length() - 1
+            row = self._table[level]
+            best = min(best, row[low], row[high - (1 << level) + 1])
+        return best & self._mask
+
+    def distance(self, a, b):
+        """
+        Return the number of steps on the path between two cells.
+        """
+        depth = self.depth
+        return depth[a] + depth[b] - 2 * depth[self.lca(a, b)]
+
+    def path(self, a, b):
+        """
+        Return the cell ids on the path from a to b.
+        """
+        meet = self.lca(a, b)
+        parent = self.parent
+        head = [a]
+        while head[-1] != meet:
+            head.append(parent[head[-1]])
+        tail = [b]
+        while tail[-1] != meet:
+            tail.append(parent[tail[-1]])
+        tail.pop()
+        tail.reverse()
+        return head + tail
+
+
+class CostField():
+    """
+    The cheapest cost from every cell to the nearest of a set of target
+    cells, where a path costs the sum of the traversal costs of the cells it
+    enters, and the next cell on that path.
+    """
+
+    def __init__(self, grid, targets, starts=None):
+        """
+        Search backwards from the targets with Dijkstra's algorithm on a
+        bucket queue.
+
+        Parameters:
+            grid (Grid): The maze to search.
+            targets (iterable): The ids of the target cells.
+            starts (iterable, optional): The ids of the only cells whose cost
+                is needed. The search stops once they are all settled, leaving
+                the cost of farther cells at -1. Default is every cell.
+        """
+        passages = grid.passages()
+        steps = grid.steps()
+        costs = grid.costs
+        if costs is None:
+            costs = bytes([1]) * grid.size
+        cost = array("i", [-1]) * grid.size
+        following = array("i", [-1]) * grid.size
+        settled = bytearray(grid.size)
+        wanted = None
+        if starts is not None:
+            wanted = bytearray(grid.size)
+            for index in starts:
+                wanted[index] = 1
+            remaining = sum(wanted)
+        # Stepping back from a cell into a neighbour costs what entering the
+        # cell from that neighbour does, at most the largest cell cost ahead
+        # of the current one, so that many buckets hold the whole frontier.
+        width = max(costs) + 1
+        buckets = [array("i") for _ in range(width)]
+        pending = 0
+        for index in set(targets):
+            cost[index] = 0
+            buckets[0].append(index)
+            pending += 1
+        current = 0
+        while pending and (wanted is None or remaining):
+            bucket = buckets[current % width]
+            while bucket:
+                index = bucket.pop()
+                pending -= 1
+                if settled[index] or cost[index] != current:
+                    continue
+                settled[index] = 1
+                if wanted is not None and wanted[index]:
+                    remaining -= 1
+                    if not remaining:
+                        break
+                new_cost = current + costs[index]
+                for offset in steps[passages[index]]:
+                    other = index + offset
+                    if settled[other] or (cost[other] != -1 and cost[other] <= new_cost):
+                        continue
+                    cost[other] = new_cost
+                    following[other] = index
+                    buckets[new_cost % width].append(other)
+                    pending += 1
+            current += 1
+        # Cells left on the frontier by an early stop have no final cost yet.
+        # Every one of them is still in a bucket.
+        for bucket in buckets:
+            for index in bucket:
+                if not settled[index]:
+                    cost[index] = -1
+                    following[index] = -1
+        self.cost = cost
+        self.following = following
+
+    def path(self, start):
+        """
+        Return the cell ids from a start cell to its nearest target, or an
+        empty list if no target can be reached.
+        """
+        if self.cost[start] == -1:
+            return []
+        following = self.following
+        path = [start]
+        while following[path[-1]] != -1:
+            path.append(following[path[-1]])
+        return path
+
+
+def route_agents(grid, agents, exits=None):
+    """
+    Route many agents at once, sharing one reverse search per exit between all
+    the agents heading for it.
+
+    Parameters:
+        grid (Grid): The maze to search.
+        agents (list): (start, goal) pairs of cell ids, or just start cell ids
+            when exits are given.
+        exits (iterable, optional): Cell ids of exits; every agent is then
+            routed to the cheapest one to reach, with a single search from all
+            of them.
+
+    Returns:
+        list: A Route for every agent, in order.
+    """
+    if exits is not None:
+        exits = set(exits)
+        field = CostField(grid, exits, agents)
+        routes = []
+        for start in agents:
+            path = field.path(start)
+            if path:
+                routes.append(Route(start, path[-1], field.cost[start], path))
+            else:
+                routes.append(Route(start, None, None, []))
+        return routes
+
+    by_goal = {}
+    for start, goal in agents:
+        by_goal.setdefault(goal, []).append(start)
+    fields = {goal: CostField(grid, [goal], starts) for goal, starts in by_goal.items()}
+    routes = []
+    for start, goal in agents:
+        field = fields[goal]
+        path = field.path(start)
+        if path:
+            routes.append(Route(start, goal, field.cost[start], path))
+        else:
+            routes.append(Route(start, None, None, []))
+    return routes
+
+
+def _cheapest_path(passages, steps, costs, field, start, goal, blocked, first_steps):
+    """
+    A* search for the cheapest path from start to goal that avoids the cells
+    set in blocked and leaves start only through cells outside first_steps.
+    The heuristic is the exact cost to the goal with nothing blocked, from a
+    CostField of the goal, so the search only strays from the unrestricted
+    route where the blocked cells force it to.
+
+    Returns:
+        tuple: The path's cost and cell ids, or (None, []) if there is none.
+    """
+    remaining = field.cost
+    following = field.following
+    # The unrestricted route is the answer when it avoids the blocked cells.
+    index = following[start]
+    if index not in first_steps:
+        while index != -1 and not blocked[index]:
+            index = following[index]
+        if index == -1:
+            return remaining[start], field.path(start)
+
+    # The search stays close to the unrestricted route, so it keeps its
+    # state in dicts rather than arrays over the whole grid.
+    cost = {start: 0}
+    parent = {}
+    closed = set()
+    index_bits = len(remaining).bit_length()
+    mask = (1 << index_bits) - 1
+    heap = [start]
+    while heap:
+        index = heapq.heappop(heap) & mask
+        if index in closed:
+            continue
+        closed.add(index)
+        if index == goal:
+            path = [goal]
+            while path[-1] != start:
+                path.append(parent[path[-1]])
+            path.reverse()
+            return cost[goal], path
+        base = cost[index]
+        for offset in steps[passages[index]]:
+            other = index + offset
+            if other in closed or blocked[other] or (index == start and other in first_steps):
+                continue
+            new_cost = base + costs[other]
+            if cost.get(other, new_cost + 1) <= new_cost:
+                continue
+            cost[other] = new_cost
+            parent[other] = index
+            heapq.heappush(heap, ((new_cost + remaining[other]) << index_bits) | other)
+    return None, []
+
+
+def k_shortest_paths(grid, start, goal, k):
+    """
+    Find the k cheapest paths between two cells that never visit a cell
+    twice, cheapest first, with Yen's algorithm. A perfect maze has a single
+    one; braided mazes, with loops, have alternatives.
+
+    Each alternative branches off an earlier path at a spur cell: the cells
+    before the spur are blocked, as is the step every earlier path with the
+    same start takes out of it, and the cheapest way on to the goal is
+    searched with A*, guided by the exact costs to the goal from one reverse
+    search.
+
+    Parameters:
+        grid (Grid): The maze to search.
+        start (int): The id of the start cell.
+        goal (int): The id of the goal cell.
+        k (int): The most paths to return.
+
+    Returns:
+        list: Up to k Routes from start to goal, in order of cost, where a
+            path costs the traversal costs of the cells it enters.
+    """
+    passages = grid.passages()
+    steps = grid.steps()
+    costs = grid.costs
+    if costs is None:
+        costs = bytes([1]) * grid.size
+    field = CostField(grid, [goal])
+    if k < 1 or field.cost[start] == -1:
+        return []
+    blocked = bytearray(grid.size)
+    path = field.path(start)
+    cost = field.cost[start]
+    found = [(cost, path)]
+    candidates = []
+    seen = {tuple(path)}
+    while len(found) < k:
+        previous = found[-1][1]
+        root_cost = 0
+        for position in range(len(previous) - 1):
+            spur = previous[position]
+            root = previous[:position + 1]
+            first_steps = {other_path[position + 1] for _, other_path in found
+                           if other_path[:position + 1] == root}
+            for index in root[:-1]:
+                blocked[index] = 1
+            spur_cost, spur_path = _cheapest_path(passages, steps, costs, field, spur, goal,
+                                                  blocked, first_steps)
+            for index in root[:-1]:
+                blocked[index] = 0
+            if spur_path:
+                candidate = root[:-1] + spur_path
+                if tuple(candidate) not in seen:
+                    seen.add(tuple(candidate))
+                    heapq.heappush(candidates, (root_cost + spur_cost, len(candidate), candidate))
+            root_cost += costs[previous[position + 1]]
+        if not candidates:
+            break
+        cost, _, path = heapq.heappop(candidates)
+        found.append((cost, path))
+    return [Route(start, goal, cost, path) for cost, path in found]
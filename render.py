@@ -0,0 +1,338 @@
+# -----------------------------------------------------------------------------
+# Module: Render
+# Description: Draws the event stream produced by maze generation and solving
+# onto a Window's canvas. Events are buffered and applied in batches, one
+# batch per frame, so the algorithms run at full speed and only the display
+# pays for the animation. Every wall and move segment is a single canvas item
+# that is created once and then recoloured or deleted, so the number of items
+# on the canvas stays proportional to the number of cells.
+#
+# play() draws a stream synchronously, refreshing the window and sleeping
+# between frames. schedule() instead hands the stream to the window's own
+# event loop: each tick, scheduled with after(), draws one frame's worth of
+# events within a time slice and returns control to Tk, so the window stays
+# responsive and uses no CPU between frames.
+#
+# With a metrics.Metrics attached, the time spent drawing frames and sleeping
+# between them is added to its "draw" and "sleep" timers. Without one the
+# renderer only keeps its frame and canvas item counts.
+# -----------------------------------------------------------------------------
+
+import time
+
+from events import WALL_REMOVED, CELL_VISITED, MOVE, UNDO, WALL_ADDED
+from grid import LEFT, RIGHT, TOP, BOTTOM
+
+
+class TkRenderer():
+    """
+    Renders maze events onto a Window's canvas, a frame at a time.
+    """
+
+    def __init__(self, window, fps=60, steps_per_frame=2, metrics=None):
+        """
+        Initialize the renderer.
+
+        Parameters:
+            window (Window): The window to draw on.
+            fps (float, optional): The maximum number of frames drawn per
+                second. None draws frames as fast as possible.
+            steps_per_frame (int, optional): The number of events applied per
+                frame. None applies each stream in a single frame once it ends
+                (instant mode).
+            metrics (Metrics, optional): Collects the drawing and sleeping time.
+        """
+        self._win = window
+        self._frame_time = 1 / fps if fps else 0
+        self._steps_per_frame = steps_per_frame
+        self._next_frame = 0
+        self._pending = []
+        self._x1 = 0
+        self._y1 = 0
+        self._cell_size_x = 0
+        self._cell_size_y = 0
+        self._num_cols = 1
+        self._num_rows = 1
+        # Canvas items by wall key (see _wall_key) and by (low, high) cell pair.
+        self._wall_items = {}
+        self._move_items = {}
+        self.frames = 0
+        self.items_created = 0
+        self.metrics = metrics
+
+    def begin(self, grid, x1, y1, cell_size_x, cell_size_y):
+        """
+        Draw every wall of a grid and remember its geometry for later events.
+
+        Parameters:
+            grid (Grid): The grid to draw.
+            x1 (int): The x-coordinate of the top-left corner of the maze.
+            y1 (int): The y-coordinate of the top-left corner of the maze.
+            cell_size_x (int): The width of each cell.
+            cell_size_y (int): The height of each cell.
+        """
+        self._x1 = x1
+        self._y1 = y1
+        self._cell_size_x = cell_size_x
+        self._cell_size_y = cell_size_y
+        self._num_cols = grid.num_cols
+        self._num_rows = grid.num_rows
+        # Start from an empty canvas when a new maze is drawn.
+        canvas = self._win.canvas
+        for item in self._wall_items.values():
+            canvas.delete(item)
+        for item in self._move_items.values():
+            canvas.delete(item)
+        self._wall_items.clear()
+        self._move_items.clear()
+
+        # Draw each wall once: the left and top walls of every cell, plus the
+        # right and bottom walls along the border.
+        walls = grid.walls
+        last_col = grid.num_cols - 1
+        last_row_start = grid.size - grid.num_cols
+        for index in range(grid.size):
+            mask = walls[index]
+            if mask & LEFT:
+                self._draw_wall(index, LEFT)
+            if mask & TOP:
+                self._draw_wall(index, TOP)
+            if mask & RIGHT and index % grid.num_cols == last_col:
+                self._draw_wall(index, RIGHT)
+            if mask & BOTTOM and index >= last_row_start:
+                self._draw_wall(index, BOTTOM)
+        self.flush()
+
+    def play(self, steps):
+        """
+        Consume an event generator, drawing its events frame by frame.
+
+        Parameters:
+            steps (iterator): The event generator.
+
+        Returns:
+            object: The value the generator returned.
+        """
+        handle = self.handle
+        while True:
+            try:
+                event = next(steps)
+            except StopIteration as stop:
+                self.flush()
+                return stop.value
+            handle(event)
+
+    def handle(self, event):
+        """
+        Queue a single event, drawing a frame once enough have been queued.
+        """
+        self._pending.append(event)
+        if self._steps_per_frame is not None and len(self._pending) >= self._steps_per_frame:
+            self.flush()
+
+    def schedule(self, steps, on_done=None, time_slice=0.01):
+        """
+        Consume an event generator from the window's event loop, a frame at a
+        time, without blocking. The window's mainloop (Window.wait_for_close)
+        must be running for the frames to be drawn.
+
+        Parameters:
+            steps (iterator): The event generator.
+            on_done (callable, optional): Called with the value the generator
+                returned once it finishes.
+            time_slice (float): The most time, in seconds, spent consuming
+                events per tick (default is 0.01).
+
+        Returns:
+            ScheduledRun: A handle to follow or cancel the run.
+        """
+        run = ScheduledRun(self, steps, on_done, time_slice)
+        run._next_tick(0)
+        return run
+
+    def draw(self, events):
+        """
+        Draw a batch of events as one frame, without refreshing the window or
+        waiting, for callers running inside the window's event loop.
+
+        Parameters:
+            events (iterable): (kind, a, b) events.
+        """
+        self._pending.extend(events)
+        self._draw_pending()
+
+    def flush(self):
+        """
+        Draw all queued events, refresh the window and wait for the next frame.
+        """
+        self._draw_pending()
+        self._win.redraw()
+
+        # Hold the frame rate by sleeping off whatever is left of the frame.
+        if self._frame_time:
+            now = time.perf_counter()
+            if self._next_frame > now:
+                time.sleep(self._next_frame - now)
+                if self.metrics is not None:
+                    self.metrics.add_time("sleep", time.perf_counter() - now)
+                now = self._next_frame
+            self._next_frame = now + self._frame_time
+
+    def _draw_pending(self):
+        """
+        Apply all queued events to the canvas as one frame.
+        """
+        if self.metrics is not None:
+            started = time.perf_counter()
+        for kind, a, b in self._pending:
+            if kind == WALL_REMOVED:
+                self._erase_wall(a, b)
+            elif kind == CELL_VISITED:
+                if b != -1:
+                    self._draw_move(b, a, "gray")
+            elif kind == MOVE:
+                self._draw_move(a, b, "red")
+            elif kind == UNDO:
+                self._draw_move(a, b, "gray")
+            elif kind == WALL_ADDED:
+                self._draw_wall(a, b)
+        self._pending.clear()
+        self.frames += 1
+        if self.metrics is not None:
+            self.metrics.add_time("draw", time.perf_counter() - started)
+
+    def _cell_box(self, index):
+        """
+        Return the (x1, y1, x2, y2) canvas coordinates of a cell.
+        """
+        j, i = divmod(index, self._num_cols)
+        x1 = self._x1 + i * self._cell_size_x
+        y1 = self._y1 + j * self._cell_size_y
+        return x1, y1, x1 + self._cell_size_x, y1 + self._cell_size_y
+
+    def _wall_key(self, index, side):
+        """
+        Return the key of a wall. A wall shared by two cells has one key: it is
+        stored as the left or top wall of the cell to its right or below.
+        """
+        if side == RIGHT and (index + 1) % self._num_cols:
+            index, side = index + 1, LEFT
+        elif side == BOTTOM and index < (self._num_rows - 1) * self._num_cols:
+            index, side = index + self._num_cols, TOP
+        # Two bits are enough to tell the four sides apart.
+        return index << 2 | side.bit_length() - 1
+
+    def _draw_wall(self, index, side):
+        """
+        Create the canvas item for one wall of a cell.
+        """
+        key = self._wall_key(index, side)
+        if key in self._wall_items:
+            return
+        x1, y1, x2, y2 = self._cell_box(index)
+        if side == LEFT:
+            coords = (x1, y1, x1, y2)
+        elif side == TOP:
+            coords = (x1, y1, x2, y1)
+        elif side == RIGHT:
+            coords = (x2, y1, x2, y2)
+        else:
+            coords = (x1, y2, x2, y2)
+        self._wall_items[key] = self._win.canvas.create_line(*coords, fill="black", width=2)
+        self.items_created += 1
+
+    def _erase_wall(self, index, side):
+        """
+        Delete the canvas item for one wall of a cell.
+        """
+        item = self._wall_items.pop(self._wall_key(index, side), None)
+        if item is not None:
+            self._win.canvas.delete(item)
+
+    def _draw_move(self, from_index, to_index, fill_colour):
+        """
+        Draw a line between the centres of two cells, recolouring the existing
+        item if a line between them was drawn before.
+        """
+        key = (from_index, to_index) if from_index < to_index else (to_index, from_index)
+        item = self._move_items.get(key)
+        if item is not None:
+            self._win.canvas.itemconfig(item, fill=fill_colour)
+            return
+        ax1, ay1, ax2, _ = self._cell_box(from_index)
+        bx1, by1, bx2, _ = self._cell_box(to_index)
+        half_a = abs(ax2 - ax1) // 2
+        half_b = abs(bx2 - bx1) // 2
+        self._move_items[key] = self._win.canvas.create_line(
+            ax1 + half_a, ay1 + half_a, bx1 + half_b, by1 + half_b, fill=fill_colour, width=2)
+        self.items_created += 1
+
+
+class ScheduledRun():
+    """
+    An event generator being drawn from the window's event loop, started by
+    TkRenderer.schedule().
+
+    Attributes:
+        done (bool): True once the generator has finished.
+        cancelled (bool): True if cancel() stopped the run.
+        result (object): The value the generator returned, once done.
+    """
+
+    def __init__(self, renderer, steps, on_done, time_slice):
+        self._renderer = renderer
+        self._steps = steps
+        self._on_done = on_done
+        self._time_slice = time_slice
+        self._after_id = None
+        self.done = False
+        self.cancelled = False
+        self.result = None
+
+    def cancel(self):
+        """
+        Stop the run before its next tick. Events already drawn stay drawn.
+        """
+        if self.done or self.cancelled:
+            return
+        self.cancelled = True
+        if self._after_id is not None:
+            self._renderer._win.after_cancel(self._after_id)
+            self._after_id = None
+        self._steps.close()
+
+    def _next_tick(self, delay):
+        """
+        Schedule the next tick delay seconds from now.
+        """
+        self._after_id = self._renderer._win.after(round(delay * 1000), self._tick)
+
+    def _tick(self):
+        """
+        Draw one frame: queue events until the frame is full or the time slice
+        is used up, then draw them and schedule the next frame.
+        """
+        self._after_id = None
+        if self.cancelled:
+            return
+        renderer = self._renderer
+        limit = renderer._steps_per_frame
+        pending = renderer._pending
+        deadline = time.perf_counter() + self._time_slice
+        try:
+            while True:
+                pending.append(next(self._steps))
+                if limit is not None and len(pending) >= limit:
+                    break
+                if time.perf_counter() >= deadline:
+                    break
+        except StopIteration as stop:
+            renderer._draw_pending()
+            self.done = True
+            self.result = stop.value
+            if self._on_done is not None:
+                self._on_done(stop.value)
+            return
+        renderer._draw_pending()
+        # In instant mode frames follow each other as fast as Tk allows.
+        self._next_tick(renderer._frame_time if limit is not None else 0)
@@ -0,0 +1,548 @@
+# -----------------------------------------------------------------------------
+# Module: Solvers
+# Description: Iterative maze solving strategies that work on a Grid.
+#
+# Every strategy is a Python generator function taking (grid, start, goal)
+# cell ids. It yields events (see events.py) describing the search so a
+# renderer can animate it: CELL_VISITED or UNDO events for the exploration,
+# and the final path always as MOVE events. When the search ends
+# the generator returns (path, nodes_expanded, peak_frontier), where path is
+# a list of cell ids from start to goal, or an empty list if none exists.
+# Passing events=False skips the events, for searches nobody watches.
+#
+# The searches walk the grid's passages() mask with integer cell ids: each
+# step looks up the offsets of a cell's open neighbours in the table from
+# grid.steps(), so no lists or tuples are built per cell.
+#
+# A passage leads from a cell to its neighbour when the cell's own wall on
+# that side is open, whatever the neighbour's wall says, so a wall closed on
+# one side only is a one-way passage. Searches that walk backwards from the
+# goal use the _entries() mask of the sides a neighbour can be entered from.
+#
+# Every strategy copes with mazes that have loops, such as braided ones: each
+# marks the cells it has reached and never enters one twice. All but dfs
+# return a shortest path; dfs returns the first route it finds.
+#
+# dijkstra and astar are the weighted strategies: they minimise the sum of
+# the traversal costs of the cells entered (grid.costs, 1 each without it).
+# The others find the path through the fewest cells and ignore costs.
+# -----------------------------------------------------------------------------
+
+import heapq
+import time
+from array import array
+
+from events import CELL_VISITED, MOVE, UNDO, drain
+from grid import LEFT, RIGHT, TOP, BOTTOM, ALL_WALLS, OPPOSITE, PASSAGE_COUNT
+
+
+class SolveResult():
+    """
+    The outcome of solving a maze. Truthy when a path was found.
+    """
+
+    def __init__(self, strategy, path, nodes_expanded, peak_frontier, elapsed, cost=None):
+        """
+        Initialize the result.
+
+        Parameters:
+            strategy (str): The name of the strategy used.
+            path (list): The (column, row) positions from entrance to exit,
+                empty if the exit could not be reached.
+            nodes_expanded (int): The number of cells the search expanded.
+            peak_frontier (int): The largest number of cells waiting to be
+                expanded at any one time.
+            elapsed (float): Wall-clock seconds spent solving.
+            cost (int, optional): The sum of the traversal costs of the cells
+                entered along the path, None if no path was found.
+        """
+        self.strategy = strategy
+        self.path = path
+        self.nodes_expanded = nodes_expanded
+        self.peak_frontier = peak_frontier
+        self.elapsed = elapsed
+        self.cost = cost
+
+    @property
+    def found(self):
+        """
+        True if a path from entrance to exit was found.
+        """
+        return bool(self.path)
+
+    def __bool__(self):
+        return self.found
+
+    def __repr__(self):
+        return (f"SolveResult(strategy={self.strategy!r}, length={len(self.path)}, "
+                f"nodes_expanded={self.nodes_expanded}, peak_frontier={self.peak_frontier}, "
+                f"elapsed={self.elapsed:.6f})")
+
+
+# For each side, a translation table from a passages() mask to the side of
+# the neighbour it leads into, if the mask has that side open.
+_INTO = {side: bytes(OPPOSITE[side] if mask & side else 0 for mask in range(256))
+         for side in (LEFT, RIGHT, TOP, BOTTOM)}
+
+
+def _entries(grid, passages):
+    """
+    Return, for every cell, the mask of the sides through which a neighbour
+    leads into it: the passages() mask with every passage reversed. It
+    equals passages when every wall is open or closed on both sides.
+    """
+    cols, size = grid.num_cols, grid.size
+    # Shift the neighbours' masks onto the cells they lead into. Openings in
+    # the outer border are already cleared, so nothing wraps between rows.
+    shifted = (b"\0" + passages[:-1].translate(_INTO[RIGHT]),
+               passages[1:].translate(_INTO[LEFT]) + b"\0",
+               bytes(cols) + passages[:-cols].translate(_INTO[BOTTOM]),
+               passages[cols:].translate(_INTO[TOP]) + bytes(cols))
+    into = 0
+    for part in shifted:
+        into |= int.from_bytes(part, "little")
+    return into.to_bytes(size, "little")
+
+
+def _path_moves(path):
+    """
+    Yield the MOVE events along a path of cell ids.
+    """
+    for k in range(len(path) - 1):
+        yield MOVE, path[k], path[k + 1]
+
+
+def _trace_path(parent, goal):
+    """
+    Follow parent links back from goal and return the path from the root.
+    """
+    path = [goal]
+    index = parent[goal]
+    while index != -1:
+        path.append(index)
+        index = parent[index]
+    path.reverse()
+    return path
+
+
+def dfs(grid, start, goal, events=True):
+    """
+    Depth-first search with backtracking, using an explicit stack. Neighbours
+    are tried left, right, up, down, and abandoned branches are yielded as
+    UNDO events. Marks the cells it reaches in grid.visited. The path found is
+    not necessarily the shortest one.
+    """
+    passages = grid.passages()
+    steps = grid.steps()
+    seen = bytearray(grid.size)
+    seen[start] = 1
+    stack = array("i", [start])
+    # For each cell on the stack, the position in its steps to try next.
+    tried = bytearray(1)
+    expanded = 1
+    peak = 1
+    path = [start] if start == goal else []
+    while stack and not path:
+        index = stack[-1]
+        options = steps[passages[index]]
+        k = tried[-1]
+        while k < len(options) and seen[index + options[k]]:
+            k += 1
+        if k == len(options):
+            # Every direction from this cell is exhausted: back out of it.
+            stack.pop()
+            tried.pop()
+            if events and stack:
+                yield UNDO, stack[-1], index
+            continue
+        other = index + options[k]
+        tried[-1] = k + 1
+        if events:
+            yield MOVE, index, other
+        seen[other] = 1
+        expanded += 1
+        stack.append(other)
+        tried.append(0)
+        if len(stack) > peak:
+            peak = len(stack)
+        if other == goal:
+            path = list(stack)
+    grid.visited.update(seen)
+    return path, expanded, peak
+
+
+def bfs(grid, start, goal, events=True):
+    """
+    Breadth-first search. Returns a shortest path.
+    """
+    passages = grid.passages()
+    steps = grid.steps()
+    parent = array("i", [-1]) * grid.size
+    seen = bytearray(grid.size)
+    seen[start] = 1
+    queue = array("i", [start])
+    head = 0
+    peak = 1
+    while head < len(queue):
+        if len(queue) - head > peak:
+            peak = len(queue) - head
+        index = queue[head]
+        head += 1
+        if index == goal:
+            path = _trace_path(parent, goal)
+            if events:
+                yield from _path_moves(path)
+            return path, head, peak
+        for offset in steps[passages[index]]:
+            other = index + offset
+            if not seen[other]:
+                seen[other] = 1
+                parent[other] = index
+                queue.append(other)
+                if events:
+                    yield CELL_VISITED, other, index
+    return [], head, peak
+
+
+def astar(grid, start, goal, events=True):
+    """
+    A* search with the Manhattan distance to the goal as heuristic, scaled by
+    the cheapest cell cost so it never overestimates. Returns a cheapest path
+    while usually expanding far fewer cells than BFS or Dijkstra.
+    """
+    cols = grid.num_cols
+    goal_i, goal_j = goal % cols, goal // cols
+    passages = grid.passages()
+    steps = grid.steps()
+    costs = grid.costs
+    weight = 1 if costs is None else min(costs)
+    parent = array("i", [-1]) * grid.size
+    cost = array("i", [-1]) * grid.size
+    closed = bytearray(grid.size)
+    cost[start] = 0
+    # Heap entries pack (f, h, index) into one integer, so they order the
+    # same as the tuples would: ties on f prefer cells closer to the goal.
+    index_bits = grid.size.bit_length()
+    f_shift = index_bits + (weight * (grid.num_rows + cols)).bit_length()
+    index_mask = (1 << index_bits) - 1
+    start_h = weight * (abs(start % cols - goal_i) + abs(start // cols - goal_j))
+    heap = [(start_h << f_shift) | (start_h << index_bits) | start]
+    push = heapq.heappush
+    pop = heapq.heappop
+    expanded = 0
+    peak = 1
+    while heap:
+        if len(heap) > peak:
+            peak = len(heap)
+        index = pop(heap) & index_mask
+        if closed[index]:
+            continue
+        closed[index] = 1
+        expanded += 1
+        if index == goal:
+            path = _trace_path(parent, goal)
+            if events:
+                yield from _path_moves(path)
+            return path, expanded, peak
+        base = cost[index]
+        for offset in steps[passages[index]]:
+            other = index + offset
+            new_cost = base + 1 if costs is None else base + costs[other]
+            if closed[other] or (cost[other] != -1 and cost[other] <= new_cost):
+                continue
+            cost[other] = new_cost
+            parent[other] = index
+            h = weight * (abs(other % cols - goal_i) + abs(other // cols - goal_j))
+            push(heap, ((new_cost + h) << f_shift) | (h << index_bits) | other)
+            if events:
+                yield CELL_VISITED, other, index
+    return [], expanded, peak
+
+
+def dijkstra(grid, start, goal, events=True):
+    """
+    Dijkstra's search for a cheapest path, with the traversal cost of each
+    cell entered as the step cost. Costs are small integers, so the frontier
+    is a bucket queue (Dial's algorithm): one bucket per pending cost, used
+    in rotation, instead of a heap.
+    """
+    passages = grid.passages()
+    steps = grid.steps()
+    costs = grid.costs
+    if costs is None:
+        costs = bytes([1]) * grid.size
+    parent = array("i", [-1]) * grid.size
+    cost = array("i", [-1]) * grid.size
+    closed = bytearray(grid.size)
+    cost[start] = 0
+    # Every pending cost lies within the largest step cost of the current
+    # one, so that many buckets, reused in turn, hold the whole frontier.
+    width = max(costs) + 1
+    buckets = [array("i") for _ in range(width)]
+    buckets[0].append(start)
+    pending = 1
+    current = 0
+    expanded = 0
+    peak = 1
+    while pending:
+        bucket = buckets[current % width]
+        while bucket:
+            index = bucket.pop()
+            pending -= 1
+            if closed[index] or cost[index] != current:
+                continue
+            closed[index] = 1
+            expanded += 1
+            if index == goal:
+                path = _trace_path(parent, goal)
+                if events:
+                    yield from _path_moves(path)
+                return path, expanded, peak
+            for offset in steps[passages[index]]:
+                other = index + offset
+                new_cost = current + costs[other]
+                if closed[other] or (cost[other] != -1 and cost[other] <= new_cost):
+                    continue
+                cost[other] = new_cost
+                parent[other] = index
+                buckets[new_cost % width].append(other)
+                pending += 1
+                if events:
+                    yield CELL_VISITED, other, index
+            if pending > peak:
+                peak = pending
+        current += 1
+    return [], expanded, peak
+
+
+def bidir(grid, start, goal, events=True):
+    """
+    Bidirectional breadth-first search, growing one level at a time from
+    whichever end has the smaller frontier. Returns a shortest path.
+    """
+    if start == goal:
+        return [start], 1, 1
+    size = grid.size
+    passages = grid.passages()
+    # The search from the goal follows the passages backwards.
+    masks = (passages, _entries(grid, passages))
+    steps = grid.steps()
+    parents = (array("i", [-1]) * size, array("i", [-1]) * size)
+    dists = (array("i", [-1]) * size, array("i", [-1]) * size)
+    dists[0][start] = 0
+    dists[1][goal] = 0
+    frontiers = [array("i", [start]), array("i", [goal])]
+    expanded = 0
+    peak = 2
+    while frontiers[0] and frontiers[1]:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        parent, dist, mask = parents[side], dists[side], masks[side]
+        other_dist = dists[1 - side]
+        best = None
+        best_length = -1
+        next_frontier = array("i")
+        # Expand the whole level, keeping the shortest meeting point found.
+        for index in frontiers[side]:
+            expanded += 1
+            level = dist[index] + 1
+            for offset in steps[mask[index]]:
+                other = index + offset
+                if other_dist[other] != -1:
+                    length = level + other_dist[other]
+                    if best is None or length < best_length:
+                        best = (index, other)
+                        best_length = length
+                if dist[other] == -1:
+                    dist[other] = level
+                    parent[other] = index
+                    next_frontier.append(other)
+                    if events:
+                        yield CELL_VISITED, other, index
+        frontiers[side] = next_frontier
+        peak = max(peak, len(frontiers[0]) + len(frontiers[1]))
+        if best is not None:
+            index, other = best
+            if side == 1:
+                index, other = other, index
+            # Join the half from the start with the half towards the goal.
+            path = _trace_path(parents[0], index)
+            tail = _trace_path(parents[1], other)
+            tail.reverse()
+            path.extend(tail)
+            if events:
+                yield from _path_moves(path)
+            return path, expanded, peak
+    return [], expanded, peak
+
+
+def dead_end_fill(grid, start, goal, events=True):
+    """
+    Dead-end filling: repeatedly fill in cells with a single open passage
+    (other than the start and goal) until none remain. In a perfect maze the
+    cells left unfilled are exactly the solution path; any loops left over
+    are resolved with a breadth-first search over the unfilled cells.
+
+    With one-way passages a cell is also filled when it cannot be entered or
+    cannot be left, as no path from the start to the goal runs through it.
+    """
+    size = grid.size
+    passages = grid.passages()
+    into = _entries(grid, passages)
+    steps = grid.steps()
+    # The number of passages out of each cell, into it, and of neighbours
+    # joined to it either way; all three are equal when no wall is one-sided.
+    outward = bytearray(passages.translate(PASSAGE_COUNT))
+    inward = bytearray(into.translate(PASSAGE_COUNT))
+    if into == passages:
+        joined = passages
+    else:
+        joined = (int.from_bytes(passages, "little") | int.from_bytes(into, "little")).to_bytes(size, "little")
+    degree = bytearray(joined.translate(PASSAGE_COUNT))
+    # For each mask of joined sides, the sides with the offsets of the
+    # neighbours across them.
+    offsets = ((LEFT, -1), (RIGHT, 1), (TOP, -grid.num_cols), (BOTTOM, grid.num_cols))
+    links = tuple(tuple((side, offset) for side, offset in offsets if mask & side)
+                  for mask in range(ALL_WALLS + 1))
+    filled = bytearray(size)
+    queue = array("i")
+    # Queue the cells with at most one neighbour, or no way in or out, found
+    # without a Python loop over every cell.
+    for counts, count in ((degree, 0), (degree, 1), (outward, 0), (inward, 0)):
+        index = counts.find(count)
+        while index != -1:
+            if index != start and index != goal:
+                queue.append(index)
+            index = counts.find(count, index + 1)
+    peak = len(queue)
+    head = 0
+    while head < len(queue):
+        index = queue[head]
+        head += 1
+        if filled[index]:
+            continue
+        filled[index] = 1
+        leads_out = passages[index]
+        leads_in = into[index]
+        for side, offset in links[joined[index]]:
+            other = index + offset
+            if filled[other]:
+                continue
+            if events:
+                yield CELL_VISITED, index, other
+            degree[other] -= 1
+            if leads_out & side:
+                inward[other] -= 1
+            if leads_in & side:
+                outward[other] -= 1
+            if (degree[other] <= 1 or not inward[other] or not outward[other]) \
+                    and other != start and other != goal:
+                queue.append(other)
+        if len(queue) - head > peak:
+            peak = len(queue) - head
+    expanded = head
+
+    # Walk what is left, breadth first, to pick a shortest route through it.
+    parent = array("i", [-1]) * size
+    filled[start] = 1
+    frontier = array("i", [start])
+    head = 0
+    while head < len(frontier):
+        index = frontier[head]
+        head += 1
+        if index == goal:
+            path = _trace_path(parent, goal)
+            if events:
+                yield from _path_moves(path)
+            return path, expanded + head, peak
+        for offset in steps[passages[index]]:
+            other = index + offset
+            if not filled[other]:
+                filled[other] = 1
+                parent[other] = index
+                frontier.append(other)
+    return [], expanded + head, peak
+
+
+# Registry of the available strategies, selectable by name.
+SOLVERS = {
+    "dfs": dfs,
+    "bfs": bfs,
+    "astar": astar,
+    "dijkstra": dijkstra,
+    "bidir": bidir,
+    "dead_end_fill": dead_end_fill,
+}
+
+
+def get_solver(name):
+    """
+    Look up a solving strategy by name.
+
+    Parameters:
+        name (str): One of the keys of SOLVERS.
+
+    Returns:
+        function: The generator function implementing the strategy.
+    """
+    try:
+        return SOLVERS[name]
+    except KeyError:
+        raise ValueError(
+            f"unknown solver strategy {name!r}, expected one of {', '.join(SOLVERS)}") from None
+
+
+def solve_steps(grid, start, goal, strategy="bfs", events=True):
+    """
+    Solve a grid between two cells with the named strategy, returning a
+    generator that yields the strategy's events and returns a SolveResult. Used to run
+    a search a slice at a time, for example by TkRenderer.schedule().
+
+    Parameters:
+        grid (Grid): The maze to solve.
+        start (int): The id of the starting cell.
+        goal (int): The id of the goal cell.
+        strategy (str): One of the keys of SOLVERS (default is "bfs").
+        events (bool): Yield the search's events (default is True).
+    """
+    # Look the strategy up now, so an unknown name fails before any step runs.
+    steps = get_solver(strategy)(grid, start, goal, events=events)
+    return _timed(grid, strategy, steps)
+
+
+def _timed(grid, strategy, steps):
+    """
+    Pass a strategy's events through and wrap its outcome in a SolveResult.
+    """
+    started = time.perf_counter()
+    path, expanded, peak = yield from steps
+    elapsed = time.perf_counter() - started
+    if not path:
+        cost = None
+    elif grid.costs is None:
+        cost = len(path) - 1
+    else:
+        cost = sum(grid.costs[index] for index in path[1:])
+    return SolveResult(strategy, [grid.coords(index) for index in path], expanded, peak, elapsed,
+                       cost)
+
+
+def solve(grid, start, goal, strategy="bfs", renderer=None):
+    """
+    Solve a grid between two cells with the named strategy.
+
+    Parameters:
+        grid (Grid): The maze to solve.
+        start (int): The id of the starting cell.
+        goal (int): The id of the goal cell.
+        strategy (str): One of the keys of SOLVERS (default is "bfs").
+        renderer (TkRenderer, optional): Draws the search as it runs. Without
+            one the search runs at full speed.
+
+    Returns:
+        SolveResult: The path as (column, row) positions plus search statistics.
+    """
+    # Without a renderer nobody reads the events, so skip building them.
+    steps = solve_steps(grid, start, goal, strategy, events=renderer is not None)
+    if renderer is None:
+        return drain(steps)
+    return renderer.play(steps)
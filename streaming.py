@@ -0,0 +1,208 @@
+# -----------------------------------------------------------------------------
+# Module: Streaming
+# Description: Generates and checks mazes one row at a time, for mazes too
+# tall to hold in memory.
+#
+# eller_rows() yields the wall masks of a maze row by row, in the same layout
+# as a Grid's wall array, using Eller's algorithm. Only the current and next
+# row are kept, so memory is proportional to the number of columns however
+# many rows are generated. The rows can go straight to mazefile.save_rows()
+# or export.write_rows(), and RowChecker verifies them on the way through:
+#
+#   checker = RowChecker(num_cols)
+#   rows = checker.watch(eller_rows(num_cols, num_rows, seed))
+#   mazefile.save_rows("big.maze", num_cols, rows, seed, "eller")
+#   assert checker.finish().solvable
+# -----------------------------------------------------------------------------
+
+import random
+from array import array
+from collections import namedtuple
+
+from generators import EllerRows
+from grid import LEFT, RIGHT, TOP, BOTTOM, ALL_WALLS, HAS_LEFT, HAS_RIGHT, HAS_TOP, HAS_BOTTOM
+
+RowReport = namedtuple("RowReport", "rows components cycles solvable")
+RowReport.__doc__ = """
+The outcome of checking a streamed maze. components counts the connected
+regions of the maze and cycles the passages that close a loop, so a perfect
+maze has components == 1 and cycles == 0. solvable is True when the exit, in
+the bottom-right cell, can be reached from the entrance in the top-left.
+"""
+
+
+def _first_difference(a, b):
+    """
+    Return the first position at which two equal-length byte strings differ.
+    """
+    return next(k for k in range(len(a)) if a[k] != b[k])
+
+
+def eller_rows(num_cols, num_rows=None, seed=None):
+    """
+    Generate a maze with Eller's algorithm, yielding one row at a time. The
+    walls match generators.build(num_rows, num_cols, seed, "eller"), with the
+    entrance in the top of the first cell and the exit in the bottom of the
+    last cell open.
+
+    Parameters:
+        num_cols (int): The number of columns in the maze.
+        num_rows (int, optional): The number of rows. Without it the stream
+            never ends and no exit is opened; rows that have been yielded
+            are final, but the maze is only guaranteed to be connected once
+            a last row closes it.
+        seed (int, optional): Seed for reproducible generation.
+
+    Yields:
+        bytearray: The wall masks of each row, num_cols bytes.
+    """
+    stream = EllerRows(num_cols, random.Random(seed))
+    row = bytearray([ALL_WALLS]) * num_cols
+    row[0] &= ~TOP
+    j = 0
+    while num_rows is None or j < num_rows:
+        last = j == num_rows - 1 if num_rows is not None else False
+        below = bytearray([ALL_WALLS]) * num_cols
+        for k, side in stream.carve_row(last):
+            if side == RIGHT:
+                row[k] &= ~RIGHT
+                row[k + 1] &= ~LEFT
+            else:
+                row[k] &= ~BOTTOM
+                below[k] &= ~TOP
+        if last:
+            row[-1] &= ~BOTTOM
+        yield row
+        row = below
+        j += 1
+
+
+class RowChecker():
+    """
+    Checks the connectivity of a maze from its rows of wall masks, one row at
+    a time, keeping only a union-find over the cells of the latest row.
+    """
+
+    def __init__(self, num_cols):
+        """
+        Initialize the checker.
+
+        Parameters:
+            num_cols (int): The number of columns in the maze.
+        """
+        self.num_cols = num_cols
+        self.rows = 0
+        self.cycles = 0
+        # Regions that no longer reach the latest row and so are complete.
+        self.closed = 0
+        # The region of each cell of the latest row, named after its leftmost
+        # column, and the region holding the entrance (-1 once it is closed).
+        self._labels = array("i", range(num_cols))
+        self._entrance = 0
+        self._bottoms = None
+
+    def feed(self, row):
+        """
+        Add the next row of the maze.
+
+        Parameters:
+            row (bytes-like): The wall masks of the row, num_cols bytes.
+
+        Raises:
+            ValueError: If the row has the wrong length, or its walls do not
+                match those of its neighbours.
+        """
+        cols = self.num_cols
+        if len(row) != cols:
+            raise ValueError(f"row {self.rows} holds {len(row)} cells, expected {cols}")
+        # Labels 0..cols-1 are the regions of the previous row, cols + k the
+        # cells of this row before they are joined to anything.
+        parent = list(range(2 * cols))
+
+        def find(label):
+            while parent[label] != label:
+                parent[label] = parent[parent[label]]
+                label = parent[label]
+            return label
+
+        def union(a, b):
+            a, b = find(a), find(b)
+            if a == b:
+                self.cycles += 1
+            else:
+                parent[b] = a
+
+        # Compare the walls with their neighbours' a whole row at a time.
+        row = bytes(row)
+        tops = row.translate(HAS_TOP)
+        rights = row[:-1].translate(HAS_RIGHT)
+        if self._bottoms is not None and tops != self._bottoms:
+            k = _first_difference(tops, self._bottoms)
+            raise ValueError(f"row {self.rows} column {k}: top wall does not match the row above")
+        if rights != row[1:].translate(HAS_LEFT):
+            k = _first_difference(rights, row[1:].translate(HAS_LEFT))
+            raise ValueError(f"row {self.rows} column {k}: right wall does not match its neighbour")
+
+        if self._bottoms is not None:
+            k = tops.find(0)
+            while k != -1:
+                union(self._labels[k], cols + k)
+                k = tops.find(0, k + 1)
+        k = rights.find(0)
+        while k != -1:
+            union(cols + k, cols + k + 1)
+            k = rights.find(0, k + 1)
+
+        if self._bottoms is None:
+            previous = ()
+            entrance = cols
+        else:
+            previous = set(find(label) for label in self._labels)
+            entrance = self._entrance
+        # Name each region after its leftmost column in this row.
+        names = {}
+        labels = array("i", [0]) * cols
+        for k in range(cols):
+            labels[k] = names.setdefault(find(cols + k), k)
+        # Regions of the previous row that did not continue are complete.
+        self.closed += sum(1 for root in previous if root not in names)
+        if self._entrance != -1:
+            self._entrance = names.get(find(entrance), -1)
+        self._labels = labels
+        self._bottoms = row.translate(HAS_BOTTOM)
+        self.rows += 1
+
+    def watch(self, rows):
+        """
+        Check rows as they pass through, yielding each one unchanged.
+
+        Parameters:
+            rows (iterable): The rows of the maze.
+        """
+        for row in rows:
+            self.feed(row)
+            yield row
+
+    def finish(self):
+        """
+        Return the report for the rows fed so far, taking the latest row as
+        the last one of the maze.
+
+        Returns:
+            RowReport: The number of rows, regions and cycles, and whether
+                the exit can be reached from the entrance.
+        """
+        open_regions = len(set(self._labels)) if self.rows else 0
+        solvable = (self.rows > 0 and self._entrance != -1
+                    and self._labels[self.num_cols - 1] == self._entrance)
+        return RowReport(self.rows, self.closed + open_regions, self.cycles, solvable)
+
+
+def check_rows(num_cols, rows):
+    """
+    Check a stream of rows and return its RowReport.
+    """
+    checker = RowChecker(num_cols)
+    for row in rows:
+        checker.feed(row)
+    return checker.finish()
@@ -1,5 +1,129 @@
+import contextlib
+import heapq
+import io
+import json
+import os
+import random
+import struct
+import subprocess
+import sys
+import tempfile
 import unittest
-from tk_classes import Window, Maze
+import zlib
+from array import array
+from tk_classes import Window, Cell, Maze
+from grid import Grid, LEFT, RIGHT, TOP, BOTTOM, ALL_WALLS, OPPOSITE, PASSAGE_COUNT
+from generators import ALGORITHMS
+from solvers import SOLVERS, solve
+from render import TkRenderer
+import export
+import mazefile
+import events
+import analysis
+from batch import MazeSpec, generate_batch, solve_batch
+from generators import build
+import streaming
+import paths
+import background
+import bench
+import viewport
+import maze
+import metrics
+
+
+def count_passages(grid):
+    # Number of open walls between neighbouring cells.
+    return sum(
+        1
+        for index in range(grid.size)
+        for side in (RIGHT, BOTTOM)
+        if grid.neighbour(index, side) != -1 and not grid.has_wall(index, side)
+    )
+
+
+def reachable_cells(grid, start=0):
+    # Number of cells reachable from start through open walls.
+    seen = {start}
+    stack = [start]
+    while stack:
+        index = stack.pop()
+        for side in (LEFT, RIGHT, TOP, BOTTOM):
+            other = grid.neighbour(index, side)
+            if other != -1 and not grid.has_wall(index, side) and other not in seen:
+                seen.add(other)
+                stack.append(other)
+    return len(seen)
+
+
+class RecordingCanvas():
+    # Stands in for a tkinter Canvas and records the lines drawn on it.
+    def __init__(self):
+        self.lines = []
+        self.items = {}
+
+    def create_line(self, *coords, fill="black", width=1, tags=None):
+        self.lines.append((coords, fill))
+        self.items[len(self.lines)] = [coords, fill, tags]
+        return len(self.lines)
+
+    def create_image(self, x, y, image=None, anchor=None, tags=None):
+        self.lines.append(((x, y), image))
+        self.items[len(self.lines)] = [(x, y), image, tags]
+        return len(self.lines)
+
+    def coords(self, item, *coords):
+        self.items[item][0] = coords
+
+    def itemconfig(self, item, fill):
+        self.items[item][1] = fill
+
+    def delete(self, item):
+        if isinstance(item, str):
+            # A tag deletes every item carrying it.
+            for key in [key for key, value in self.items.items() if value[2] == item]:
+                del self.items[key]
+        else:
+            del self.items[item]
+
+    def bind(self, sequence, callback):
+        self.bindings = getattr(self, "bindings", {})
+        self.bindings[sequence] = callback
+
+
+class RecordingWindow(Window):
+    # A Window that draws on a RecordingCanvas instead of opening a display.
+    def __init__(self):
+        self.canvas = RecordingCanvas()
+        self._items = {}
+        self.redraws = 0
+
+    def redraw(self):
+        self.redraws += 1
+
+    def set_title(self, text):
+        self.title = text
+
+    def after(self, delay, callback):
+        # Callbacks wait in a queue until run_pending() plays the event loop.
+        self.scheduled = getattr(self, "scheduled", {})
+        self.after_count = getattr(self, "after_count", 0) + 1
+        after_id = f"after#{self.after_count}"
+        self.scheduled[after_id] = callback
+        return after_id
+
+    def after_cancel(self, after_id):
+        del self.scheduled[after_id]
+
+    def photo_image(self, data):
+        return data
+
+    def run_pending(self):
+        ticks = 0
+        while getattr(self, "scheduled", None):
+            self.scheduled.pop(next(iter(self.scheduled)))()
+            ticks += 1
+        return ticks
+
 
 class Tests(unittest.TestCase):
     def test_maze_create_cells(self):
@@ -39,5 +163,911 @@ class Tests(unittest.TestCase):
                     False,
                 )
 
+    def test_grid_carve_removes_both_walls(self):
+        grid = Grid(3, 4)
+        index = grid.index(1, 1)
+        other = grid.carve(index, RIGHT)
+        self.assertEqual(other, grid.index(2, 1))
+        self.assertFalse(grid.has_wall(index, RIGHT))
+        self.assertFalse(grid.has_wall(other, LEFT))
+        self.assertEqual(grid.walls[index], ALL_WALLS & ~RIGHT)
+        self.assertEqual(grid.neighbour(grid.index(0, 0), TOP), -1)
+        self.assertEqual(grid.neighbour(grid.index(3, 2), BOTTOM), -1)
+        # Sides are the four bit constants; anything else is rejected.
+        for side in (LEFT | RIGHT, 0, "left"):
+            with self.assertRaises(ValueError):
+                grid.carve(index, side)
+        self.assertEqual(grid.walls[index], ALL_WALLS & ~RIGHT)
+
+    def test_grid_visited_bitset(self):
+        grid = Grid(5, 5)
+        grid.visited.add(7)
+        grid.visited.add(24)
+        self.assertIn(7, grid.visited)
+        self.assertNotIn(8, grid.visited)
+        self.assertEqual(grid.visited.count(), 2)
+        grid.visited.discard(7)
+        self.assertNotIn(7, grid.visited)
+        grid.reset_visited()
+        self.assertEqual(grid.visited.count(), 0)
+
+    def test_grid_passages_leave_out_border_openings(self):
+        grid = Grid(2, 2)
+        grid.set_wall(0, TOP, False)
+        grid.set_wall(3, BOTTOM, False)
+        grid.carve(0, RIGHT)
+        grid.carve(1, BOTTOM)
+        self.assertEqual(list(grid.passages()), [RIGHT, LEFT | BOTTOM, 0, TOP])
+        steps = grid.steps()
+        self.assertEqual([[index + offset for offset in steps[mask]]
+                          for index, mask in enumerate(grid.passages())],
+                         [grid.open_neighbours(index) for index in range(grid.size)])
+        # The mask is kept until the walls change.
+        self.assertIs(grid.passages(), grid.passages())
+        grid.carve(2, RIGHT)
+        self.assertEqual(list(grid.passages()), [RIGHT, LEFT | BOTTOM, RIGHT, TOP | LEFT])
+        grid.walls[0] |= RIGHT
+        grid.walls_changed()
+        self.assertEqual(grid.passages()[0], 0)
+        for generate in ALGORITHMS.values():
+            grid = Grid(6, 5)
+            grid.passages()
+            events.drain(generate(grid, random.Random(1)))
+            self.assertEqual(grid.passages(), Grid(6, 5, bytearray(grid.walls)).passages())
+
+        visited = Grid(3, 7).visited
+        visited.add(20)
+        visited.update(bytes([1, 0, 0, 0, 0, 0, 0, 0, 1, 1] + [0] * 11))
+        self.assertEqual([index for index in range(21) if index in visited], [0, 8, 9, 20])
+
+    def test_maze_cells_are_views_onto_grid(self):
+        m1 = Maze(0, 0, 10, 12, 10, 10, seed=0)
+        cell = m1._cells[3][4]
+        cell.has_left_wall = True
+        self.assertTrue(m1._grid.has_wall(m1._grid.index(3, 4), LEFT))
+        cell.visited = True
+        self.assertIn(m1._grid.index(3, 4), m1._grid.visited)
+        with self.assertRaises(IndexError):
+            m1._cells[12]
+
+    def test_maze_solve_without_window(self):
+        m1 = Maze(0, 0, 10, 12, 10, 10, seed=0)
+        self.assertTrue(m1.solve())
+
+    def test_maze_algorithms_generate_perfect_mazes(self):
+        for algorithm in ALGORITHMS:
+            for num_rows, num_cols in ((1, 1), (1, 9), (9, 1), (10, 12)):
+                m1 = Maze(0, 0, num_rows, num_cols, 10, 10, seed=5, algorithm=algorithm)
+                grid = m1._grid
+                self.assertEqual(count_passages(grid), grid.size - 1, algorithm)
+                self.assertEqual(reachable_cells(grid), grid.size, algorithm)
+
+    def test_maze_seed_is_reproducible(self):
+        for algorithm in ALGORITHMS:
+            m1 = Maze(0, 0, 10, 12, 10, 10, seed=11, algorithm=algorithm)
+            m2 = Maze(0, 0, 10, 12, 10, 10, seed=11, algorithm=algorithm)
+            self.assertEqual(m1._grid.walls, m2._grid.walls, algorithm)
+
+    def test_maze_seed_does_not_touch_global_random(self):
+        random.seed(3)
+        expected = random.random()
+        random.seed(3)
+        Maze(0, 0, 10, 12, 10, 10, seed=1)
+        self.assertEqual(random.random(), expected)
+
+    def test_maze_deep_backtracking_does_not_recurse(self):
+        m1 = Maze(0, 0, 1, 5000, 10, 10, seed=0)
+        self.assertEqual(count_passages(m1._grid), 4999)
+
+    def test_maze_unknown_algorithm(self):
+        with self.assertRaises(ValueError):
+            Maze(0, 0, 10, 12, 10, 10, algorithm="nope")
+
+    def test_maze_solve_strategies_find_the_same_path(self):
+        m1 = Maze(0, 0, 10, 12, 10, 10, seed=2)
+        paths = {}
+        for strategy in SOLVERS:
+            result = m1.solve(strategy)
+            self.assertTrue(result, strategy)
+            self.assertEqual(result.path[0], (0, 0))
+            self.assertEqual(result.path[-1], (11, 9))
+            self.assertGreater(result.nodes_expanded, 0)
+            self.assertGreater(result.peak_frontier, 0)
+            paths[strategy] = result.path
+        # A perfect maze has exactly one route from entrance to exit.
+        for path in paths.values():
+            self.assertEqual(path, paths["bfs"])
+
+    def test_solvers_find_shortest_path_with_loops(self):
+        grid = Grid(3, 3)
+        # Open every interior wall: the shortest route is 5 cells long.
+        for index in range(grid.size):
+            for side in (RIGHT, BOTTOM):
+                if grid.neighbour(index, side) != -1:
+                    grid.carve(index, side)
+        for strategy in ("bfs", "astar", "bidir", "dead_end_fill"):
+            self.assertEqual(len(solve(grid, 0, 8, strategy).path), 5, strategy)
+
+    def test_solvers_accept_walls_closed_on_one_side(self):
+        # A passage leads out of a cell when the cell's own wall is open. Cell
+        # 1 is open towards cell 0, and cell 4 towards cell 1, but both walls
+        # are closed on the other side, so no route leads from 0 to 5.
+        grid = Grid(2, 3, bytearray([RIGHT, RIGHT | BOTTOM, ALL_WALLS,
+                                     LEFT | RIGHT, ALL_WALLS & ~TOP, ALL_WALLS & ~RIGHT]))
+        for strategy in SOLVERS:
+            self.assertEqual(solve(grid, 0, 5, strategy).path, [], strategy)
+        # Opening cells 3 and 4 to the right, one way, gives the route 0, 3, 4, 5.
+        grid.set_wall(3, RIGHT, False)
+        grid.set_wall(4, RIGHT, False)
+        for strategy in SOLVERS:
+            path = solve(grid, 0, 5, strategy).path
+            self.assertEqual([grid.index(*position) for position in path], [0, 3, 4, 5], strategy)
+        rng = random.Random(5)
+        found = 0
+        for seed in range(60):
+            grid = build(6, 6, seed, braid=0.5)
+            # Close passages on one side only, as Cell and Grid.set_wall allow.
+            for _ in range(6):
+                index = rng.randrange(grid.size)
+                side = rng.choice((LEFT, RIGHT, TOP, BOTTOM))
+                if grid.neighbour(index, side) != -1:
+                    grid.set_wall(index, side, True)
+            shortest = solve(grid, 0, grid.size - 1, "bfs").path
+            found += bool(shortest)
+            for strategy in SOLVERS:
+                path = solve(grid, 0, grid.size - 1, strategy).path
+                self.assertEqual(bool(path), bool(shortest), strategy)
+                if strategy != "dfs":
+                    self.assertEqual(len(path), len(shortest), strategy)
+                ids = [grid.index(*position) for position in path]
+                self.assertEqual(ids[:1] + ids[-1:], [0, grid.size - 1] if path else [], strategy)
+                for a, b in zip(ids, ids[1:]):
+                    self.assertIn(b, grid.open_neighbours(a), strategy)
+        # Most of the mazes still have a route to the exit.
+        self.assertGreater(found, 40)
+
+    def test_solvers_without_events_return_the_same_result(self):
+        m1 = Maze(0, 0, 15, 20, 10, 10, seed=4, algorithm="prim")
+        grid = m1._grid
+        for name, solver in SOLVERS.items():
+            grid.reset_visited()
+            with_events = events.drain(solver(grid, 0, grid.size - 1))
+            grid.reset_visited()
+            steps = solver(grid, 0, grid.size - 1, events=False)
+            with self.assertRaises(StopIteration) as stop:
+                next(steps)
+            self.assertEqual(stop.exception.value, with_events, name)
+
+    def test_solvers_report_unreachable_goal(self):
+        grid = Grid(2, 2)
+        for strategy in SOLVERS:
+            result = solve(grid, 0, 3, strategy)
+            self.assertFalse(result, strategy)
+            self.assertEqual(result.path, [])
+
+    def test_maze_solve_large_maze_without_recursion(self):
+        m1 = Maze(0, 0, 2, 3000, 10, 10, seed=0)
+        self.assertTrue(m1.solve("dfs"))
+
+    def test_maze_unknown_strategy(self):
+        m1 = Maze(0, 0, 10, 12, 10, 10)
+        with self.assertRaises(ValueError):
+            m1.solve("nope")
+
+    def test_renderer_batches_events_per_frame(self):
+        win = RecordingWindow()
+        renderer = TkRenderer(win, fps=None, steps_per_frame=10)
+        m1 = Maze(0, 0, 10, 12, 10, 10, seed=0, renderer=renderer)
+        # One frame for the initial grid, one per 10 carved walls, one per stream end.
+        self.assertGreaterEqual(renderer.frames, 119 // 10)
+        self.assertLessEqual(renderer.frames, 119 // 10 + 4)
+        self.assertEqual(win.redraws, renderer.frames)
+        frames = renderer.frames
+        result = m1.solve("bfs")
+        self.assertGreater(renderer.frames, frames)
+        # The solution is drawn in red, one segment per move.
+        red = [item for item in win.canvas.items.values() if item[1] == "red"]
+        self.assertEqual(len(red), len(result.path) - 1)
+
+    def test_renderer_instant_mode_draws_one_frame_per_stream(self):
+        win = RecordingWindow()
+        renderer = TkRenderer(win, fps=None, steps_per_frame=None)
+        m1 = Maze(0, 0, 10, 12, 10, 10, seed=0, renderer=renderer)
+        # Initial grid, entrance and exit, generation.
+        self.assertEqual(renderer.frames, 3)
+        m1.solve("astar")
+        self.assertEqual(renderer.frames, 4)
+
+    def test_renderer_reuses_canvas_items(self):
+        win = RecordingWindow()
+        renderer = TkRenderer(win, fps=None, steps_per_frame=1)
+        m1 = Maze(0, 0, 10, 12, 10, 10, seed=0, renderer=renderer)
+        # A perfect 12x10 maze keeps the border minus entrance and exit plus
+        # the interior walls that were not carved.
+        interior = 11 * 10 + 12 * 9
+        border = 2 * (12 + 10) - 2
+        self.assertEqual(len(win.canvas.items), border + interior - 119)
+        for strategy in ("dfs", "bfs", "dfs"):
+            m1.solve(strategy)
+        created = len(win.canvas.lines)
+        m1.solve("dfs")
+        # Solving again only recolours the existing move segments.
+        self.assertEqual(len(win.canvas.lines), created)
+        self.assertLessEqual(len(win.canvas.items), 2 * m1._grid.size + border)
+
+    def test_maze_animate_runs_from_the_event_loop(self):
+        win = RecordingWindow()
+        renderer = TkRenderer(win, fps=None, steps_per_frame=25)
+        m1 = Maze(0, 0, 8, 9, 10, 10, win, seed=3, renderer=renderer, defer=True)
+        # Nothing is generated until the event loop runs the animation.
+        self.assertEqual(count_passages(m1._grid), 0)
+        results = []
+        redraws = win.redraws
+        run = m1.animate("bfs", on_done=results.append)
+        self.assertFalse(run.done)
+        ticks = win.run_pending()
+        self.assertTrue(run.done)
+        self.assertEqual(count_passages(m1._grid), 8 * 9 - 1)
+        self.assertEqual(results, [run.result])
+        self.assertEqual(run.result.path, Maze(0, 0, 8, 9, 10, 10, seed=3).solve("bfs").path)
+        # Each tick draws at most one frame of steps_per_frame events.
+        self.assertGreater(ticks, (8 * 9 - 1) // 25)
+        # Tk's own loop refreshes the window, so it is never forced to.
+        self.assertEqual(win.redraws, redraws)
+
+        m2 = Maze(0, 0, 8, 9, 10, 10, win, seed=3, renderer=renderer, defer=True)
+        run = m2.animate("dfs")
+        win.scheduled.pop(next(iter(win.scheduled)))()
+        run.cancel()
+        self.assertTrue(run.cancelled)
+        self.assertEqual(win.run_pending(), 0)
+        self.assertFalse(run.done)
+
+    def test_cell_draw_reuses_canvas_items(self):
+        win = RecordingWindow()
+        grid = Grid(1, 2)
+        left = Cell(win, grid, 0)
+        right = Cell(win, grid, 1)
+        for _ in range(3):
+            left.draw(0, 0, 10, 10)
+            right.draw(10, 0, 20, 10)
+        # Seven distinct wall segments, the shared one drawn once.
+        self.assertEqual(len(win.canvas.items), 7)
+        left.has_right_wall = False
+        right.has_left_wall = False
+        left.draw(0, 0, 10, 10)
+        self.assertEqual(len(win.canvas.items), 6)
+        left.draw_move(right)
+        left.draw_move(right, undo=True)
+        self.assertEqual(len(win.canvas.items), 7)
+
+    def test_export_png_matches_maze_geometry(self):
+        m1 = Maze(0, 0, 4, 5, 6, 6, seed=3)
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "maze.png")
+            export.export(m1, path, m1.solve("bfs"), wall_width=1, margin=1)
+            with open(path, "rb") as file:
+                data = file.read()
+        self.assertEqual(data[:8], b"\x89PNG\r\n\x1a\n")
+        width, height = struct.unpack(">II", data[16:24])
+        self.assertEqual((width, height), (5 * 6 + 1 + 2, 4 * 6 + 1 + 2))
+        start = data.index(b"IDAT") + 4
+        length = struct.unpack(">I", data[start - 8:start - 4])[0]
+        pixels = zlib.decompress(data[start:start + length])
+        rows = [pixels[k * (width + 1) + 1:(k + 1) * (width + 1)] for k in range(height)]
+        # The entrance is open, the top-left corner post and left border are drawn.
+        self.assertEqual(rows[1][1], export.BLACK)
+        self.assertEqual(rows[1][3], export.WHITE)
+        self.assertTrue(all(row[1] == export.BLACK for row in rows[1:-1]))
+        self.assertIn(export.RED, b"".join(rows))
+
+    def test_export_ppm_and_svg(self):
+        m1 = Maze(10, 10, 6, 8, 10, 10, seed=1)
+        with tempfile.TemporaryDirectory() as folder:
+            ppm = os.path.join(folder, "maze.ppm")
+            svg = os.path.join(folder, "maze.svg")
+            export.export(m1, ppm)
+            export.export(m1, svg, m1.solve("astar"))
+            with open(ppm, "rb") as file:
+                data = file.read()
+            with open(svg) as file:
+                text = file.read()
+        header = b"P6\n102 82\n255\n"
+        self.assertTrue(data.startswith(header))
+        self.assertEqual(len(data), len(header) + 102 * 82 * 3)
+        self.assertEqual(text.count('stroke="black"'), 1)
+        self.assertEqual(text.count('stroke="red"'), 1)
+        with self.assertRaises(ValueError):
+            export.export(m1, os.path.join(folder, "maze.gif"))
+
+    def test_export_options_per_format(self):
+        m1 = Maze(10, 10, 6, 8, 10, 10, seed=1)
+        with tempfile.TemporaryDirectory() as folder:
+            svg = os.path.join(folder, "maze.svg")
+            export.export(m1, svg, m1.solve("bfs"), cell_size=4, wall_width=1, margin=3)
+            with open(svg) as file:
+                text = file.read()
+            # The same size as the raster: margins, cells and one more wall.
+            self.assertIn('width="39" height="31"', text)
+            ppm = os.path.join(folder, "maze.ppm")
+            export.export(m1, ppm, cell_size=4, wall_width=1, margin=3)
+            with open(ppm, "rb") as file:
+                self.assertTrue(file.read().startswith(b"P6\n39 31\n"))
+            self.assertEqual(text.count('stroke-width="1"'), 2)
+            sizes = []
+            for level in (0, 9):
+                png = os.path.join(folder, "maze%d.png" % level)
+                export.export(m1, png, cell_size=4, wall_width=1, level=level)
+                sizes.append(os.path.getsize(png))
+            self.assertGreater(sizes[0], sizes[1])
+            # PPM and SVG files are not compressed.
+            for name in ("maze.ppm", "maze.svg"):
+                with self.assertRaisesRegex(ValueError, "level"):
+                    export.export(m1, os.path.join(folder, name), level=1)
+            with self.assertRaisesRegex(ValueError, "colour"):
+                export.export(m1, svg, colour="blue")
+
+    def test_maze_save_and_load_round_trip(self):
+        m1 = Maze(0, 0, 9, 13, 10, 10, seed=4, algorithm="kruskal")
+        expected = m1.solve("bfs").path
+        with tempfile.TemporaryDirectory() as folder:
+            for compact in (False, True):
+                for mmap in (False, True):
+                    path = os.path.join(folder, f"maze-{compact}-{mmap}.maze")
+                    m1.save(path, compact=compact)
+                    m2 = Maze.load(path, mmap=mmap)
+                    self.assertEqual(bytes(m2._grid.walls), bytes(m1._grid.walls))
+                    self.assertEqual((m2.seed, m2.algorithm), (4, "kruskal"))
+                    self.assertEqual(m2.solve("bfs").path, expected)
+                    self.assertEqual(m2.solve("dfs").path, m1.solve("dfs").path)
+                    del m2
+            # Compact files hold two cells per byte.
+            size = os.path.getsize(os.path.join(folder, "maze-True-True.maze"))
+            self.assertEqual(size, mazefile.HEADER_SIZE + (9 * 13 + 1) // 2)
+
+    def test_maze_load_rejects_corrupt_file(self):
+        m1 = Maze(0, 0, 5, 5, 10, 10, seed=4)
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "maze.maze")
+            m1.save(path)
+            with open(path, "r+b") as file:
+                file.seek(mazefile.HEADER_SIZE + 3)
+                file.write(b"\xff")
+            with self.assertRaises(mazefile.MazeFileError):
+                Maze.load(path)
+            m2 = Maze.load(path, mmap=False, verify=False)
+            self.assertEqual(m2._grid.walls[3], 0xFF)
+            # Seeds must fit the header; random.Random accepts any integer.
+            big = os.path.join(folder, "big.maze")
+            with self.assertRaises(mazefile.MazeFileError):
+                Maze(0, 0, 3, 3, 10, 10, seed=2 ** 64).save(big)
+            self.assertFalse(os.path.exists(big))
+            Maze(0, 0, 3, 3, 10, 10, seed=-2 ** 63).save(big)
+            self.assertEqual(Maze.load(big).seed, -2 ** 63)
+
+    def test_batch_results_do_not_depend_on_workers(self):
+        specs = [MazeSpec(8, 11, seed, algorithm) for seed in range(4) for algorithm in ("backtracker", "prim")]
+        single = generate_batch(specs, workers=1)
+        pooled = generate_batch(specs, workers=2)
+        for spec, a, b in zip(specs, single, pooled):
+            m1 = Maze(0, 0, spec.num_rows, spec.num_cols, 10, 10, seed=spec.seed, algorithm=spec.algorithm)
+            self.assertEqual(bytes(a.walls), bytes(m1._grid.walls))
+            self.assertEqual(bytes(b.walls), bytes(m1._grid.walls))
+        stats = solve_batch(specs, "bfs", workers=2)
+        self.assertEqual(stats, solve_batch(specs, "bfs", workers=1))
+        for spec, stat in zip(specs, stats):
+            m1 = Maze(0, 0, spec.num_rows, spec.num_cols, 10, 10, seed=spec.seed, algorithm=spec.algorithm)
+            result = m1.solve("bfs")
+            self.assertEqual(stat.path_length, len(result.path))
+            self.assertEqual(stat.nodes_expanded, result.nodes_expanded)
+
+    def test_analysis_of_known_grid(self):
+        # A 2x3 grid: a corridor along the top row, with the middle cell also
+        # open downwards, then along the bottom row to the right.
+        grid = Grid(2, 3)
+        grid.carve(0, RIGHT)
+        grid.carve(1, RIGHT)
+        grid.carve(1, BOTTOM)
+        grid.carve(4, RIGHT)
+        summary = analysis.analyze(grid).summary
+        self.assertEqual(summary["degree_histogram"], [1, 3, 1, 1, 0])
+        self.assertEqual(summary["dead_ends"], 3)
+        self.assertEqual(summary["junctions"], 1)
+        self.assertEqual(summary["branching_factor"], 2.0)
+        self.assertEqual(summary["corridors"], 1)
+        self.assertEqual(summary["reachable"], 5)
+        self.assertEqual(summary["solution_length"], 4)
+        self.assertEqual(summary["tortuosity"], 1.0)
+        self.assertEqual(list(analysis.analyze(grid).distance), [0, 1, 2, -1, 2, 3])
+
+    def test_analysis_matches_solver_with_and_without_numpy(self):
+        m1 = Maze(0, 0, 30, 40, 10, 10, seed=5, algorithm="kruskal")
+        result = m1.solve("bfs")
+        numpy_module = analysis.np
+        summaries = []
+        try:
+            for np in {numpy_module, None}:
+                analysis.np = np
+                report = m1.analyze()
+                summary = report.summary
+                self.assertEqual(summary["reachable"], 1200)
+                self.assertEqual(summary["solution_length"], len(result.path))
+                self.assertEqual(int(report.distance[m1._grid.size - 1]), len(result.path) - 1)
+                # A perfect maze is a tree: the degrees add up to twice its edges.
+                self.assertEqual(sum(int(d) for d in report.degree), 2 * (1200 - 1))
+                self.assertEqual(summary["max_distance"], max(int(d) for d in report.distance))
+                # Both paths report plain Python numbers.
+                self.assertIs(type(summary["mean_corridor_length"]), float)
+                self.assertIs(type(summary["max_corridor_length"]), int)
+                summaries.append((summary, [int(n) for n in report.corridor_lengths], [int(d) for d in report.distance]))
+            self.assertEqual(summaries[0], summaries[-1])
+            # Braided backtracker corridors, joined across rows and columns.
+            grid = build(25, 30, seed=2, braid=0.5)
+            reports = []
+            for np in {numpy_module, None}:
+                analysis.np = np
+                report = analysis.analyze(grid)
+                reports.append(([int(n) for n in report.corridor_lengths], [int(d) for d in report.distance]))
+            self.assertEqual(reports[0], reports[-1])
+        finally:
+            analysis.np = numpy_module
+
+    def test_bench_runs_matrix_and_flags_regressions(self):
+        results = bench.run_benchmarks(sizes=[(5, 4)], seeds=[0], algorithms=["eller"],
+                                       strategies=["bfs", "dfs"], repeat=1)
+        # The same braided cases as the command line runs by default.
+        self.assertEqual([result["name"] for result in results],
+                         ["generate/eller", "solve/bfs", "solve/dfs", "solve-braided/bfs",
+                          "solve-braided/dfs", "render/png", "render/canvas"])
+        self.assertEqual(results[3]["braid"], bench.BRAID)
+        # Braided cases only compare against runs on equally braided mazes.
+        other = [dict(result, braid=0.25, cells_per_sec=1.0) for result in results[3:5]]
+        self.assertEqual(bench.compare(other, results), [])
+        for result in results:
+            self.assertEqual(result["cells"], 20)
+            self.assertGreater(result["cells_per_sec"], 0)
+            self.assertIsNotNone(result["alloc_peak_bytes"])
+        self.assertEqual(bench.compare(results, results), [])
+        faster = [dict(result, cells_per_sec=result["cells_per_sec"] * 2) for result in results]
+        regressions = bench.compare(results, faster, threshold=0.25)
+        self.assertEqual(len(regressions), len(results))
+        self.assertAlmostEqual(regressions[0][2], -0.5)
+
+    def test_streamed_rows_match_eller_and_pass_the_checker(self):
+        for num_rows, num_cols in ((1, 1), (1, 6), (7, 1), (12, 17)):
+            rows = list(streaming.eller_rows(num_cols, num_rows, seed=9))
+            self.assertEqual(b"".join(rows), bytes(build(num_rows, num_cols, 9, "eller").walls))
+            self.assertEqual(streaming.check_rows(num_cols, rows), (num_rows, 1, 0, True))
+
+        # Walling in the centre cell of a perfect maze cuts it into pieces.
+        grid = build(9, 9, seed=2, algorithm="wilson")
+        for side in (LEFT, RIGHT, TOP, BOTTOM):
+            if not grid.has_wall(40, side):
+                grid.set_wall(40, side, True)
+                grid.set_wall(grid.neighbour(40, side), OPPOSITE[side], True)
+        report = streaming.check_rows(9, (grid.walls[j * 9:(j + 1) * 9] for j in range(9)))
+        self.assertGreater(report.components, 2)
+        self.assertEqual(report.cycles, 0)
+
+        grid.walls[3] ^= RIGHT
+        with self.assertRaises(ValueError):
+            streaming.check_rows(9, (grid.walls[j * 9:(j + 1) * 9] for j in range(9)))
+
+    def test_streamed_rows_save_and_export(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tall.maze")
+            checker = streaming.RowChecker(5)
+            rows = checker.watch(streaming.eller_rows(5, 300, seed=1))
+            self.assertEqual(mazefile.save_rows(path, 5, rows, seed=1, algorithm="eller"), 300)
+            self.assertTrue(checker.finish().solvable)
+            grid, header = mazefile.load(path)
+            self.assertEqual((header.num_rows, header.seed, header.algorithm), (300, 1, "eller"))
+            self.assertEqual(bytes(grid.walls), bytes(build(300, 5, 1, "eller").walls))
+
+            image = os.path.join(directory, "tall.png")
+            export.write_rows(image, 300, 5, streaming.eller_rows(5, 300, seed=1), cell_size=4)
+            with open(image, "rb") as file:
+                width, height = struct.unpack(">II", file.read(24)[16:24])
+            self.assertEqual((width, height), (5 * 4 + 2, 300 * 4 + 2))
+
+    def test_maze_path_between_any_cells_uses_cache(self):
+        m1 = Maze(0, 0, 14, 18, 10, 10, seed=6)
+        cache = paths.PathCache()
+        route = m1.path((3, 2), (17, 13), cache)
+        self.assertEqual(route[0], (3, 2))
+        self.assertEqual(route[-1], (17, 13))
+        for (i1, j1), (i2, j2) in zip(route, route[1:]):
+            self.assertEqual(abs(i1 - i2) + abs(j1 - j2), 1)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        # A query to the cached source is answered from the same field.
+        self.assertEqual(m1.path((17, 13), (3, 2), cache), route[::-1])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        # The maze and the entrance-to-exit solution agree.
+        self.assertEqual(m1.path((0, 0), (17, 13), cache), m1.solve("bfs").path)
+
+        # The digest is kept on the grid between lookups.
+        digest = paths.wall_hash(m1._grid)
+        self.assertIs(paths.wall_hash(m1._grid), digest)
+
+        # Changing the walls changes the key, so stale fields are not used.
+        m1._grid.carve(next(k for k in range(m1._grid.size) if k % m1._num_cols < m1._num_cols - 1 and m1._grid.has_wall(k, RIGHT)), RIGHT)
+        m1.path((3, 2), (17, 13), cache)
+        self.assertEqual(cache.misses, 3)
+        self.assertNotEqual(paths.wall_hash(m1._grid), digest)
+
+    def test_path_cache_respects_memory_budget(self):
+        grid = build(10, 10, seed=1)
+        field_size = paths.DistanceField(grid, 0).nbytes
+        cache = paths.PathCache(budget=2 * field_size)
+        for source in range(5):
+            cache.distance(grid, source, 99)
+        self.assertEqual(len(cache), 2)
+        self.assertLessEqual(cache.nbytes, cache.budget)
+        cache.distance(grid, 4, 0)
+        self.assertEqual(cache.hits, 1)
+        cache.distance(grid, 0, 50)
+        self.assertEqual(cache.misses, 6)
+
+    def test_tree_index_distances_match_search(self):
+        m1 = Maze(0, 0, 23, 29, 10, 10, seed=8, algorithm="prim")
+        index = m1.tree_index()
+        rng = random.Random(0)
+        for _ in range(200):
+            a, b = rng.randrange(m1._grid.size), rng.randrange(m1._grid.size)
+            field = paths.DistanceField(m1._grid, a)
+            self.assertEqual(index.distance(a, b), field.distance[b])
+            self.assertEqual(len(index.path(a, b)), field.distance[b] + 1)
+        m1._grid.carve(next(k for k in range(m1._grid.size) if k % m1._num_cols < m1._num_cols - 1 and m1._grid.has_wall(k, RIGHT)), RIGHT)
+        with self.assertRaises(ValueError):
+            m1.tree_index()
+
+    def test_background_job_matches_foreground_maze(self):
+        expected = Maze(0, 0, 12, 15, 10, 10, seed=7, algorithm="kruskal")
+        for mode in ("thread", "process"):
+            m1 = Maze(0, 0, 12, 15, 10, 10, seed=7, algorithm="kruskal", defer=True)
+            progress = []
+            job = m1.run_in_background("bfs", mode, on_progress=progress.append)
+            result = job.wait(timeout=30)
+            self.assertTrue(job.done)
+            self.assertEqual(bytes(m1._grid.walls), bytes(expected._grid.walls))
+            self.assertEqual(result.path, expected.solve("bfs").path)
+            self.assertEqual(progress[-1].phase, "done")
+            self.assertEqual(progress[-1].cells_carved, 12 * 15 - 1)
+        # Walls applied from a job drop the distances kept for the old walls.
+        m2 = Maze(0, 0, 6, 8, 10, 10, seed=1)
+        self.assertEqual(len(m2.shortest_path()), 21)
+        m2._apply_events(array("i", [events.WALL_REMOVED, 0, BOTTOM]))
+        self.assertEqual(len(m2.shortest_path()), 13)
+
+    def test_background_job_polls_from_window_and_cancels(self):
+        win = RecordingWindow()
+        renderer = TkRenderer(win, fps=None, steps_per_frame=None)
+        m1 = Maze(0, 0, 6, 6, 10, 10, win, seed=2, renderer=renderer, defer=True)
+        job = m1.run_in_background("dfs")
+        job._worker.join(timeout=30)
+        win.run_pending()
+        self.assertTrue(job.done)
+        self.assertTrue(win.title.startswith("The Maze Game - Done"))
+        self.assertEqual(count_passages(m1._grid), 35)
+
+        job = background.BackgroundJob(background.JobSpec(300, 300, 1, "wilson", "bfs")).start()
+        job.cancel()
+        self.assertTrue(job.cancelled)
+        self.assertFalse(job.poll())
+        self.assertIsNone(job.wait(timeout=5))
+
+    def test_background_job_reports_worker_errors(self):
+        def broken(grid, start, goal, events=True):
+            raise MemoryError("no room for the frontier")
+            yield
+
+        SOLVERS["broken"] = broken
+        try:
+            win = RecordingWindow()
+            m1 = Maze(0, 0, 6, 6, 10, 10, win, seed=2, defer=True)
+            done = []
+            job = m1.run_in_background("broken", on_done=done.append)
+            job._worker.join(timeout=30)
+            with self.assertRaisesRegex(RuntimeError, "MemoryError: no room"):
+                win.run_pending()
+            self.assertFalse(job.running)
+            self.assertEqual(done, [])
+            self.assertEqual(job.progress().phase, "failed")
+            self.assertTrue(win.title.startswith("The Maze Game - Failed after"))
+            self.assertIn("MemoryError: no room for the frontier", win.title)
+
+            progress = []
+            job = background.BackgroundJob(background.JobSpec(4, 4, 1, "wilson", "broken"),
+                                           on_progress=progress.append).start()
+            with self.assertRaisesRegex(RuntimeError, "MemoryError"):
+                job.wait(timeout=30)
+            self.assertEqual(progress[-1].phase, "failed")
+        finally:
+            del SOLVERS["broken"]
+
+    def test_viewport_only_draws_visible_cells(self):
+        win = RecordingWindow()
+        m1 = Maze(0, 0, 300, 400, 1, 1, seed=5)
+        view = m1.view(win, 200, 150)
+        # Fitted, a cell is half a pixel, so the whole maze is one image.
+        self.assertEqual(len(win.canvas.items), 1)
+        self.assertIn("<MouseWheel>", win.canvas.bindings)
+        view.zoom(40, 0, 0)
+        self.assertEqual(view.render(), len(win.canvas.items))
+        i0, j0, i1, j1 = view.visible_cells()
+        self.assertLessEqual((i1 - i0) * (j1 - j0), 11 * 8)
+        # At most every wall of the visible cells, each one a canvas item.
+        self.assertLessEqual(len(win.canvas.items), 2 * 11 * 8 + 11 + 8)
+        # Zooming keeps the cell under the pointer in place.
+        before = (view.origin_x + 50 / view.scale, view.origin_y + 30 / view.scale)
+        view.zoom(1.25, 50, 30)
+        after = (view.origin_x + 50 / view.scale, view.origin_y + 30 / view.scale)
+        self.assertAlmostEqual(before[0], after[0])
+        self.assertAlmostEqual(before[1], after[1])
+        first = view.visible_cells()[0]
+        view.pan(-8 * view.scale, 0)
+        self.assertEqual(view.visible_cells()[0], first + 8)
+
+    def test_viewport_generates_in_background(self):
+        win = RecordingWindow()
+        m1 = Maze(0, 0, 60, 80, 1, 1, seed=5, defer=True)
+        view = m1.view(win, 200, 150, background=True)
+        self.assertEqual(view.frames, 1)
+        win.run_pending()
+        self.assertEqual(bytes(m1._grid.walls), bytes(build(60, 80, 5).walls))
+        self.assertTrue(win.title.startswith("The Maze Game - Done"))
+        self.assertGreater(view.frames, 1)
+
+    def test_viewport_bitmap_draws_walls_from_wall_array(self):
+        grid = Grid(3, 4)
+        view = viewport.MazeView(RecordingWindow(), grid, 20, 16)
+        view.scale, view.origin_x, view.origin_y = 4, 0, 0
+        header, pixels = view.bitmap().split(b"\n", 1)
+        self.assertEqual(header, b"P5 20 16 255")
+        self.assertEqual(len(pixels), 20 * 16)
+        rows = [pixels[y * 20:(y + 1) * 20] for y in range(16)]
+        # Walls every 4 pixels, the border line at 12 and 16, white beyond.
+        self.assertEqual(rows[0][:17], bytes(17))
+        self.assertEqual(rows[2][:17], b"\0\xff\xff\xff" * 4 + b"\0")
+        self.assertEqual(rows[12][:17], bytes(17))
+        self.assertEqual(rows[13], b"\xff" * 20)
+        self.assertEqual(rows[2][17:], b"\xff" * 3)
+
+    def test_cli_streams_json_lines_without_tkinter(self):
+        self.assertEqual(maze.parse_seeds("1,5-7"), [1, 5, 6, 7])
+        with tempfile.TemporaryDirectory() as folder:
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                status = maze.main(["solve", "--no-gui", "--size", "10x8", "--seed", "3-4",
+                                    "--strategy", "bfs",
+                                    "--output", os.path.join(folder, "m-{seed}.maze")])
+            self.assertEqual(status, 0)
+            records = [json.loads(line) for line in output.getvalue().splitlines()]
+            self.assertEqual([record["seed"] for record in records], [3, 4])
+            self.assertTrue(all(record["found"] for record in records))
+            expected = solve(build(8, 10, 3), 0, 79, "bfs")
+            self.assertEqual(records[0]["path_length"], len(expected.path))
+            loaded = Maze.load(records[1]["output"])
+            self.assertEqual(loaded._grid.walls, build(8, 10, 4).walls)
+        # Importing the CLI, and the headless maze classes, leaves tkinter and
+        # the modules only some commands need alone.
+        code = ("import sys, maze, tk_classes; print(sorted(set(sys.modules) & "
+                "{'tkinter', 'numpy', 'multiprocessing', 'cProfile', 'analysis', 'viewport'}))")
+        found = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(found.stdout.strip(), "[]")
+
+    def test_maze_metrics_count_phases_and_drawing(self):
+        self.assertIsNone(Maze(0, 0, 10, 12, 10, 10).metrics)
+        sink = metrics.MemorySink()
+        win = RecordingWindow()
+        renderer = TkRenderer(win, fps=None, steps_per_frame=None)
+        m1 = Maze(0, 0, 10, 12, 10, 10, win, seed=3, renderer=renderer,
+                  metrics=metrics.Metrics(sink=sink, profile=True, trace_memory=True))
+        result = m1.solve("bfs")
+        report = m1.metrics.report()
+        self.assertEqual([record["phase"] for record in sink.records], ["begin", "generate", "solve"])
+        self.assertEqual(set(report["timers"]), {"begin", "generate", "solve", "draw"})
+        counters = report["counters"]
+        # A perfect maze carves one passage fewer than it has cells.
+        self.assertEqual(counters["passages_carved"], 10 * 12 - 1)
+        self.assertEqual(counters["nodes_expanded"], result.nodes_expanded)
+        self.assertEqual(counters["frames"], renderer.frames)
+        self.assertEqual(counters["canvas_items"], len(win.canvas.lines))
+        self.assertGreater(counters["solve_alloc_peak_bytes"], 0)
+        self.assertIsNotNone(m1.metrics.profile_stats())
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "metrics.jsonl")
+            m2 = Maze(0, 0, 10, 12, 10, 10, seed=3, defer=True,
+                      metrics=metrics.Metrics(sink=metrics.JsonSink(path)))
+            events.drain(m2.steps("dfs"))
+            with open(path) as file:
+                records = [json.loads(line) for line in file]
+        self.assertEqual([record["phase"] for record in records], ["generate", "solve"])
+        self.assertEqual(records[-1]["counters"]["solves"], 1)
+
+    def test_dynamic_distance_field_follows_wall_edits(self):
+        grid = build(15, 15, 2)
+        field = paths.DynamicDistanceField(grid, 0)
+        rng = random.Random(7)
+        for _ in range(300):
+            index = rng.randrange(grid.size)
+            side = rng.choice((LEFT, RIGHT, TOP, BOTTOM))
+            other = grid.neighbour(index, side)
+            if other == -1:
+                continue
+            present = not grid.has_wall(index, side)
+            grid.set_wall(index, side, present)
+            grid.set_wall(other, OPPOSITE[side], present)
+            field.wall_changed(index, side)
+            self.assertEqual(field.distance, paths.DistanceField(grid, 0).distance)
+            path = field.path_to(grid.size - 1)
+            for a, b in zip(path, path[1:]):
+                self.assertIn(b, grid.open_neighbours(a))
+
+    def test_maze_set_wall_repairs_shortest_path(self):
+        win = RecordingWindow()
+        m1 = Maze(0, 0, 10, 12, 10, 10, win, seed=4,
+                  renderer=TkRenderer(win, fps=None, steps_per_frame=None))
+        route = m1.shortest_path()
+        self.assertEqual(len(route), len(solve(m1._grid, 0, m1._grid.size - 1, "bfs").path))
+        # Walling off the middle of the only route leaves no path.
+        (i, j), (k, l) = route[len(route) // 2:len(route) // 2 + 2]
+        side = {(1, 0): RIGHT, (-1, 0): LEFT, (0, 1): BOTTOM, (0, -1): TOP}[(k - i, l - j)]
+        items = len(win.canvas.items)
+        m1.set_wall(i, j, side, True)
+        self.assertEqual(len(win.canvas.items), items + 1)
+        self.assertTrue(m1._grid.has_wall(m1._grid.index(k, l), OPPOSITE[side]))
+        self.assertEqual(m1.shortest_path(), [])
+        # Knocking down walls opens shortcuts, found without a new search.
+        m1.set_wall(i, j, side, False)
+        m1.set_wall(0, 0, RIGHT, False)
+        m1.set_wall(0, 0, BOTTOM, False)
+        expected = solve(m1._grid, 0, m1._grid.size - 1, "bfs")
+        self.assertEqual(len(m1.shortest_path()), len(expected.path))
+        self.assertEqual(m1.shortest_path()[0], (0, 0))
+
+    def test_maze_set_wall_checks_cell_and_side(self):
+        m1 = Maze(0, 0, 6, 8, 10, 10, seed=1)
+        walls = bytes(m1._grid.walls)
+        # Column 8 would wrap into the next row of the grid.
+        for i, j in ((8, 0), (-1, 2), (0, 6), (3, -1)):
+            with self.assertRaises(IndexError):
+                m1.set_wall(i, j, RIGHT, False)
+        for side in (LEFT | RIGHT, "left"):
+            with self.assertRaises(ValueError):
+                m1.set_wall(2, 2, side, False)
+        with self.assertRaises(IndexError):
+            m1.set_cost(8, 0, 3)
+        self.assertEqual(bytes(m1._grid.walls), walls)
+
+    def test_cell_wall_setters_reset_kept_distances(self):
+        m1 = Maze(0, 0, 6, 8, 10, 10, seed=1)
+        self.assertEqual(len(m1.shortest_path()), 21)
+        # Opening the bottom of the entrance cell through its Cell view leaves
+        # a one-way shortcut that the kept distances know nothing about.
+        m1._cells[0][0].has_bottom_wall = False
+        self.assertEqual(len(m1.shortest_path()), 13)
+
+    def test_weighted_solvers_find_cheapest_paths(self):
+        rng = random.Random(3)
+        grid = build(12, 14, 5)
+        # Extra openings give the searches several routes to choose from.
+        for _ in range(60):
+            index = rng.randrange(grid.size)
+            side = rng.choice((LEFT, RIGHT, TOP, BOTTOM))
+            if grid.neighbour(index, side) != -1:
+                grid.carve(index, side)
+        for index in range(grid.size):
+            grid.set_cost(index, rng.choice((1, 1, 2, 9)))
+        with self.assertRaises(ValueError):
+            grid.set_cost(0, 0)
+
+        def cheapest(start, goal):
+            best = {start: 0}
+            heap = [(0, start)]
+            while heap:
+                cost, index = heapq.heappop(heap)
+                if index == goal:
+                    return cost
+                for other in grid.open_neighbours(index):
+                    if cost + grid.cost(other) < best.get(other, cost + grid.cost(other) + 1):
+                        best[other] = cost + grid.cost(other)
+                        heapq.heappush(heap, (best[other], other))
+
+        for start, goal in ((0, grid.size - 1), (17, 140), (100, 3)):
+            expected = cheapest(start, goal)
+            for strategy in ("dijkstra", "astar"):
+                result = solve(grid, start, goal, strategy)
+                self.assertEqual(result.cost, expected)
+                ids = [grid.index(*position) for position in result.path]
+                self.assertEqual(sum(grid.cost(index) for index in ids[1:]), expected)
+
+        agents = [(rng.randrange(grid.size), rng.choice((0, 50, grid.size - 1))) for _ in range(40)]
+        for route, (start, goal) in zip(paths.route_agents(grid, agents), agents):
+            self.assertEqual((route.start, route.goal), (start, goal))
+            self.assertEqual(route.cost, solve(grid, start, goal, "dijkstra").cost)
+            self.assertEqual(route.path[0], start)
+            self.assertEqual(route.path[-1], goal)
+        starts = [start for start, _ in agents]
+        for route in paths.route_agents(grid, starts, exits=[0, 50, grid.size - 1]):
+            self.assertEqual(route.cost, min(cheapest(route.start, goal) for goal in (0, 50, grid.size - 1)))
+            self.assertEqual(route.cost, solve(grid, route.start, route.goal, "dijkstra").cost)
+
+    def test_maze_routes_agents_by_position(self):
+        m1 = Maze(0, 0, 6, 8, 10, 10, seed=2)
+        m1.set_cost(3, 0, 5)
+        routes = m1.route_agents([((0, 0), (7, 5)), ((7, 0), (7, 5))])
+        self.assertEqual(routes[0].path[0], (0, 0))
+        self.assertEqual(routes[0].goal, (7, 5))
+        self.assertEqual(routes[0].cost, m1.solve("dijkstra").cost)
+        nearest = m1.route_agents([(3, 3)], exits=[(0, 0), (7, 5)])
+        self.assertIn(nearest[0].goal, ((0, 0), (7, 5)))
+        # A walled-in cell reaches no exit.
+        grid = m1._grid
+        for side in (LEFT, RIGHT, TOP, BOTTOM):
+            if grid.neighbour(grid.index(4, 4), side) != -1:
+                m1.set_wall(4, 4, side, True)
+        self.assertEqual(m1.route_agents([(4, 4)], exits=[(0, 0)])[0], paths.Route((4, 4), None, None, []))
+
+    def test_braiding_removes_dead_ends_and_solvers_handle_loops(self):
+        self.assertEqual(bytes(build(15, 20, 6, "kruskal", braid=0.0).walls),
+                         bytes(build(15, 20, 6, "kruskal").walls))
+        for fraction in (0.5, 1.0):
+            grid = build(15, 20, 6, "kruskal", braid=fraction)
+            m1 = Maze(0, 0, 15, 20, 10, 10, seed=6, algorithm="kruskal", braid=fraction)
+            self.assertEqual(bytes(m1._grid.walls), bytes(grid.walls))
+            degree = grid.passages().translate(PASSAGE_COUNT)
+            dead_ends = degree.count(1)
+            perfect = build(15, 20, 6, "kruskal").passages().translate(PASSAGE_COUNT).count(1)
+            if fraction == 1.0:
+                self.assertEqual(dead_ends, 0)
+            else:
+                self.assertLess(dead_ends, perfect)
+            shortest = len(solve(grid, 0, grid.size - 1, "bfs").path)
+            for strategy in SOLVERS:
+                result = solve(grid, 0, grid.size - 1, strategy)
+                ids = [grid.index(*position) for position in result.path]
+                self.assertEqual(len(set(ids)), len(ids))
+                for a, b in zip(ids, ids[1:]):
+                    self.assertIn(b, grid.open_neighbours(a))
+                if strategy != "dfs":
+                    self.assertEqual(len(result.path), shortest, strategy)
+        with self.assertRaises(ValueError):
+            paths.TreeIndex(build(6, 6, 1, braid=1.0))
+
+    def test_k_shortest_paths_match_enumerated_routes(self):
+        grid = build(4, 5, 3, braid=1.0)
+        grid.set_cost(7, 3)
+        routes = []
+
+        def walk(path):
+            if path[-1] == grid.size - 1:
+                routes.append(sum(grid.cost(index) for index in path[1:]))
+                return
+            for other in grid.open_neighbours(path[-1]):
+                if other not in path:
+                    walk(path + [other])
+
+        walk([0])
+        found = paths.k_shortest_paths(grid, 0, grid.size - 1, 8)
+        self.assertEqual([route.cost for route in found], sorted(routes)[:8])
+        self.assertEqual(len({tuple(route.path) for route in found}), len(found))
+        for route in found:
+            self.assertEqual(sum(grid.cost(index) for index in route.path[1:]), route.cost)
+        self.assertEqual(len(paths.k_shortest_paths(build(4, 5, 3), 0, 19, 5)), 1)
+        m1 = Maze(0, 0, 6, 6, 10, 10, seed=2, braid=1.0)
+        alternatives = m1.k_shortest_paths(3)
+        self.assertEqual(len(alternatives), 3)
+        self.assertEqual(alternatives[0].cost, m1.solve("bfs").cost)
+        self.assertEqual(alternatives[0].path[0], (0, 0))
+
+    def test_bench_times_solvers_on_braided_mazes(self):
+        results = bench.run_benchmarks(sizes=[(6, 5)], seeds=[0], algorithms=["prim"],
+                                       strategies=["bfs"], renderers=[], repeat=1, trace=False,
+                                       braid=0.5)
+        self.assertEqual([result["name"] for result in results],
+                         ["generate/prim", "solve/bfs", "solve-braided/bfs"])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -1,12 +1,22 @@
-from tkinter import Tk, BOTH, Canvas
-import time
+import itertools
 import random
+from contextlib import nullcontext
+
+from grid import Grid, LEFT, RIGHT, TOP, BOTTOM, OPPOSITE, PASSAGE_COUNT
+from events import WALL_REMOVED, WALL_ADDED, drain
+from generators import backtracker, get_algorithm, remove_dead_ends
+from render import TkRenderer
+import solvers
+import mazefile
 
 # -----------------------------------------------------------------------------
 # Module: Maze Game
 # Description: This module creates a maze game using tkinter for visualization.
 # It includes classes for the game window, maze cells, and the maze generation
 # and solving algorithms.
+#
+# tkinter is only imported once a Window is created, so headless users of
+# Maze, such as the command-line interface in maze.py, never load it.
 # -----------------------------------------------------------------------------
 
 
@@ -24,11 +34,14 @@ class Window():
             width (int): The width of the window.
             height (int): The height of the window.
         """
+        from tkinter import Tk, BOTH, Canvas
         self.__root = Tk()
         self.__root.title("The Maze Game")
         # Create a canvas to draw the maze, with white background.
         self.canvas = Canvas(self.__root, bg="white", height=height, width=width)
         self.canvas.pack(fill=BOTH, expand=1)
+        # Canvas items drawn with a key, so they can be updated in place.
+        self._items = {}
         self.running = False
         # Bind the window close event to the custom close method.
         self.__root.protocol("WM_DELETE_WINDOW", self.close)
@@ -42,29 +55,94 @@ class Window():
 
     def wait_for_close(self):
         """
-        Enter a loop to keep the window open until it is closed.
-        Once closed, print a message.
+        Run Tk's event loop until the window is closed, then print a message.
+        Work scheduled with after() runs from this loop, and the process sleeps
+        while there is nothing to do.
         """
         self.running = True
-        while self.running:
-            self.redraw()
+        self.__root.mainloop()
+        self.running = False
         print("Window closed")
 
-    def draw_line(self, line, fill_colour="black"):
+    def set_title(self, text):
+        """
+        Change the window's title, for example to show progress.
+        """
+        self.__root.title(text)
+
+    def after(self, delay, callback):
+        """
+        Schedule a callback on the window's event loop.
+        
+        Parameters:
+            delay (int): The delay in milliseconds.
+            callback (callable): The function to call, with no arguments.
+        
+        Returns:
+            str: An id that can be passed to after_cancel().
+        """
+        return self.__root.after(delay, callback)
+
+    def after_cancel(self, after_id):
+        """
+        Cancel a callback scheduled with after().
+        """
+        self.__root.after_cancel(after_id)
+
+    def photo_image(self, data):
+        """
+        Create an image from PPM or PGM data, for drawing on the canvas.
+        
+        Parameters:
+            data (bytes): The image file contents.
+        
+        Returns:
+            PhotoImage: The image. It is deleted once no reference to it is kept.
+        """
+        from tkinter import PhotoImage
+        return PhotoImage(master=self.canvas, data=data, format="PPM")
+
+    def draw_line(self, line, fill_colour="black", key=None):
         """
         Draw a line on the canvas using the provided Line object.
         
         Parameters:
             line (Line): The line to be drawn.
             fill_colour (str): The color to use for the line (default is "black").
+            key (hashable, optional): Identifies the line. Drawing again with the
+                same key moves and recolours the existing canvas item instead of
+                creating a new one.
+        
+        Returns:
+            int: The id of the canvas item.
         """
-        line.draw(self.canvas, fill_colour)
+        if key is None:
+            return line.draw(self.canvas, fill_colour)
+        item = self._items.get(key)
+        if item is None:
+            item = self._items[key] = line.draw(self.canvas, fill_colour)
+        else:
+            self.canvas.coords(item, line.start.x, line.start.y, line.end.x, line.end.y)
+            self.canvas.itemconfig(item, fill=fill_colour)
+        return item
+
+    def erase(self, key):
+        """
+        Delete the canvas item drawn with the given key, if there is one.
+        
+        Parameters:
+            key (hashable): The key the line was drawn with.
+        """
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.canvas.delete(item)
 
     def close(self):
         """
         Close the window by stopping the main loop.
         """
         self.running = False
+        self.__root.quit()
 
 
 class Point():
@@ -107,34 +185,78 @@ class Line():
         Parameters:
             canvas (Canvas): The tkinter canvas on which to draw the line.
             fill_colour (str): The color to use for the line (default is "black").
+        
+        Returns:
+            int: The id of the new canvas item.
         """
-        canvas.create_line(self.start.x, self.start.y, self.end.x, self.end.y,
-                           fill=fill_colour, width=2)
+        return canvas.create_line(self.start.x, self.start.y, self.end.x, self.end.y,
+                                  fill=fill_colour, width=2)
+
+
+def _wall_property(side):
+    """
+    Build a boolean property that reads and writes one wall bit of a cell.
+    """
+    def getter(self):
+        return self._grid.has_wall(self._index, side)
+
+    def setter(self, present):
+        self._grid.set_wall(self._index, side, present)
+        if self._maze is not None:
+            # The maze's kept distances no longer match the walls.
+            self._maze._field = None
+
+    return property(getter, setter)
 
 
 class Cell():
     """
     Represents a single cell in the maze.
     Each cell has walls on all four sides and a visited flag used for maze generation and solving.
+    The wall and visited state live in a Grid, so a Cell is a lightweight view onto one grid slot.
     """
 
-    def __init__(self, win=None):
+    has_left_wall = _wall_property(LEFT)
+    has_right_wall = _wall_property(RIGHT)
+    has_top_wall = _wall_property(TOP)
+    has_bottom_wall = _wall_property(BOTTOM)
+
+    def __init__(self, win=None, grid=None, index=0, maze=None):
         """
         Initialize the cell with all walls intact and unvisited.
         
         Parameters:
             win (Window): The Window object used to draw the cell (optional).
-        """
-        self.has_left_wall = True
-        self.has_right_wall = True
-        self.has_top_wall = True
-        self.has_bottom_wall = True
+            grid (Grid): The grid holding the cell's state (optional). A private
+                one-cell grid is created when omitted.
+            index (int): The id of the cell within the grid.
+            maze (Maze): The maze the cell belongs to, told when its walls
+                change (optional).
+        """
+        if grid is None:
+            grid = Grid(1, 1)
+        self._grid = grid
+        self._index = index
+        self._maze = maze
         self._x1 = None  # Left coordinate of the cell on the canvas
         self._x2 = None  # Right coordinate of the cell on the canvas
         self._y1 = None  # Top coordinate of the cell on the canvas
         self._y2 = None  # Bottom coordinate of the cell on the canvas
         self._win = win  # Reference to the Window object for drawing
-        self.visited = False  # Flag to mark if the cell has been visited
+
+    @property
+    def visited(self):
+        """
+        Flag to mark if the cell has been visited.
+        """
+        return self._index in self._grid.visited
+
+    @visited.setter
+    def visited(self, value):
+        if value:
+            self._grid.visited.add(self._index)
+        else:
+            self._grid.visited.discard(self._index)
 
     def draw(self, x1, y1, x2, y2):
         """
@@ -154,38 +276,34 @@ class Cell():
         self._y1 = y1
         self._y2 = y2
 
-        # Draw left wall
-        if self.has_left_wall:
-            line = Line(Point(x1, y1), Point(x1, y2))
-            self._win.draw_line(line)
-        else:
-            # Erase wall by drawing in white
-            line = Line(Point(x1, y1), Point(x1, y2))
-            self._win.draw_line(line, "white")
-
-        # Draw top wall
-        if self.has_top_wall:
-            line = Line(Point(x1, y1), Point(x2, y1))
-            self._win.draw_line(line)
-        else:
-            line = Line(Point(x1, y1), Point(x2, y1))
-            self._win.draw_line(line, "white")
-
-        # Draw right wall
-        if self.has_right_wall:
-            line = Line(Point(x2, y1), Point(x2, y2))
-            self._win.draw_line(line)
-        else:
-            line = Line(Point(x2, y1), Point(x2, y2))
-            self._win.draw_line(line, "white")
-
-        # Draw bottom wall
-        if self.has_bottom_wall:
-            line = Line(Point(x1, y2), Point(x2, y2))
-            self._win.draw_line(line)
-        else:
-            line = Line(Point(x1, y2), Point(x2, y2))
-            self._win.draw_line(line, "white")
+        # Draw each wall that is present and erase the ones that are not.
+        # Walls are keyed so redrawing a cell reuses its canvas items.
+        walls = (
+            (LEFT, Line(Point(x1, y1), Point(x1, y2))),
+            (TOP, Line(Point(x1, y1), Point(x2, y1))),
+            (RIGHT, Line(Point(x2, y1), Point(x2, y2))),
+            (BOTTOM, Line(Point(x1, y2), Point(x2, y2))),
+        )
+        for side, line in walls:
+            key = self._wall_key(side)
+            if self._grid.has_wall(self._index, side):
+                self._win.draw_line(line, key=key)
+            else:
+                self._win.erase(key)
+
+    def _wall_key(self, side):
+        """
+        Return the key identifying one of the cell's walls on the canvas. A wall
+        shared with a neighbouring cell gets the same key from both cells.
+        
+        Parameters:
+            side (int): One of LEFT, RIGHT, TOP or BOTTOM.
+        """
+        if side in (RIGHT, BOTTOM):
+            other = self._grid.neighbour(self._index, side)
+            if other != -1:
+                return ("wall", id(self._grid), other, LEFT if side == RIGHT else TOP)
+        return ("wall", id(self._grid), self._index, side)
 
     def draw_move(self, to_cell, undo=False):
         """
@@ -196,6 +314,8 @@ class Cell():
             to_cell (Cell): The cell to which the move is made.
             undo (bool): If True, draw the move in 'undo' color (gray) instead of 'red'.
         """
+        if self._win is None:
+            return
         # Calculate the center of the current cell
         half_length = abs(self._x2 - self._x1) // 2
         x_center = half_length + self._x1
@@ -209,17 +329,23 @@ class Cell():
         # Set the color for the move (red for forward, gray for undo)
         fill_color = "red" if not undo else "gray"
 
-        # Draw the line representing the move
+        # Draw the line representing the move, reusing the item of an earlier
+        # move between the same two cells.
         line = Line(Point(x_center, y_center), Point(x_center2, y_center2))
-        self._win.draw_line(line, fill_color)
+        ends = sorted(((id(self._grid), self._index), (id(to_cell._grid), to_cell._index)))
+        self._win.draw_line(line, fill_color, key=("move", *ends))
 
 
 class Maze():
     """
     Represents the maze structure, including maze generation and solving algorithms.
+    The maze state is stored in a compact Grid; self._cells exposes it as a
+    column-major grid of Cell views for drawing and backwards compatibility.
     """
 
-    def __init__(self, x1, y1, num_rows, num_cols, cell_size_x, cell_size_y, window=None, seed=None):
+    def __init__(self, x1, y1, num_rows, num_cols, cell_size_x, cell_size_y, window=None, seed=None,
+                 algorithm="backtracker", renderer=None, grid=None, defer=False, metrics=None,
+                 braid=0.0):
         """
         Initialize the maze with a grid of cells.
         
@@ -232,219 +358,592 @@ class Maze():
             cell_size_y (int): The height of each cell.
             window (Window): The Window object for drawing the maze.
             seed (int, optional): Seed for random maze generation for reproducibility.
-        """
+            algorithm (str): The generation algorithm, one of the names in
+                generators.ALGORITHMS (default is "backtracker").
+            renderer (TkRenderer, optional): Draws the generation and solving events.
+                A TkRenderer is created for the window when omitted; without a
+                window or renderer nothing is drawn and the algorithms run at full speed.
+            grid (Grid, optional): An already generated grid of num_rows x num_cols
+                cells to use as is, for example one loaded from a file.
+            defer (bool): Leave the generation to be run later by animate() or
+                steps() instead of running it here (default is False). solve()
+                finishes a deferred generation first.
+            metrics (Metrics or bool, optional): Collects timers and counters
+                for the generation, solving and drawing; True creates a
+                Metrics. Without it (the default) nothing is measured.
+            braid (float): The fraction of dead ends to remove once the maze
+                is generated, opening loops so there are several routes
+                (default is 0.0, a perfect maze with exactly one route).
+        """
+        if grid is None:
+            generate = get_algorithm(algorithm)
+        elif (grid.num_rows, grid.num_cols) != (num_rows, num_cols):
+            raise ValueError("grid dimensions do not match num_rows and num_cols")
         self._x1 = x1
         self._y1 = y1
         self._num_rows = num_rows
         self._num_cols = num_cols
         self._win = window
+        if renderer is None and window is not None:
+            renderer = TkRenderer(window)
+        self._renderer = renderer
+        # The instrumentation, read back as maze.metrics.report().
+        if metrics is True:
+            from metrics import Metrics
+            metrics = Metrics()
+        self.metrics = metrics or None
+        if renderer is not None and self.metrics is not None and renderer.metrics is None:
+            renderer.metrics = self.metrics
         self.cell_size_x = cell_size_x
         self.cell_size_y = cell_size_y
-        self._cells = []
-
-        self._create_cells()
-        self._break_entrance_and_exit()
-        if seed is not None:
-            random.seed(seed)
-        # Start generating the maze using recursive backtracking from the top-left cell.
-        self.break_walls_r(0, 0)
+        self.seed = seed
+        self.algorithm = algorithm
+        self.braid = braid
+        # Each maze draws from its own random generator, so seeding one maze
+        # never disturbs the global random state or other mazes.
+        self._rng = random.Random(seed)
+        self._grid = None
+        self._cells = None
+        # The generation still to run when it is deferred.
+        self._generation = None
+        # The distances from the entrance kept up to date by set_wall(),
+        # built by the first call to shortest_path().
+        self._field = None
+
+        self._create_cells(grid)
+        if grid is None:
+            self._break_entrance_and_exit()
+            # Generate the maze; the cell-growing algorithms start from the top-left cell.
+            self._generation = generate(self._grid, self._rng)
+            if braid:
+                self._generation = itertools.chain(
+                    self._generation, remove_dead_ends(self._grid, self._rng, braid))
+            if not defer:
+                self._finish_generation()
         # Reset visited flags for solving the maze later.
         self._reset_cells_visited()
 
-    def _create_cells(self):
+    @classmethod
+    def load(cls, path, mmap=True, verify=True, x1=0, y1=0, cell_size_x=10, cell_size_y=10,
+             window=None, renderer=None, metrics=None):
         """
-        Create the grid of cells for the maze and draw each cell.
+        Load a maze saved with save().
+        
+        Parameters:
+            path (str): The file to read.
+            mmap (bool): Memory-map the file and use its wall array in place, so
+                solvers can work on mazes larger than memory (default is True).
+            verify (bool): Check the file's checksum (default is True).
+            x1, y1, cell_size_x, cell_size_y, window, renderer, metrics: As for Maze().
+        
+        Returns:
+            Maze: The loaded maze, with the seed and algorithm it was generated with.
         """
-        # Create a 2D list of Cell objects.
-        for col in range(self._num_cols):
-            cell_col = []
-            for row in range(self._num_rows):
-                cell_col.append(Cell(self._win))
-            self._cells.append(cell_col)
+        grid, header = mazefile.load(path, mmap, verify)
+        return cls(x1, y1, grid.num_rows, grid.num_cols, cell_size_x, cell_size_y, window,
+                   header.seed, header.algorithm, renderer, grid, metrics=metrics)
 
-        # Draw each cell on the canvas.
-        for col in range(self._num_cols):
-            for row in range(self._num_rows):
-                self._draw_cell(col, row)
+    def save(self, path, compact=False):
+        """
+        Save the maze to a binary file, see mazefile.py for the format.
+        
+        Parameters:
+            path (str): The file to write.
+            compact (bool): Store two cells per byte. Compact files are half the
+                size but are decoded on load instead of being used in place.
+        """
+        mazefile.save(self._grid, path, self.seed, self.algorithm, compact)
 
-    def _draw_cell(self, i, j):
+    def _create_cells(self, grid=None):
         """
-        Draw an individual cell based on its grid position.
+        Create the grid of cells for the maze, or adopt an existing one, and draw it.
+        
+        Parameters:
+            grid (Grid, optional): The grid to use instead of a fresh one.
+        """
+        self._grid = grid if grid is not None else Grid(self._num_rows, self._num_cols)
+        # Cells are built on demand as views onto the grid.
+        self._cells = self._grid.columns(self._cell_view)
+
+        if self._renderer is not None:
+            with self._phase("begin"):
+                self._renderer.begin(self._grid, self._x1, self._y1, self.cell_size_x, self.cell_size_y)
+                self._record_drawing()
+
+    def _cell_view(self, i, j):
+        """
+        Build a Cell view for the grid position (i, j) with its canvas coordinates filled in.
         
         Parameters:
             i (int): The column index of the cell.
             j (int): The row index of the cell.
+        
+        Returns:
+            Cell: A view onto the cell's state in the grid.
         """
-        if self._win is None:
-            return
-        # Calculate the cell's pixel coordinates.
-        x1 = self._x1 + i * self.cell_size_x
-        y1 = self._y1 + j * self.cell_size_y
-        x2 = x1 + self.cell_size_x
-        y2 = y1 + self.cell_size_y
-        # Draw the cell using its own draw method.
-        self._cells[i][j].draw(x1, y1, x2, y2)
-        self._animate()
+        cell = Cell(self._win, self._grid, self._grid.index(i, j), self)
+        cell._x1 = self._x1 + i * self.cell_size_x
+        cell._y1 = self._y1 + j * self.cell_size_y
+        cell._x2 = cell._x1 + self.cell_size_x
+        cell._y2 = cell._y1 + self.cell_size_y
+        return cell
+
+    def _play(self, steps):
+        """
+        Run an event generator to completion, drawing its events if the maze has a renderer.
+        
+        Parameters:
+            steps (iterator): A generation or solving event generator.
+        
+        Returns:
+            object: The value the generator returned.
+        """
+        if self._renderer is None:
+            return drain(steps)
+        return self._renderer.play(steps)
 
-    def _animate(self):
+    def _phase(self, name):
         """
-        Update the window to reflect any drawing changes and introduce a slight delay.
+        Return a context manager timing a phase of the maze's work with its
+        metrics, or one that does nothing when metrics are off.
         """
-        if self._win is None:
-            return
-        self._win.redraw()
-        time.sleep(0.01)
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.phase(name)
+
+    def _record_generation(self):
+        """
+        Count the passages of the generated maze into its metrics.
+        """
+        if self.metrics is not None:
+            open_sides = sum(self._grid.passages().translate(PASSAGE_COUNT))
+            self.metrics.count("passages_carved", open_sides // 2)
+            self._record_drawing()
+
+    def _record_solution(self, result):
+        """
+        Count the work of a search into the maze's metrics.
+        """
+        if self.metrics is not None and result is not None:
+            self.metrics.count("solves")
+            self.metrics.count("nodes_expanded", result.nodes_expanded)
+            self._record_drawing()
+
+    def _record_drawing(self):
+        """
+        Copy the renderer's frame and canvas item totals into the metrics.
+        """
+        if self.metrics is not None and self._renderer is not None:
+            self.metrics.counters["frames"] = self._renderer.frames
+            self.metrics.counters["canvas_items"] = self._renderer.items_created
+
+    def _finish_generation(self):
+        """
+        Run whatever is left of a deferred generation.
+        """
+        if self._generation is not None:
+            generation, self._generation = self._generation, None
+            with self._phase("generate"):
+                self._play(generation)
+                self._record_generation()
+            self._reset_cells_visited()
+
+    def steps(self, strategy=None):
+        """
+        Return a generator of the maze's remaining work as events: the deferred
+        generation, if any, then solving with the given strategy.
+        
+        Parameters:
+            strategy (str, optional): The solving strategy, one of the names in
+                solvers.SOLVERS. Without one the maze is only generated.
+        
+        Returns:
+            generator: Yields the events and returns the SolveResult, or None
+                when no strategy is given.
+        """
+        if strategy is not None:
+            solvers.get_solver(strategy)
+        return self._steps(strategy)
+
+    def _steps(self, strategy):
+        """
+        The generator behind steps().
+        """
+        # Phases are timed from their first to their last event, including
+        # the time the events take to draw.
+        if self._generation is not None:
+            generation, self._generation = self._generation, None
+            with self._phase("generate"):
+                yield from generation
+                self._record_generation()
+            self._reset_cells_visited()
+        if strategy is None:
+            return None
+        self._reset_cells_visited()
+        with self._phase("solve"):
+            result = yield from solvers.solve_steps(self._grid, 0, self._grid.size - 1, strategy)
+            self._record_solution(result)
+        return result
+
+    def animate(self, strategy="dfs", on_done=None, time_slice=0.01):
+        """
+        Draw the deferred generation and then the solving from the window's
+        event loop, a frame at a time, without blocking. The window's
+        wait_for_close() runs the loop.
+        
+        Parameters:
+            strategy (str, optional): The solving strategy (default is "dfs").
+                None only draws the generation.
+            on_done (callable, optional): Called with the SolveResult (or None)
+                once everything has been drawn.
+            time_slice (float): The most time in seconds spent per frame on
+                running the algorithms (default is 0.01).
+        
+        Returns:
+            ScheduledRun: A handle to follow or cancel the animation.
+        """
+        if self._renderer is None:
+            raise ValueError("animate() needs a window or renderer to draw on")
+        return self._renderer.schedule(self.steps(strategy), on_done, time_slice)
+
+    def run_in_background(self, strategy="dfs", mode="thread", on_progress=None, on_done=None,
+                          interval=0.02, time_budget=0.01, window=None):
+        """
+        Generate (if deferred) and solve the maze on a worker thread or process.
+        The worker sends its events back in compact batches; the maze applies
+        them to its own grid and draws them, from the window's event loop when
+        there is a window. Without one, call poll() or wait() on the job.
+        
+        Parameters:
+            strategy (str, optional): The solving strategy (default is "dfs").
+                None only generates.
+            mode (str): "thread" or "process" (default is "thread").
+            on_progress (callable, optional): Called with a background.Progress
+                as batches arrive. Defaults to showing it in the window title.
+            on_done (callable, optional): Called with the SolveResult (or None)
+                once the job is finished. Not called if the worker fails: the
+                progress then shows the error, and polling stops by raising
+                RuntimeError, which the window's event loop reports.
+            interval (float): Seconds between polls of the worker (default is 0.02).
+            time_budget (float): The most time in seconds spent per poll on
+                applying batches (default is 0.01).
+            window (Window, optional): The window whose event loop polls the
+                job and whose title shows the progress (default is the
+                maze's window).
+        
+        Returns:
+            BackgroundJob: The running job, which can be cancelled.
+        """
+        import background
+        window = window or self._win
+        walls = None if self._generation is not None else bytes(self._grid.walls)
+        spec = background.JobSpec(self._num_rows, self._num_cols, self.seed, self.algorithm,
+                                  strategy, walls, self.braid)
+        if on_progress is None and window is not None:
+            def on_progress(progress):
+                window.set_title(f"The Maze Game - {background.format_progress(progress)}")
+        job = background.BackgroundJob(spec, mode, self._apply_events, on_progress, on_done)
+        # The worker regenerates the maze from the seed, so drop the local copy,
+        # and the distances kept for the walls before it.
+        self._generation = None
+        self._field = None
+        job.start()
+        if window is not None:
+            def poll():
+                if job.poll(time_budget):
+                    window.after(round(interval * 1000), poll)
+            window.after(0, poll)
+        return job
+
+    def _apply_events(self, batch):
+        """
+        Apply a batch of kind, a, b triples from a background job to the grid
+        and draw them.
+        
+        Parameters:
+            batch (array): The events, three integers each.
+        """
+        grid = self._grid
+        events = [tuple(batch[k:k + 3]) for k in range(0, len(batch), 3)]
+        for kind, a, b in events:
+            if kind == WALL_REMOVED:
+                self._field = None
+                if grid.neighbour(a, b) == -1:
+                    grid.set_wall(a, b, False)
+                else:
+                    grid.carve(a, b)
+        if self._renderer is not None:
+            self._renderer.draw(events)
 
     def _break_entrance_and_exit(self):
         """
         Create the entrance and exit for the maze by breaking the top wall
         of the first cell and the bottom wall of the last cell.
         """
-        self._cells[0][0].has_top_wall = False
-        self._cells[self._num_cols - 1][self._num_rows - 1].has_bottom_wall = False
-        self._draw_cell(0, 0)
-        self._draw_cell(self._num_cols - 1, self._num_rows - 1)
+        entrance = self._grid.index(0, 0)
+        exit_index = self._grid.index(self._num_cols - 1, self._num_rows - 1)
+        self._grid.set_wall(entrance, TOP, False)
+        self._grid.set_wall(exit_index, BOTTOM, False)
+        self._play(iter(((WALL_REMOVED, entrance, TOP), (WALL_REMOVED, exit_index, BOTTOM))))
 
     def break_walls_r(self, i, j):
         """
-        Recursively generate the maze using the recursive backtracking algorithm.
-        This method marks the current cell as visited and then randomly moves to
-        an adjacent unvisited cell, breaking the wall between them.
+        Generate the maze using the backtracking algorithm, starting at (i, j).
+        This marks the current cell as visited and then randomly moves to an
+        adjacent unvisited cell, breaking the wall between them, until every
+        cell has been reached. The walk uses an explicit stack rather than
+        recursion, so it is not limited by the interpreter's recursion limit.
         
         Parameters:
-            i (int): The current cell's column index.
-            j (int): The current cell's row index.
-        """
-        self._cells[i][j].visited = True
-        while True:
-            new_list = []
-            # Check left neighbor
-            if i > 0 and not self._cells[i - 1][j].visited:
-                new_list.append((i - 1, j, 'left'))
-            # Check right neighbor
-            if i < self._num_cols - 1 and not self._cells[i + 1][j].visited:
-                new_list.append((i + 1, j, 'right'))
-            # Check upper neighbor
-            if j > 0 and not self._cells[i][j - 1].visited:
-                new_list.append((i, j - 1, 'up'))
-            # Check lower neighbor
-            if j < self._num_rows - 1 and not self._cells[i][j + 1].visited:
-                new_list.append((i, j + 1, 'down'))
-
-            # If there are no unvisited neighbors, finish recursion for this cell.
-            if not new_list:
-                self._draw_cell(i, j)
-                return
-
-            # Randomly select an unvisited neighbor.
-            next_i, next_j, direction = random.choice(new_list)
-
-            # Knock down the wall between the current cell and the chosen neighbor.
-            if direction == 'left':
-                self._cells[i][j].has_left_wall = False
-                self._cells[next_i][next_j].has_right_wall = False
-            elif direction == 'right':
-                self._cells[i][j].has_right_wall = False
-                self._cells[next_i][next_j].has_left_wall = False
-            elif direction == 'up':
-                self._cells[i][j].has_top_wall = False
-                self._cells[next_i][next_j].has_bottom_wall = False
-            elif direction == 'down':
-                self._cells[i][j].has_bottom_wall = False
-                self._cells[next_i][next_j].has_top_wall = False
-
-            # Recursively break walls from the chosen neighbor.
-            self.break_walls_r(next_i, next_j)
+            i (int): The starting cell's column index.
+            j (int): The starting cell's row index.
+        """
+        self._field = None
+        with self._phase("generate"):
+            self._play(backtracker(self._grid, self._rng, self._grid.index(i, j)))
+            self._record_generation()
 
     def _reset_cells_visited(self):
         """
         Reset the visited flag for all cells in the maze.
         This is useful before starting the maze solving algorithm.
         """
-        for col in range(self._num_cols):
-            for row in range(self._num_rows):
-                self._cells[col][row].visited = False
+        self._grid.reset_visited()
 
-    def solve(self):
+    def solve(self, strategy="dfs"):
         """
         Solve the maze starting from the entrance (top-left cell) and attempting to
         reach the exit (bottom-right cell).
         
+        Parameters:
+            strategy (str): The solving strategy, one of the names in solvers.SOLVERS
+                (default is "dfs", the backtracking search).
+        
         Returns:
-            bool: True if a solution is found, False otherwise.
+            SolveResult: The path as a list of (column, row) positions plus the
+                nodes expanded, peak frontier size and time taken. It is truthy
+                if a solution is found and falsy otherwise.
         """
-        return self._solve_r(i=0, j=0)
+        self._finish_generation()
+        self._reset_cells_visited()
+        with self._phase("solve"):
+            result = solvers.solve(self._grid, 0, self._grid.size - 1, strategy, self._renderer)
+            self._record_solution(result)
+        return result
 
-    def _solve_r(self, i, j):
+    def analyze(self):
         """
-        Recursively solve the maze using a backtracking algorithm.
-        
+        Compute whole-maze metrics: dead ends, junctions, corridor lengths,
+        the distance of every cell from the entrance and the tortuosity of the
+        solution.
+
+        Returns:
+            Analysis: The per-cell arrays and a summary dict (see analysis.analyze).
+        """
+        import analysis
+        return analysis.analyze(self._grid, 0, self._grid.size - 1)
+
+    def path(self, src, dst, cache=None):
+        """
+        Find a shortest path between any two cells. The search from src is
+        cached, keyed by the maze's walls, so further queries from the same
+        cell (or to it) are answered without searching again.
+
         Parameters:
-            i (int): The current cell's column index.
-            j (int): The current cell's row index.
-        
+            src (tuple): The (column, row) position to start from.
+            dst (tuple): The (column, row) position to reach.
+            cache (PathCache, optional): The cache to use (default is
+                paths.default_cache).
+
         Returns:
-            bool: True if the exit is reached, False otherwise.
-        """
-        self._animate()
-        self._cells[i][j].visited = True
-
-        # Check if the current cell is the exit.
-        if i == self._num_cols - 1 and j == self._num_rows - 1:
-            return True
-
-        # Explore all neighboring cells.
-        for new_i, new_j, direction in self._get_neighbours(i, j):
-            if not self._cells[new_i][new_j].visited:
-                # Check if movement in the given direction is possible (no wall exists).
-                if direction == 'left' and not self._cells[i][j].has_left_wall:
-                    self._cells[i][j].draw_move(self._cells[new_i][new_j])
-                    if self._solve_r(new_i, new_j):
-                        return True
-                    else:
-                        # Undo the move if it doesn't lead to a solution.
-                        self._cells[i][j].draw_move(self._cells[new_i][new_j], undo=True)
-                elif direction == 'right' and not self._cells[i][j].has_right_wall:
-                    self._cells[i][j].draw_move(self._cells[new_i][new_j])
-                    if self._solve_r(new_i, new_j):
-                        return True
-                    else:
-                        self._cells[i][j].draw_move(self._cells[new_i][new_j], undo=True)
-                elif direction == 'up' and not self._cells[i][j].has_top_wall:
-                    self._cells[i][j].draw_move(self._cells[new_i][new_j])
-                    if self._solve_r(new_i, new_j):
-                        return True
-                    else:
-                        self._cells[i][j].draw_move(self._cells[new_i][new_j], undo=True)
-                elif direction == 'down' and not self._cells[i][j].has_bottom_wall:
-                    self._cells[i][j].draw_move(self._cells[new_i][new_j])
-                    if self._solve_r(new_i, new_j):
-                        return True
-                    else:
-                        self._cells[i][j].draw_move(self._cells[new_i][new_j], undo=True)
-
-        # Return False if no path from the current cell leads to the exit.
-        return False
-
-    def _get_neighbours(self, i, j):
-        """
-        Get a list of all neighbouring cells (with their positions and relative directions)
-        for a given cell at position (i, j).
-        
+            list: The (column, row) positions from src to dst, empty if dst
+                cannot be reached.
+        """
+        import paths
+        grid = self._grid
+        cache = paths.default_cache if cache is None else cache
+        route = cache.path(grid, grid.index(*src), grid.index(*dst))
+        return [grid.coords(index) for index in route]
+
+    def view(self, window, width, height, detail=8, background=False):
+        """
+        Show the maze in a zoomable, pannable view on a window, drawing only
+        the cells inside the viewport. Scrolling zooms around the pointer and
+        dragging pans. Use it for mazes too large to draw cell by cell.
+
+        A deferred generation runs first, or, with background=True, on a worker
+        thread while the view shows the maze taking shape and the window
+        title the progress, so the window stays responsive.
+
         Parameters:
-            i (int): The current cell's column index.
-            j (int): The current cell's row index.
-        
+            window (Window): The window to show the maze on.
+            width (int): The width of the viewport in pixels.
+            height (int): The height of the viewport in pixels.
+            detail (float): The smallest cell size in pixels drawn with canvas
+                lines; smaller cells are drawn as a bitmap (default is 8).
+            background (bool): Run a deferred generation on a worker thread
+                (default is False).
+
         Returns:
-            list: A list of tuples in the format (new_i, new_j, direction) representing neighbours.
-        """
-        neighbours = []
-        if i > 0:
-            neighbours.append((i - 1, j, 'left'))
-        if i < self._num_cols - 1:
-            neighbours.append((i + 1, j, 'right'))
-        if j > 0:
-            neighbours.append((i, j - 1, 'up'))
-        if j < self._num_rows - 1:
-            neighbours.append((i, j + 1, 'down'))
-        return neighbours
+            MazeView: The view, fitted to the whole maze and drawn.
+        """
+        from viewport import MazeView
+        if background and self._generation is not None:
+            from background import format_progress
+            view = MazeView(window, self._grid, width, height, detail)
+
+            def on_progress(progress):
+                window.set_title(f"The Maze Game - {format_progress(progress)}")
+                view.request_render()
+
+            self.run_in_background(None, on_progress=on_progress,
+                                   on_done=lambda result: view.request_render(), window=window)
+        else:
+            self._finish_generation()
+            view = MazeView(window, self._grid, width, height, detail)
+        view.bind()
+        view.render()
+        return view
+
+    def _cell_index(self, i, j):
+        """
+        Return the id of the cell at column i and row j, checking that it lies
+        inside the maze: Grid.index() would wrap a column past the last one
+        into the next row.
+        """
+        if not (0 <= i < self._num_cols and 0 <= j < self._num_rows):
+            raise IndexError(
+                f"cell ({i}, {j}) is outside the {self._num_cols}x{self._num_rows} maze")
+        return self._grid.index(i, j)
+
+    def set_wall(self, i, j, side, present):
+        """
+        Add or remove the wall on one side of a cell, and on the matching side
+        of its neighbour, and draw the change. The shortest path from the
+        entrance to the exit is repaired rather than searched again.
+
+        Parameters:
+            i (int): The column index of the cell.
+            j (int): The row index of the cell.
+            side (int): One of LEFT, RIGHT, TOP or BOTTOM.
+            present (bool): True to put the wall up, False to knock it down.
+
+        Raises:
+            IndexError: If (i, j) lies outside the maze.
+            ValueError: If side is not one of the four sides.
+        """
+        self._finish_generation()
+        grid = self._grid
+        index = self._cell_index(i, j)
+        other = grid.neighbour(index, side)
+        if grid.has_wall(index, side) == present and (
+                other == -1 or grid.has_wall(other, OPPOSITE[side]) == present):
+            return
+        grid.set_wall(index, side, present)
+        if other != -1:
+            grid.set_wall(other, OPPOSITE[side], present)
+        if self._renderer is not None:
+            self._renderer.draw([(WALL_ADDED if present else WALL_REMOVED, index, side)])
+        if self._field is not None:
+            with self._phase("repair"):
+                self._field.wall_changed(index, side)
+                if self.metrics is not None:
+                    self.metrics.count("cells_repaired", self._field.updated)
+
+    def shortest_path(self):
+        """
+        Return a shortest path from the entrance to the exit. The first call
+        searches the whole maze; after that, set_wall() keeps the distances
+        from the entrance up to date, repairing only the cells an edit
+        affects, so the path is ready again right after each edit.
+
+        Returns:
+            list: The (column, row) positions from the entrance to the exit,
+                empty if the exit cannot be reached.
+        """
+        import paths
+        self._finish_generation()
+        if self._field is None:
+            self._field = paths.DynamicDistanceField(self._grid, 0)
+        grid = self._grid
+        return [grid.coords(index) for index in self._field.path_to(grid.size - 1)]
+
+    def set_cost(self, i, j, cost):
+        """
+        Set the traversal cost of a cell, the cost of stepping into it, as
+        used by the weighted strategies ("dijkstra" and "astar") and by
+        route_agents().
+
+        Parameters:
+            i (int): The column index of the cell.
+            j (int): The row index of the cell.
+            cost (int): The cost, from 1 to MAX_COST (every cell starts at 1).
+
+        Raises:
+            IndexError: If (i, j) lies outside the maze.
+        """
+        self._finish_generation()
+        self._grid.set_cost(self._cell_index(i, j), cost)
+
+    def route_agents(self, agents, exits=None):
+        """
+        Find the cheapest route of many agents at once, with one search
+        backwards from each exit shared by every agent heading for it.
+
+        Parameters:
+            agents (list): ((column, row), (column, row)) start and goal
+                pairs, or just (column, row) starts when exits are given.
+            exits (list, optional): (column, row) positions of exits; every
+                agent is then routed to the cheapest one to reach.
+
+        Returns:
+            list: A paths.Route per agent, in order, with (column, row)
+                positions for its start, goal and path.
+        """
+        import paths
+        self._finish_generation()
+        grid = self._grid
+        with self._phase("route"):
+            if exits is None:
+                ids = [(grid.index(*start), grid.index(*goal)) for start, goal in agents]
+                routes = paths.route_agents(grid, ids)
+            else:
+                routes = paths.route_agents(grid, [grid.index(*start) for start in agents],
+                                            [grid.index(*position) for position in exits])
+        return [paths.Route(grid.coords(route.start),
+                            None if route.goal is None else grid.coords(route.goal),
+                            route.cost, [grid.coords(index) for index in route.path])
+                for route in routes]
+
+    def k_shortest_paths(self, k=3):
+        """
+        Return the k cheapest routes from the entrance to the exit that never
+        visit a cell twice, found with paths.k_shortest_paths(). A braided
+        maze has alternatives; a perfect maze has a single route.
+
+        Parameters:
+            k (int): The most routes to return (default is 3).
+
+        Returns:
+            list: paths.Routes in order of cost, with (column, row) positions.
+        """
+        import paths
+        self._finish_generation()
+        grid = self._grid
+        with self._phase("solve"):
+            routes = paths.k_shortest_paths(grid, 0, grid.size - 1, k)
+        return [paths.Route(grid.coords(route.start), grid.coords(route.goal), route.cost,
+                            [grid.coords(index) for index in route.path])
+                for route in routes]
+
+    def tree_index(self):
+        """
+        Build a TreeIndex that answers distance queries between any two cells
+        in constant time. Only perfect mazes, without loops, can be indexed,
+        and the index is not updated if the walls change afterwards.
+
+        Returns:
+            TreeIndex: The index, rooted at the entrance.
+        """
+        import paths
+        return paths.TreeIndex(self._grid)
@@ -0,0 +1,297 @@
+# -----------------------------------------------------------------------------
+# Module: Viewport
+# Description: A zoomable, pannable view of a maze on a Window's canvas, for
+# mazes far too large to draw cell by cell.
+#
+# Only what is inside the viewport is drawn, so the cost of a frame depends
+# on the size of the window and not on the size of the maze. Zoomed in, the
+# walls of the visible cells become canvas lines, with adjacent walls along a
+# line merged into one item. Zoomed out, once cells are smaller than the
+# detail threshold, the viewport is instead rasterised straight from the wall
+# array into a single grayscale image, one pixel per screen pixel, using
+# bytes operations that run in C.
+# -----------------------------------------------------------------------------
+
+import math
+
+from grid import LEFT, RIGHT, TOP, BOTTOM, HAS_LEFT, HAS_RIGHT, HAS_TOP, HAS_BOTTOM, wall_runs
+
+# The tag shared by every canvas item the view creates.
+TAG = "viewport"
+
+# Palette index (0 background, 1 wall) to gray level.
+_GRAY = bytes([0xFF, 0x00]) + bytes(254)
+# The bottom walls of the last row, moved to the top of the row below it.
+_BOTTOM_AS_TOP = bytes(TOP if mask & BOTTOM else 0 for mask in range(256))
+
+
+class MazeView():
+    """
+    Draws the part of a grid inside a viewport, at any zoom.
+    """
+
+    def __init__(self, window, grid, width, height, detail=8, max_scale=64):
+        """
+        Initialize the view, fitted to the whole maze.
+
+        Parameters:
+            window (Window): The window to draw on.
+            grid (Grid): The maze to show.
+            width (int): The width of the viewport in pixels.
+            height (int): The height of the viewport in pixels.
+            detail (float): The smallest cell size, in pixels, drawn with canvas
+                lines (default is 8). Smaller cells are drawn as a bitmap.
+            max_scale (float): The largest cell size zooming in reaches.
+        """
+        self._win = window
+        self._grid = grid
+        self.width = width
+        self.height = height
+        self.detail = detail
+        self.max_scale = max_scale
+        # The Tk image shown while zoomed out; the canvas does not keep it
+        # alive on its own.
+        self._photo = None
+        # The size of a cell in pixels and the cell coordinates of the
+        # viewport's top-left corner.
+        self.scale = 1.0
+        self.origin_x = 0.0
+        self.origin_y = 0.0
+        self.frames = 0
+        self._render_id = None
+        self._drag = None
+        self.fit()
+
+    def fit(self):
+        """
+        Zoom and pan so the whole maze fits the viewport, centred.
+        """
+        grid = self._grid
+        self.scale = min(self.width / grid.num_cols, self.height / grid.num_rows)
+        self.origin_x = (grid.num_cols - self.width / self.scale) / 2
+        self.origin_y = (grid.num_rows - self.height / self.scale) / 2
+
+    def zoom(self, factor, x=None, y=None):
+        """
+        Zoom in (factor > 1) or out, keeping the cell under a viewport position
+        in place.
+
+        Parameters:
+            factor (float): The change in cell size.
+            x, y (float, optional): The viewport position to zoom around
+                (default is the centre).
+        """
+        x = self.width / 2 if x is None else x
+        y = self.height / 2 if y is None else y
+        grid = self._grid
+        # Zooming out stops once the maze is a quarter of the fitted size.
+        smallest = min(self.width / grid.num_cols, self.height / grid.num_rows) / 4
+        scale = min(max(self.scale * factor, smallest), self.max_scale)
+        self.origin_x += x / self.scale - x / scale
+        self.origin_y += y / self.scale - y / scale
+        self.scale = scale
+
+    def pan(self, dx, dy):
+        """
+        Move the maze by (dx, dy) pixels in the viewport.
+        """
+        self.origin_x -= dx / self.scale
+        self.origin_y -= dy / self.scale
+
+    def resize(self, width, height):
+        """
+        Change the size of the viewport, keeping its top-left corner in place.
+        """
+        self.width = width
+        self.height = height
+
+    def visible_cells(self):
+        """
+        Return the (i0, j0, i1, j1) range of cells inside the viewport, with
+        i0 <= i < i1 and j0 <= j < j1. The range is empty when the maze is
+        out of view.
+        """
+        grid = self._grid
+        i0 = max(0, math.floor(self.origin_x))
+        j0 = max(0, math.floor(self.origin_y))
+        i1 = min(grid.num_cols, math.ceil(self.origin_x + self.width / self.scale))
+        j1 = min(grid.num_rows, math.ceil(self.origin_y + self.height / self.scale))
+        return i0, j0, max(i0, i1), max(j0, j1)
+
+    def render(self):
+        """
+        Replace the view's canvas items with a drawing of the viewport.
+
+        Returns:
+            int: The number of canvas items created.
+        """
+        self._render_id = None
+        canvas = self._win.canvas
+        canvas.delete(TAG)
+        self._photo = None
+        if self.scale >= self.detail:
+            count = self._draw_walls()
+        else:
+            self._photo = self._win.photo_image(self.bitmap())
+            canvas.create_image(0, 0, image=self._photo, anchor="nw", tags=TAG)
+            count = 1
+        self.frames += 1
+        return count
+
+    def request_render(self):
+        """
+        Render from the window's event loop once the pending input has been
+        handled, so a burst of zoom and pan events costs one frame.
+        """
+        if self._render_id is None:
+            self._render_id = self._win.after(0, self.render)
+
+    def _draw_walls(self):
+        """
+        Draw the walls of the visible cells as canvas lines, one per run of
+        adjacent walls.
+        """
+        grid = self._grid
+        cols, rows = grid.num_cols, grid.num_rows
+        walls = grid.walls
+        i0, j0, i1, j1 = self.visible_cells()
+        if i0 == i1 or j0 == j1:
+            return 0
+        scale, ox, oy = self.scale, self.origin_x, self.origin_y
+        create_line = self._win.canvas.create_line
+        count = 0
+        # Horizontal runs along the top of each visible row, and along the
+        # bottom of the last row when it is visible.
+        for j in range(j0, j1 + 1):
+            row = min(j, rows - 1)
+            flags = bytes(walls[row * cols + i0:row * cols + i1]).translate(
+                HAS_TOP if j < rows else HAS_BOTTOM)
+            y = (j - oy) * scale
+            for start, end in wall_runs(flags):
+                create_line((i0 + start - ox) * scale, y, (i0 + end - ox) * scale, y,
+                            fill="black", width=2, tags=TAG)
+                count += 1
+        # Vertical runs along the left of each visible column, and along the
+        # right of the last column when it is visible.
+        for i in range(i0, i1 + 1):
+            column = min(i, cols - 1)
+            flags = bytes(walls[j0 * cols + column:(j1 - 1) * cols + column + 1:cols]).translate(
+                HAS_LEFT if i < cols else HAS_RIGHT)
+            x = (i - ox) * scale
+            for start, end in wall_runs(flags):
+                create_line(x, (j0 + start - oy) * scale, x, (j0 + end - oy) * scale,
+                            fill="black", width=2, tags=TAG)
+                count += 1
+        return count
+
+    def _samples(self, origin, size, cells):
+        """
+        Map each pixel along one axis of the viewport to the cell it shows.
+
+        Returns:
+            tuple: The cell of every pixel, with cells for the border line
+                past the last cell and cells + 1 for pixels outside the maze,
+                and a bytes flag per pixel set where the pixel lies on the
+                cell's first pixel, where its left or top wall is drawn.
+        """
+        scale = self.scale
+        index = []
+        band = bytearray(size)
+        for pixel in range(size):
+            position = origin + pixel / scale
+            cell = math.floor(position)
+            if 0 <= cell <= cells:
+                index.append(cell)
+                if (position - cell) * scale < 1:
+                    band[pixel] = 1
+            else:
+                index.append(cells + 1)
+        return index, bytes(band)
+
+    def bitmap(self):
+        """
+        Rasterise the viewport from the wall array, one pixel per screen pixel
+        with one-pixel walls. When cells are smaller than a pixel each pixel
+        samples the walls of the cell under it.
+
+        Returns:
+            bytes: A binary PGM image of width x height pixels.
+        """
+        grid = self._grid
+        cols, rows = grid.num_cols, grid.num_rows
+        walls = grid.walls
+        width, height = self.width, self.height
+        columns, band_x = self._samples(self.origin_x, width, cols)
+        row_cells, band_y = self._samples(self.origin_y, height, rows)
+        band_x = int.from_bytes(band_x, "little")
+        empty = bytes(cols + 2)
+        blank = bytes([0xFF]) * width
+
+        data = bytearray(b"P5 %d %d 255\n" % (width, height))
+        previous = None
+        for y in range(height):
+            j = row_cells[y]
+            key = (j, band_y[y])
+            if key == previous:
+                data += line
+                continue
+            previous = key
+            if j > rows:
+                line = blank
+                data += line
+                continue
+            # The masks of row j, followed by a cell past the right border
+            # whose left wall is the border, and an empty one for outside.
+            if j < rows:
+                cells = bytes(walls[j * cols:(j + 1) * cols])
+                masks = cells + bytes([LEFT if cells[-1] & RIGHT else 0, 0])
+            else:
+                cells = bytes(walls[(rows - 1) * cols:rows * cols])
+                corner = TOP if cells[-1] & (RIGHT | BOTTOM) else 0
+                masks = cells.translate(_BOTTOM_AS_TOP) + bytes([corner, 0])
+            if masks == empty:
+                line = blank
+                data += line
+                continue
+            sampled = bytes(map(masks.__getitem__, columns))
+            pixels = int.from_bytes(sampled.translate(HAS_LEFT), "little") & band_x
+            if band_y[y]:
+                pixels |= int.from_bytes(sampled.translate(HAS_TOP), "little")
+            line = pixels.to_bytes(width, "little").translate(_GRAY)
+            data += line
+        return bytes(data)
+
+    def bind(self):
+        """
+        Let the mouse drive the view: dragging with the left button pans, the
+        wheel zooms around the pointer, and resizing the canvas resizes the
+        viewport.
+        """
+        canvas = self._win.canvas
+        canvas.bind("<ButtonPress-1>", self._on_press)
+        canvas.bind("<B1-Motion>", self._on_drag)
+        canvas.bind("<MouseWheel>", self._on_wheel)
+        canvas.bind("<Button-4>", self._on_wheel)
+        canvas.bind("<Button-5>", self._on_wheel)
+        canvas.bind("<Configure>", self._on_configure)
+
+    def _on_press(self, event):
+        self._drag = (event.x, event.y)
+
+    def _on_drag(self, event):
+        if self._drag is None:
+            self._drag = (event.x, event.y)
+        self.pan(event.x - self._drag[0], event.y - self._drag[1])
+        self._drag = (event.x, event.y)
+        self.request_render()
+
+    def _on_wheel(self, event):
+        # Windows and macOS report a wheel delta, X11 buttons 4 (up) and 5.
+        up = event.delta > 0 if getattr(event, "num", None) not in (4, 5) else event.num == 4
+        self.zoom(1.25 if up else 0.8, event.x, event.y)
+        self.request_render()
+
+    def _on_configure(self, event):
+        if (event.width, event.height) != (self.width, self.height):
+            self.resize(event.width, event.height)
+            self.request_render()